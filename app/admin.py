@@ -2,9 +2,13 @@ from django.contrib import admin
 from django import forms
 from django.utils.html import format_html
 from django.urls import path
-from django.shortcuts import redirect
+from django.shortcuts import get_object_or_404, redirect
 from django.contrib import messages
-from app.models import Competencia, Juez, Equipo, RegistroTiempo, ResultadoEquipo
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
+from app.models import Competencia, Juez, Equipo, RegistroTiempo, ResultadoEquipo, LoteIngesta, EventoSalida
+from app.services import ExportacionService, ResultsService
+from app.services.exportacion_service import es_peticion_asgi
 
 # ======= FILTROS PERSONALIZADOS =======
 
@@ -36,10 +40,21 @@ class EquipoInline(admin.TabularInline):
     fields = ['number', 'name', 'category', 'judge', 'num_registros_display']
     readonly_fields = ['num_registros_display']
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """
+        Las opciones de juez se consultan una vez por petición y no una por fila:
+        cada formulario del inline tiene su propio campo y repetiría la consulta.
+        """
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'judge' and formfield is not None:
+            if not hasattr(request, '_opciones_juez_inline'):
+                request._opciones_juez_inline = list(formfield.choices)
+            formfield.choices = request._opciones_juez_inline
+        return formfield
+
     def num_registros_display(self, obj):
         if obj.pk:
-            count = obj.times.count()
-            return format_html('<b>{}</b> registros', count)
+            return format_html('<b>{}</b> registros', obj.record_count)
         return '-'
     num_registros_display.short_description = 'Registros'
 
@@ -77,7 +92,7 @@ class CompetenciaAdmin(admin.ModelAdmin):
     search_fields = ['name']
     readonly_fields = ['started_at', 'finished_at']
     list_per_page = 25
-    actions = ['iniciar_competencia', 'detener_competencia']
+    actions = ['iniciar_competencia', 'detener_competencia', 'exportar_resultados_csv', 'exportar_registros_csv']
     
     # Template personalizado para incluir cronómetro
     change_list_template = 'admin/app/competencia/change_list.html'
@@ -94,14 +109,52 @@ class CompetenciaAdmin(admin.ModelAdmin):
 
     inlines = [EquipoInline]
 
+    def get_queryset(self, request):
+        # Conteos en la misma consulta del listado; los registros salen de los
+        # agregados guardados en Equipo (record_count), sin unir RegistroTiempo.
+        return super().get_queryset(request).annotate(
+            num_equipos=Count('teams'),
+            num_registros=Coalesce(Sum('teams__record_count'), Value(0)),
+        )
+
+    def save_model(self, request, obj, form, change):
+        """
+        Guarda los datos de la competencia y cambia is_running con cambiar_estado.
+
+        clean() ya rechaza iniciar con otra en curso, pero dos admins pueden
+        validar a la vez: el UPDATE condicionado de cambiar_estado resuelve esa
+        carrera y aquí se informa con un mensaje en lugar de un IntegrityError.
+        """
+        en_curso = obj.is_running
+        anterior = bool(getattr(obj, '_is_running_cargado', None)) if change else False
+        if en_curso == anterior:
+            super().save_model(request, obj, form, change)
+            return
+
+        obj.is_running = anterior
+        super().save_model(request, obj, form, change)
+        if obj.cambiar_estado(en_curso):
+            return
+
+        otra = Competencia.objects.filter(is_running=True).exclude(pk=obj.pk).first()
+        if en_curso and otra is not None:
+            messages.error(
+                request,
+                f"No se pudo iniciar '{obj.name}': la competencia '{otra.name}' ya está en curso.",
+            )
+        else:
+            accion = 'iniciar' if en_curso else 'detener'
+            messages.error(request, f"No se pudo {accion} '{obj.name}': su estado cambió mientras se editaba.")
+
     def total_equipos(self, obj):
-        return obj.teams.count()
+        return obj.num_equipos
     total_equipos.short_description = 'Equipos'
+    total_equipos.admin_order_field = 'num_equipos'
 
     def total_registros(self, obj):
-        # Suma registros de todos los equipos en esta competencia
-        return RegistroTiempo.objects.filter(team__competition=obj).count()
+        return obj.num_registros
     total_registros.short_description = 'Registros de Tiempo'
+    total_registros.admin_order_field = 'num_registros'
 
     def get_status_display(self, obj):
         """Muestra el estado con cronómetro inline si está en curso"""
@@ -114,11 +167,12 @@ class CompetenciaAdmin(admin.ModelAdmin):
                 'border-radius: 20px; font-weight: bold; font-size: 11px; '
                 'text-transform: uppercase; letter-spacing: 0.5px;">'
                 'EN CURSO</span>'
-                '<span class="cronometro-inline" data-started-at="{}" '
+                '<span class="cronometro-inline" data-competencia-id="{}" data-started-at="{}" '
                 'style="font-family: \'Courier New\', monospace; font-size: 16px; '
                 'font-weight: bold; color: #28a745; background: #f0f0f0; padding: 4px 10px; '
                 'border-radius: 5px; min-width: 100px; text-align: center;">00:00:00</span>'
                 '</div>',
+                obj.pk,
                 started_at_iso
             )
         elif obj.finished_at:
@@ -221,6 +275,20 @@ class CompetenciaAdmin(admin.ModelAdmin):
     
     detener_competencia.short_description = "Detener competencia(s) seleccionada(s)"
 
+    def exportar_resultados_csv(self, request, queryset):
+        """Descarga el ranking de las competencias seleccionadas (CSV en streaming)"""
+        ids = list(queryset.values_list('pk', flat=True))
+        return ExportacionService().exportar_resultados(ids, asincrono=es_peticion_asgi(request))
+
+    exportar_resultados_csv.short_description = "Exportar resultados (CSV)"
+
+    def exportar_registros_csv(self, request, queryset):
+        """Descarga los registros de tiempo de las competencias seleccionadas (CSV en streaming)"""
+        ids = list(queryset.values_list('pk', flat=True))
+        return ExportacionService().exportar_registros(ids, asincrono=es_peticion_asgi(request))
+
+    exportar_registros_csv.short_description = "Exportar registros de tiempo (CSV)"
+
     def get_urls(self):
         """Agrega URLs personalizadas para los botones de acción"""
         urls = super().get_urls()
@@ -235,6 +303,16 @@ class CompetenciaAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.detener_competencia_view),
                 name='app_competencia_detener',
             ),
+            path(
+                '<int:competencia_id>/exportar/resultados/',
+                self.admin_site.admin_view(self.exportar_resultados_view),
+                name='app_competencia_exportar_resultados',
+            ),
+            path(
+                '<int:competencia_id>/exportar/registros/',
+                self.admin_site.admin_view(self.exportar_registros_view),
+                name='app_competencia_exportar_registros',
+            ),
         ]
         return custom_urls + urls
 
@@ -275,6 +353,20 @@ class CompetenciaAdmin(admin.ModelAdmin):
         
         return redirect('admin:app_competencia_changelist')
 
+    def exportar_resultados_view(self, request, competencia_id):
+        """Descarga el ranking de una competencia (CSV en streaming)"""
+        competencia = get_object_or_404(Competencia, pk=competencia_id)
+        return ExportacionService().exportar_resultados(
+            [competencia.pk], f'resultados-{competencia.pk}.csv', asincrono=es_peticion_asgi(request)
+        )
+
+    def exportar_registros_view(self, request, competencia_id):
+        """Descarga los registros de tiempo de una competencia (CSV en streaming)"""
+        competencia = get_object_or_404(Competencia, pk=competencia_id)
+        return ExportacionService().exportar_registros(
+            [competencia.pk], f'registros-{competencia.pk}.csv', asincrono=es_peticion_asgi(request)
+        )
+
 
 @admin.register(Equipo)
 class EquipoAdmin(admin.ModelAdmin):
@@ -285,8 +377,9 @@ class EquipoAdmin(admin.ModelAdmin):
     list_select_related = ['competition', 'judge']
 
     def num_registros(self, obj):
-        return obj.times.count()
+        return obj.record_count
     num_registros.short_description = 'Registros'
+    num_registros.admin_order_field = 'record_count'
 
     def ver_resultados(self, obj):
         from django.urls import reverse
@@ -354,6 +447,9 @@ class JuezAdmin(admin.ModelAdmin):
     search_fields = ['username', 'first_name', 'last_name', 'email']
     readonly_fields = ['created_at']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('teams')
+
     fieldsets = (
         ('Acceso', {
             'fields': ('username', 'password1', 'password2', 'is_active')
@@ -383,6 +479,7 @@ class RegistroTiempoAdmin(admin.ModelAdmin):
     list_filter = ['team__competition']
     search_fields = ['team__name']
     ordering = ['time']
+    list_select_related = ['team__competition']
     readonly_fields = ['record_id', 'team', 'time', 'hours', 'minutes', 'seconds', 'milliseconds', 'created_at']
 
     def id_registro_corto(self, obj):
@@ -404,22 +501,69 @@ class RegistroTiempoAdmin(admin.ModelAdmin):
     tiempo_formateado_display.short_description = 'Tiempo'
 
 
+@admin.register(LoteIngesta)
+class LoteIngestaAdmin(admin.ModelAdmin):
+    list_display = ['recibo_corto', 'team', 'judge', 'status', 'created_at', 'processed_at']
+    list_filter = ['status', 'team__competition']
+    search_fields = ['team__name', 'judge__username']
+    list_select_related = ['team', 'judge']
+    readonly_fields = ['receipt_id', 'judge', 'team', 'payload', 'status', 'result', 'created_at', 'processed_at']
+
+    def recibo_corto(self, obj):
+        return str(obj.receipt_id)[:8]
+    recibo_corto.short_description = 'Recibo'
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(EventoSalida)
+class EventoSalidaAdmin(admin.ModelAdmin):
+    list_display = ['key', 'competition', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status', 'competition']
+    list_select_related = ['competition']
+    readonly_fields = [
+        'key', 'competition', 'payload', 'status', 'attempts', 'next_attempt_at',
+        'last_error', 'created_at', 'sent_at',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(ResultadoEquipo)
 class ResultadoEquipoAdmin(admin.ModelAdmin):
-    list_display = ['number', 'name', 'competition', 'tiempo_total_display', 'num_registros']
+    list_display = ['posicion_display', 'number', 'name', 'competition', 'tiempo_total_display', 'num_registros']
+    list_display_links = ['number', 'name']
     list_filter = ['competition']
     search_fields = ['name', 'number']
     inlines = [RegistroTiempoInline]
 
+    def get_ordering(self, request):
+        return ['competition', 'rk_grupo', 'rk_total', 'number']
+
     def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related('times')
+        # Mismo motor de ranking que la API y las páginas públicas (una consulta).
+        # Con una búsqueda activa, las posiciones son relativas a los resultados.
+        # El orden se aplica después de anotar porque usa columnas del ranking.
+        queryset = ResultsService.anotar_ranking(self.model._default_manager.get_queryset())
+        return queryset.order_by(*self.get_ordering(request))
+
+    def posicion_display(self, obj):
+        if obj.rk_grupo == ResultsService.GRUPO_DESCALIFICADO:
+            return format_html('<span style="color: #dc3545; font-weight: bold;">{}</span>', 'DESCALIFICADO')
+        if obj.rk_grupo == ResultsService.GRUPO_SIN_REGISTROS:
+            return '-'
+        return f"{obj.rk_posicion_general}º"
+    posicion_display.short_description = 'Posición'
 
     def num_registros(self, obj):
-        return obj.times.count()
+        return obj.record_count
     num_registros.short_description = 'Nº Registros'
+    num_registros.admin_order_field = 'record_count'
     
     def tiempo_total_display(self, obj):
-        total = obj.total_time()
+        total = obj.total_ms
         if total:
             hours = total // 3600000
             minutes = (total % 3600000) // 60000
@@ -428,3 +572,4 @@ class ResultadoEquipoAdmin(admin.ModelAdmin):
             return f"{hours}h {minutes}m {seconds}s {milliseconds}ms"
         return '-'
     tiempo_total_display.short_description = 'Tiempo Total'
+    tiempo_total_display.admin_order_field = 'total_ms'
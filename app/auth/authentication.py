@@ -4,7 +4,7 @@ Los jueces NO son usuarios de Django, tienen su propio modelo.
 """
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken
-from app.models import Juez
+from app.utils.cache_jueces import obtener_juez
 
 
 class JuezJWTAuthentication(JWTAuthentication):
@@ -15,13 +15,13 @@ class JuezJWTAuthentication(JWTAuthentication):
     def get_user(self, validated_token):
         """
         Obtiene el juez desde el token JWT validado.
+        Usa el cache de jueces: sin consultas mientras la entrada esté vigente.
         """
-        try:
-            juez_id = validated_token.get('juez_id')
-            if juez_id is None:
-                raise InvalidToken('Token no contiene juez_id')
-            
-            juez = Juez.objects.get(id=juez_id, is_active=True)
-            return juez
-        except Juez.DoesNotExist:
+        juez_id = validated_token.get('juez_id')
+        if juez_id is None:
+            raise InvalidToken('Token no contiene juez_id')
+        
+        juez = obtener_juez(juez_id)
+        if juez is None:
             raise InvalidToken('Juez no encontrado o inactivo')
+        return juez
@@ -7,10 +7,13 @@ from app.views import (
     MeView,
     RefreshTokenView,
     CompetenciaViewSet,
+    RankingCompetenciaView,
     EquipoViewSet,
     EstadoCompetenciaAdminView,
     RegistrarTiemposView,
     EstadoEquipoRegistrosView,
+    EstadoLoteIngestaView,
+    EsquemaWebSocketView,
 )
 
 
@@ -37,9 +40,16 @@ urlpatterns = [
     # Endpoint público para admin (sin autenticación)
     path('admin/estado-competencias/', EstadoCompetenciaAdminView.as_view(), name='admin_estado_competencias'),
     
+    # Esquema del subprotocolo MessagePack de los WebSockets
+    path('ws/esquema/', EsquemaWebSocketView.as_view(), name='esquema_websocket'),
+    
+    # Ranking público de una competencia
+    path('competencias/<int:competencia_id>/ranking/', RankingCompetenciaView.as_view(), name='ranking_competencia'),
+    
     # Endpoints de registros de tiempo (HTTP)
     path('equipos/<int:equipo_id>/registros/', RegistrarTiemposView.as_view(), name='registrar_tiempos'),
     path('equipos/<int:equipo_id>/registros/estado/', EstadoEquipoRegistrosView.as_view(), name='estado_registros'),
+    path('ingesta/<uuid:recibo>/', EstadoLoteIngestaView.as_view(), name='estado_lote_ingesta'),
     
     # Incluir rutas del router (Competencias y Equipos)
     path('', include(router.urls)),
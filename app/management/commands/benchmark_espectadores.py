@@ -0,0 +1,240 @@
+"""
+Comando para medir cuántos espectadores WebSocket atiende el servidor.
+
+Abre M conexiones a /ws/competencia/<id>/ (una competencia temporal), envía
+K actualizaciones al grupo por el channel layer y mide cuánto tarda cada una
+en llegar a todos los espectadores.
+
+Con --workers arranca el propio servidor (comando servir) una vez por cada
+número de procesos indicado, para comparar cómo escala con los núcleos. Sin
+--workers mide contra el servidor que ya esté corriendo en --url.
+
+Necesita el mismo Redis que el servidor (el envío sale de este proceso). El
+cliente corre en un solo proceso: con miles de conexiones puede ser él el
+cuello de botella; conviene correrlo en otra máquina o revisar su uso de CPU.
+
+Uso (con Docker):
+    docker compose exec web python manage.py benchmark_espectadores --url ws://127.0.0.1:8000
+    docker compose exec web python manage.py benchmark_espectadores --workers 1,2,4 --espectadores 2000
+
+Opciones:
+    --url URL            Servidor ya en marcha (default: ws://127.0.0.1:8000)
+    --workers LISTA      Arrancar el servidor con estos números de procesos (ej: 1,2,4)
+    --port PUERTO        Puerto para el servidor arrancado con --workers (default: 8100)
+    --espectadores M     Conexiones simultáneas (default: 500)
+    --mensajes K         Actualizaciones a enviar (default: 20)
+    --intervalo MS       Pausa entre actualizaciones (default: 250)
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.models import Competencia
+from app.utils.canales import capas_competencia
+from app.utils.metricas import percentil
+
+
+class Command(BaseCommand):
+    help = 'Mide la entrega de actualizaciones a muchos espectadores WebSocket'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='ws://127.0.0.1:8000', help='Servidor ya en marcha')
+        parser.add_argument('--workers', default='', help='Arrancar el servidor con estos procesos (ej: 1,2,4)')
+        parser.add_argument('--port', type=int, default=8100, help='Puerto para el servidor arrancado')
+        parser.add_argument('--espectadores', type=int, default=500, help='Conexiones simultáneas (default: 500)')
+        parser.add_argument('--mensajes', type=int, default=20, help='Actualizaciones a enviar (default: 20)')
+        parser.add_argument('--intervalo', type=int, default=250, help='Pausa entre actualizaciones en ms (default: 250)')
+
+    def handle(self, *args, **options):
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            raise CommandError('Se requiere el paquete websockets')
+
+        competencia = Competencia.objects.create(
+            name='Benchmark espectadores',
+            datetime=timezone.now(),
+            is_active=True,
+        )
+        try:
+            if options['workers']:
+                resultados = []
+                for num_workers in [int(n) for n in options['workers'].split(',')]:
+                    url = f'ws://127.0.0.1:{options["port"]}'
+                    servidor = self._arrancar_servidor(num_workers, options['port'])
+                    try:
+                        resultados.append((num_workers, self._medir(url, competencia.id, options)))
+                    finally:
+                        servidor.send_signal(signal.SIGTERM)
+                        servidor.wait(timeout=15)
+            else:
+                resultados = [(None, self._medir(options['url'], competencia.id, options))]
+        finally:
+            competencia.delete()
+
+        self._reportar(resultados, options)
+
+    def _arrancar_servidor(self, num_workers, puerto):
+        self.stdout.write(f'Arrancando servidor con {num_workers} worker(s)...')
+        servidor = subprocess.Popen(
+            [sys.executable, 'manage.py', 'servir', '--workers', str(num_workers),
+             '--host', '127.0.0.1', '--port', str(puerto)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=os.environ.copy(),
+        )
+        # Esperar a que el puerto acepte conexiones
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            try:
+                socket.create_connection(('127.0.0.1', puerto), timeout=1).close()
+                time.sleep(1)
+                return servidor
+            except OSError:
+                time.sleep(0.2)
+        servidor.kill()
+        raise CommandError(f'El servidor no respondió en el puerto {puerto}')
+
+    def _medir(self, url, competencia_id, options):
+        return asyncio.run(self._medir_async(url, competencia_id, options))
+
+    async def _medir_async(self, url, competencia_id, options):
+        import websockets
+
+        num_espectadores = options['espectadores']
+        num_mensajes = options['mensajes']
+        ruta = f'{url.rstrip("/")}/ws/competencia/{competencia_id}/'
+
+        llegadas = {n: [] for n in range(1, num_mensajes + 1)}
+        tiempos_conexion = []
+        fallidas = 0
+        conectados = asyncio.Event()
+        listos = 0
+        limite_apertura = asyncio.Semaphore(100)
+        detener = asyncio.Event()
+
+        async def espectador():
+            nonlocal fallidas, listos
+            try:
+                async with limite_apertura:
+                    inicio = time.perf_counter()
+                    ws = await websockets.connect(ruta, open_timeout=30, max_size=None)
+                    # conexion_establecida + leaderboard_snapshot
+                    await ws.recv()
+                    await ws.recv()
+                    tiempos_conexion.append(time.perf_counter() - inicio)
+            except Exception:
+                fallidas += 1
+                return
+            finally:
+                listos += 1
+                if listos == num_espectadores:
+                    conectados.set()
+
+            try:
+                while not detener.is_set():
+                    try:
+                        crudo = await asyncio.wait_for(ws.recv(), timeout=1)
+                    except asyncio.TimeoutError:
+                        continue
+                    llegada = time.perf_counter()
+                    mensaje = json.loads(crudo)
+                    marca = (mensaje.get('data') or {}).get('marca')
+                    if mensaje.get('tipo') == 'leaderboard_delta' and marca in llegadas:
+                        llegadas[marca].append(llegada)
+            except Exception:
+                pass
+            finally:
+                await ws.close()
+
+        tareas = [asyncio.create_task(espectador()) for _ in range(num_espectadores)]
+        await conectados.wait()
+
+        capas = await sync_to_async(capas_competencia)()
+        enviados = {}
+        inicio_envio = time.perf_counter()
+        for marca in range(1, num_mensajes + 1):
+            evento = {
+                'type': 'registros_actualizados',
+                'data': {
+                    'competencia_id': competencia_id,
+                    'equipo_ids': [],
+                    'equipos': [],
+                    'deltas': [{
+                        'competencia_id': competencia_id,
+                        'desde': marca,
+                        'secuencia': marca,
+                        'version': 'benchmark',
+                        'equipos': [],
+                        'cambios': [],
+                        'marca': marca,
+                    }],
+                    'incompleto': False,
+                },
+            }
+            enviados[marca] = time.perf_counter()
+            for capa in capas:
+                await capa.group_send(f'competencia_{competencia_id}', evento)
+            await asyncio.sleep(options['intervalo'] / 1000)
+
+        # Margen para las últimas entregas
+        await asyncio.sleep(2)
+        detener.set()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+        latencias = []
+        completado = []
+        entregas = 0
+        for marca, tiempos in llegadas.items():
+            entregas += len(tiempos)
+            latencias.extend(t - enviados[marca] for t in tiempos)
+            if tiempos:
+                completado.append(max(tiempos) - enviados[marca])
+
+        ultima_llegada = max((max(t) for t in llegadas.values() if t), default=inicio_envio)
+        duracion = ultima_llegada - inicio_envio
+
+        return {
+            'conectados': num_espectadores - fallidas,
+            'fallidas': fallidas,
+            'conexion_p50': percentil(tiempos_conexion, 50),
+            'conexion_p95': percentil(tiempos_conexion, 95),
+            'entregas': entregas,
+            'esperadas': (num_espectadores - fallidas) * num_mensajes,
+            'latencia_p50': percentil(latencias, 50),
+            'latencia_p95': percentil(latencias, 95),
+            'latencia_p99': percentil(latencias, 99),
+            'completado_medio': statistics.mean(completado) if completado else 0.0,
+            'entregas_por_segundo': entregas / duracion if duracion else 0.0,
+        }
+
+    def _reportar(self, resultados, options):
+        self.stdout.write(
+            f'Espectadores: {options["espectadores"]}  Mensajes: {options["mensajes"]}  '
+            f'Intervalo: {options["intervalo"]} ms'
+        )
+        self.stdout.write(
+            f'{"Workers":<9}{"Conect.":>9}{"Entregas":>14}{"Conex p95":>11}'
+            f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"Todos ms":>10}{"Entr/s":>10}'
+        )
+        for num_workers, r in resultados:
+            self.stdout.write(
+                f'{num_workers or "-":<9}{r["conectados"]:>9}'
+                f'{r["entregas"]:>7}/{r["esperadas"]:<6}'
+                f'{r["conexion_p95"] * 1000:>11.1f}'
+                f'{r["latencia_p50"] * 1000:>9.1f}{r["latencia_p95"] * 1000:>9.1f}'
+                f'{r["latencia_p99"] * 1000:>9.1f}{r["completado_medio"] * 1000:>10.1f}'
+                f'{r["entregas_por_segundo"]:>10.0f}'
+            )
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark completado'))
@@ -0,0 +1,266 @@
+"""
+Comando para medir las rutas de Python puro que más se ejecutan.
+
+No toca la base de datos: trabaja con objetos en memoria (equipos, registros y
+competencia sin guardar). Mide:
+- Construcción del ranking: entradas desde 15 tiempos por equipo + carga del
+  leaderboard (lo que hacía _procesar_equipos)
+- Actualización incremental del leaderboard con un equipo
+- Render de partials/competencia_results.html
+- Codificación del leaderboard_snapshot en JSON y en MessagePack (subprotocolo
+  de los WebSockets), con el tamaño de cada uno
+- RegistroTiempo.sincronizar_componentes (total <-> horas/min/seg/ms de save)
+- formatear_tiempo_ms, parsear_tiempo_a_ms y el filtro format_time_ms
+
+Las cuatro primeras se miden para cada tamaño de --equipos. Los resultados se
+guardan en JSON junto al commit actual; con --comparar se muestran las
+diferencias contra un JSON anterior para ver regresiones entre commits.
+
+Uso (con Docker):
+    docker compose exec web python manage.py benchmark_micro
+    docker compose exec web python manage.py benchmark_micro --salida benchmarks/antes.json
+    docker compose exec web python manage.py benchmark_micro --comparar benchmarks/antes.json
+
+Opciones:
+    --equipos LISTA      Tamaños de competencia (default: 50,500,5000)
+    --repeticiones N     Repeticiones por medida; se reporta el mínimo y la mediana (default: 5)
+    --salida ARCHIVO     JSON de resultados (default: benchmarks/micro-<commit>.json)
+    --comparar ARCHIVO   JSON anterior contra el que comparar
+    --tolerancia PCT     Diferencia a partir de la cual se marca regresión (default: 10)
+"""
+
+import json
+import platform
+import random
+import statistics
+import subprocess
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from app.models import Competencia, RegistroTiempo
+from app.models.equipo import CATEGORIA_CHOICES
+from app.services.leaderboard_service import EntradaLeaderboard, Leaderboard
+from app.templatetags.time_filters import format_time_ms
+from app.websocket.esquema import codificar
+from app.utils.timestamps import formatear_tiempo_ms, parsear_tiempo_a_ms
+from app.views.html_views import _contexto_resultados
+
+# Llamadas por medida en las funciones de tiempo (se reporta por llamada)
+TAMANO_LOTE = 1000
+REGISTROS_POR_EQUIPO = 15
+
+
+def _commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+class Command(BaseCommand):
+    help = 'Mide las rutas de Python puro de resultados y tiempos, y guarda JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--equipos', default='50,500,5000', help='Tamaños de competencia (default: 50,500,5000)')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Repeticiones por medida (default: 5)')
+        parser.add_argument('--salida', default='', help='JSON de resultados (default: benchmarks/micro-<commit>.json)')
+        parser.add_argument('--comparar', default='', help='JSON anterior contra el que comparar')
+        parser.add_argument('--tolerancia', type=float, default=10.0, help='Porcentaje para marcar regresión (default: 10)')
+
+    def handle(self, *args, **options):
+        try:
+            tamanos = [int(n) for n in options['equipos'].split(',')]
+        except ValueError:
+            raise CommandError('--equipos debe ser una lista de enteros (ej: 50,500,5000)')
+
+        self.repeticiones = max(1, options['repeticiones'])
+        self.azar = random.Random(5000)
+        commit = _commit_actual()
+
+        medidas = {}
+        self.tamanos = {}
+        for nombre, funcion, llamadas in self._casos_tiempos():
+            medidas[nombre] = self._medir(funcion, llamadas)
+            self._mostrar(nombre, medidas[nombre])
+        for num_equipos in tamanos:
+            for nombre, funcion in self._casos_resultados(num_equipos):
+                clave = f'{nombre}[{num_equipos}]'
+                medidas[clave] = self._medir(funcion, 1)
+                self._mostrar(clave, medidas[clave])
+
+        resultado = {
+            'commit': commit,
+            'fecha': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'repeticiones': self.repeticiones,
+            'medidas': medidas,
+            'tamanos_bytes': self.tamanos,
+        }
+        salida = Path(options['salida'] or f'benchmarks/micro-{commit}.json')
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+        self.stdout.write(f'Resultados guardados en {salida}')
+
+        if options['comparar']:
+            self._comparar(medidas, options['comparar'], options['tolerancia'])
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark completado'))
+
+    # ------------------------------------------------------------------
+    # Casos
+    # ------------------------------------------------------------------
+
+    def _tiempos(self, cantidad):
+        """Tiempos de carrera realistas (10 a 40 minutos) en milisegundos."""
+        return [self.azar.randint(600_000, 2_400_000) for _ in range(cantidad)]
+
+    def _casos_tiempos(self):
+        tiempos = self._tiempos(TAMANO_LOTE)
+        textos = []
+        for idx, tiempo in enumerate(tiempos):
+            textos.append(formatear_tiempo_ms(tiempo, ('completo', 'corto')[idx % 2]))
+
+        registros_ms = [RegistroTiempo(time=t) for t in tiempos]
+        registros_componentes = [RegistroTiempo(time=t) for t in tiempos]
+        for registro in registros_componentes:
+            registro.sincronizar_componentes()
+
+        def desde_ms():
+            # Se limpian los componentes para que cada llamada descomponga el total
+            for registro in registros_ms:
+                registro.hours = registro.minutes = registro.seconds = registro.milliseconds = 0
+                registro.sincronizar_componentes()
+
+        def desde_componentes():
+            for registro in registros_componentes:
+                registro.sincronizar_componentes()
+
+        return [
+            ('formatear_tiempo_ms', lambda: [formatear_tiempo_ms(t) for t in tiempos], TAMANO_LOTE),
+            ('formatear_tiempo_ms_corto', lambda: [formatear_tiempo_ms(t, 'corto') for t in tiempos], TAMANO_LOTE),
+            ('parsear_tiempo_a_ms', lambda: [parsear_tiempo_a_ms(t) for t in textos], TAMANO_LOTE),
+            ('format_time_ms', lambda: [format_time_ms(t) for t in tiempos], TAMANO_LOTE),
+            ('registro_desde_ms', desde_ms, TAMANO_LOTE),
+            ('registro_desde_componentes', desde_componentes, TAMANO_LOTE),
+        ]
+
+    def _casos_resultados(self, num_equipos):
+        categorias = [valor for valor, _ in CATEGORIA_CHOICES]
+        equipos = [
+            SimpleNamespace(
+                id=idx,
+                name=f'Equipo {idx}',
+                number=idx,
+                category=categorias[idx % len(categorias)],
+            )
+            for idx in range(1, num_equipos + 1)
+        ]
+        tiempos_por_equipo = []
+        for idx in range(num_equipos):
+            tiempos = self._tiempos(REGISTROS_POR_EQUIPO)
+            # Uno de cada veinte equipos con un jugador ausente (descalificado)
+            if idx % 20 == 0:
+                tiempos[-1] = 0
+            tiempos_por_equipo.append(tiempos)
+
+        def construir():
+            leaderboard = Leaderboard(0, categorias)
+            leaderboard.cargar(
+                EntradaLeaderboard.desde_tiempos(equipo, tiempos)
+                for equipo, tiempos in zip(equipos, tiempos_por_equipo)
+            )
+            return leaderboard
+
+        leaderboard = construir()
+        secuencia = iter(range(1, 10**9))
+
+        def aplicar():
+            equipo = equipos[self.azar.randrange(num_equipos)]
+            leaderboard.aplicar(
+                EntradaLeaderboard.desde_tiempos(equipo, self._tiempos(REGISTROS_POR_EQUIPO)),
+                next(secuencia),
+            )
+
+        competencia = Competencia(id=0, name='Benchmark', datetime=timezone.now(), is_running=True)
+
+        def renderizar():
+            return render_to_string(
+                'app/partials/competencia_results.html',
+                _contexto_resultados(competencia, '', leaderboard),
+            )
+
+        snapshot = {'tipo': 'leaderboard_snapshot', 'data': leaderboard.snapshot()}
+        for nombre, datos in (('json', json.dumps(snapshot).encode()), ('msgpack', codificar(snapshot))):
+            clave = f'ws_snapshot_{nombre}[{num_equipos}]'
+            self.tamanos[clave] = len(datos)
+            self.stdout.write(f'{clave:<34}{len(datos):>14} bytes')
+
+        return [
+            ('leaderboard_construir', construir),
+            ('leaderboard_aplicar', aplicar),
+            ('render_resultados', renderizar),
+            ('ws_snapshot_json', lambda: json.dumps(snapshot)),
+            ('ws_snapshot_msgpack', lambda: codificar(snapshot)),
+        ]
+
+    # ------------------------------------------------------------------
+    # Medición y reporte
+    # ------------------------------------------------------------------
+
+    def _medir(self, funcion, llamadas):
+        """
+        Mide una función con timeit.
+
+        Args:
+            funcion: Callable sin argumentos
+            llamadas: Operaciones que realiza cada invocación (para reportar por operación)
+
+        Returns:
+            Dict con mínimo y mediana en microsegundos por operación
+        """
+        temporizador = timeit.Timer(funcion)
+        numero, _ = temporizador.autorange()
+        muestras = [
+            duracion / numero / llamadas * 1e6
+            for duracion in temporizador.repeat(repeat=self.repeticiones, number=numero)
+        ]
+        return {
+            'minimo_us': round(min(muestras), 3),
+            'mediana_us': round(statistics.median(muestras), 3),
+            'iteraciones': numero,
+        }
+
+    def _mostrar(self, nombre, medida):
+        self.stdout.write(
+            f'{nombre:<34}{medida["minimo_us"]:>14.3f} µs{medida["mediana_us"]:>14.3f} µs (mediana)'
+        )
+
+    def _comparar(self, medidas, ruta, tolerancia):
+        try:
+            anterior = json.loads(Path(ruta).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo leer {ruta}: {e}')
+
+        self.stdout.write(f'Comparación contra {anterior.get("commit", "?")} (mínimos):')
+        regresiones = 0
+        for nombre, medida in medidas.items():
+            previa = anterior.get('medidas', {}).get(nombre)
+            if not previa or not previa['minimo_us']:
+                continue
+            cambio = (medida['minimo_us'] / previa['minimo_us'] - 1) * 100
+            linea = f'{nombre:<34}{previa["minimo_us"]:>14.3f} -> {medida["minimo_us"]:>12.3f} µs{cambio:>+9.1f}%'
+            if cambio > tolerancia:
+                regresiones += 1
+                self.stdout.write(self.style.WARNING(f'⚠ {linea}'))
+            else:
+                self.stdout.write(f'  {linea}')
+        if regresiones:
+            self.stdout.write(self.style.WARNING(f'⚠ {regresiones} medida(s) más lentas que la tolerancia'))
@@ -0,0 +1,89 @@
+"""
+Comando para medir consultas y tiempo por lote al registrar tiempos.
+
+Compara la ruta completa de RegistroService (validación paso a paso) con la
+ruta rápida (UPDATE condicional + INSERT). Trabaja con datos temporales dentro
+de una transacción que se revierte al final: no modifica la base de datos.
+No incluye la publicación al leaderboard, que ocurre después del commit.
+
+Uso (con Docker):
+    docker compose exec web python manage.py benchmark_registro
+    docker compose exec web python manage.py benchmark_registro --lotes 50
+
+Opciones:
+    --lotes N    Lotes a registrar por cada ruta (default: 20)
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app.models import Competencia, Equipo, Juez
+from app.services.registro_service import RegistroService
+
+
+class Command(BaseCommand):
+    help = 'Mide consultas y tiempo por lote en las rutas completa y rápida de registro'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lotes',
+            type=int,
+            default=20,
+            help='Lotes a registrar por cada ruta (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        num_lotes = options['lotes']
+        servicio = RegistroService()
+        registros = [{'tiempo': 60000 + i * 1000} for i in range(servicio.MAX_REGISTROS_POR_EQUIPO)]
+
+        rutas = [
+            ('Ruta completa', servicio._registrar_batch_completo),
+            ('Ruta rápida', servicio._registrar_batch_impl),
+        ]
+
+        with transaction.atomic():
+            competencia = Competencia.objects.create(
+                name='Benchmark registro',
+                datetime=timezone.now(),
+                is_running=True,
+                started_at=timezone.now(),
+            )
+            juez = Juez.objects.create(username=f'benchmark_{competencia.id}', password='!')
+
+            resultados = []
+            dorsal = 0
+            for nombre, registrar in rutas:
+                equipos = []
+                for _ in range(num_lotes):
+                    dorsal += 1
+                    equipos.append(Equipo.objects.create(
+                        name=f'Benchmark {dorsal}',
+                        number=dorsal,
+                        competition=competencia,
+                        judge=juez,
+                    ))
+
+                consultas = 0
+                inicio = time.perf_counter()
+                for equipo in equipos:
+                    with CaptureQueriesContext(connection) as capturadas:
+                        resultado = registrar(juez, equipo.id, registros)
+                    consultas += len(capturadas)
+                    if resultado['total_guardados'] != len(registros):
+                        raise RuntimeError(f'{nombre}: lote no guardado ({resultado["registros_fallidos"][:1]})')
+                duracion = time.perf_counter() - inicio
+
+                resultados.append((nombre, consultas / num_lotes, duracion * 1000 / num_lotes))
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Lotes por ruta: {num_lotes} ({len(registros)} registros cada uno)')
+        self.stdout.write(f'{"Ruta":<16}{"Consultas/lote":>16}{"ms/lote":>12}')
+        for nombre, consultas, ms in resultados:
+            self.stdout.write(f'{nombre:<16}{consultas:>16.1f}{ms:>12.2f}')
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark completado (datos revertidos)'))
@@ -0,0 +1,40 @@
+"""
+Comando para confirmar los lotes pendientes de la cola de ingesta.
+
+El servidor (daphne) ya procesa la cola en un hilo propio cuando INGESTA_MODO=cola;
+este comando sirve para vaciarla con el servidor detenido (por ejemplo, tras una caída).
+El leaderboard en memoria del servidor se reconstruye desde la base de datos al arrancar.
+
+Uso (con Docker):
+    docker compose run --rm web python manage.py procesar_ingesta
+
+Opciones:
+    --lotes-por-commit N    Lotes confirmados por transacción (default: INGESTA_LOTES_POR_COMMIT)
+"""
+
+from django.core.management.base import BaseCommand
+
+from app.services.ingesta_service import IngestaService
+
+
+class Command(BaseCommand):
+    help = 'Confirma los lotes pendientes de la cola de ingesta'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lotes-por-commit',
+            type=int,
+            default=None,
+            help='Lotes confirmados por transacción',
+        )
+
+    def handle(self, *args, **options):
+        servicio = IngestaService()
+        total = 0
+        while True:
+            procesados = servicio.procesar_pendientes(options['lotes_por_commit'])
+            if not procesados:
+                break
+            total += procesados
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} lote(s) procesados'))
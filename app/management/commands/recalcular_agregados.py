@@ -0,0 +1,80 @@
+"""
+Comando para recalcular o verificar los agregados almacenados en Equipo.
+
+Uso (con Docker):
+    docker compose exec web python manage.py recalcular_agregados
+    docker compose exec web python manage.py recalcular_agregados --verificar
+
+Opciones:
+    --verificar         Solo reporta diferencias, no modifica datos (sale con código 1 si hay)
+    --competencia ID    Limita el proceso a una competencia
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app.models import Equipo, RegistroTiempo
+from app.models.equipo import calcular_agregados
+
+
+class Command(BaseCommand):
+    help = 'Recalcula (o verifica) total, mejor tiempo, registros, ausentes y descalificación de cada equipo'
+
+    CAMPOS = ('total_ms', 'best_ms', 'record_count', 'absent_count', 'is_disqualified')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo reporta diferencias, no modifica datos',
+        )
+        parser.add_argument(
+            '--competencia',
+            type=int,
+            default=None,
+            help='ID de la competencia a procesar (default: todas)',
+        )
+
+    def handle(self, *args, **options):
+        verificar = options['verificar']
+        competencia_id = options['competencia']
+
+        equipos = Equipo.objects.all()
+        registros = RegistroTiempo.objects.all()
+        if competencia_id:
+            equipos = equipos.filter(competition_id=competencia_id)
+            registros = registros.filter(team__competition_id=competencia_id)
+
+        # Una sola pasada sobre los registros en lugar de una consulta por equipo
+        tiempos_por_equipo = {}
+        for team_id, time in registros.values_list('team_id', 'time').iterator(chunk_size=2000):
+            tiempos_por_equipo.setdefault(team_id, []).append(time)
+
+        diferencias = 0
+        with transaction.atomic():
+            for equipo in equipos.only('id', 'name', 'number', *self.CAMPOS):
+                esperado = calcular_agregados(tiempos_por_equipo.get(equipo.id, []))
+                actual = {campo: getattr(equipo, campo) for campo in self.CAMPOS}
+                if actual == esperado:
+                    continue
+
+                diferencias += 1
+                cambios = ', '.join(
+                    f'{campo}: {actual[campo]} → {esperado[campo]}'
+                    for campo in self.CAMPOS if actual[campo] != esperado[campo]
+                )
+                self.stdout.write(f'  • {equipo.name} (Dorsal {equipo.number}): {cambios}')
+
+                if not verificar:
+                    Equipo.objects.filter(pk=equipo.pk).update(**esperado)
+
+        if diferencias == 0:
+            self.stdout.write(self.style.SUCCESS('✓ Todos los agregados coinciden con los registros'))
+        elif verificar:
+            raise CommandError(f'{diferencias} equipo(s) con agregados desactualizados')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ {diferencias} equipo(s) recalculados'))
+            self.stdout.write(self.style.WARNING(
+                'Los servidores en ejecución reconstruyen su leaderboard tras la próxima edición '
+                'desde el admin o al reiniciarse.'
+            ))
@@ -0,0 +1,129 @@
+"""
+Comando para servir la aplicación con varios procesos Daphne.
+
+El proceso principal abre el puerto una sola vez y cada worker lo adopta
+(daphne --fd); el sistema operativo reparte las conexiones nuevas entre ellos.
+Los workers arrancan con server/daphne_ws.py, que añade permessage-deflate (WS_DEFLATE).
+Cada WebSocket queda en el worker que lo aceptó durante toda su vida, así que
+no hace falta balanceador ni afinidad para repartir jueces y espectadores.
+Reinicia los workers que terminen inesperadamente y los detiene con SIGTERM/SIGINT.
+
+Estado compartido entre workers:
+- Leaderboard: generación y secuencia en el cache (Redis); cada worker
+  reconstruye su copia en memoria cuando queda atrás
+- Fragmentos HTML, ETags y cache de jueces: en el cache (Redis)
+- Grupos de WebSocket: channel layers de Redis
+- Cola de ingesta: en la base de datos (select_for_update skip_locked)
+
+Requiere CACHE_BACKEND=redis cuando --workers es mayor que 1.
+
+Uso (con Docker):
+    docker compose exec web python manage.py servir
+    docker compose exec web python manage.py servir --workers 4
+    docker compose exec web python manage.py servir --workers 4 --port 8000
+
+Opciones:
+    --workers N    Procesos Daphne (default: WEB_WORKERS)
+    --host HOST    Dirección de escucha (default: 0.0.0.0)
+    --port PUERTO  Puerto de escucha (default: 8000)
+    --app RUTA     Aplicación ASGI (default: server.asgi:application)
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Arranca varios procesos Daphne que comparten el puerto de escucha'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'WEB_WORKERS', 1),
+            help='Procesos Daphne (default: WEB_WORKERS)',
+        )
+        parser.add_argument(
+            '--host',
+            default='0.0.0.0',
+            help='Dirección de escucha (default: 0.0.0.0)',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8000,
+            help='Puerto de escucha (default: 8000)',
+        )
+        parser.add_argument(
+            '--app',
+            default='server.asgi:application',
+            help='Aplicación ASGI (default: server.asgi:application)',
+        )
+
+    def handle(self, *args, **options):
+        num_workers = options['workers']
+        if num_workers < 1:
+            raise CommandError('--workers debe ser al menos 1')
+
+        backend_cache = settings.CACHES['default']['BACKEND']
+        if num_workers > 1 and 'locmem' in backend_cache.lower():
+            self.stdout.write(self.style.WARNING(
+                '⚠ El cache es local al proceso: los workers no compartirán el leaderboard '
+                'ni los ETags. Usa CACHE_BACKEND=redis.'
+            ))
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((options['host'], options['port']))
+        sock.listen(1024)
+        sock.set_inheritable(True)
+
+        comando = [
+            sys.executable, '-m', 'server.daphne_ws',
+            '--fd', str(sock.fileno()),
+            options['app'],
+        ]
+        entorno = dict(os.environ, WEB_WORKERS=str(num_workers))
+
+        def lanzar():
+            return subprocess.Popen(comando, env=entorno, pass_fds=(sock.fileno(),))
+
+        detener = []
+        signal.signal(signal.SIGTERM, lambda *_: detener.append(True))
+        signal.signal(signal.SIGINT, lambda *_: detener.append(True))
+
+        workers = [lanzar() for _ in range(num_workers)]
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {num_workers} worker(s) en {options["host"]}:{options["port"]} '
+            f'(pids: {", ".join(str(w.pid) for w in workers)})'
+        ))
+
+        try:
+            while not detener:
+                time.sleep(1)
+                for idx, worker in enumerate(workers):
+                    codigo = worker.poll()
+                    if codigo is not None and not detener:
+                        self.stdout.write(self.style.WARNING(
+                            f'⚠ Worker {worker.pid} terminó (código {codigo}); reiniciando'
+                        ))
+                        workers[idx] = lanzar()
+        finally:
+            self.stdout.write('Deteniendo workers...')
+            for worker in workers:
+                if worker.poll() is None:
+                    worker.terminate()
+            limite = time.monotonic() + 10
+            for worker in workers:
+                try:
+                    worker.wait(timeout=max(0, limite - time.monotonic()))
+                except subprocess.TimeoutExpired:
+                    worker.kill()
+            sock.close()
@@ -0,0 +1,408 @@
+"""
+Comando para simular la carga de un día de carrera: jueces y espectadores.
+
+Crea una competencia temporal con N jueces (un equipo cada uno) y:
+- Cada juez inicia sesión por /api/login/, abre /ws/juez/<id>/ y envía su
+  lote de 15 tiempos a /api/equipos/<id>/registros/ según la curva de llegadas
+- M espectadores abren /ws/competencia/<id>/ y, con cada delta, vuelven a
+  pedir el parcial de resultados (como el respaldo de la página)
+
+Reporta p50/p95/p99 de: login, conexión del juez y del espectador (hasta el
+snapshot), acuse del envío, entrega del delta a los espectadores (desde el
+envío) y render del parcial.
+
+Sin --url corre todo dentro de este proceso contra server.asgi (SQLite o
+Postgres local y el channel layer configurado, en memoria o Redis local).
+Con --url mide contra un servidor en marcha que use la misma base de datos.
+Al terminar borra la competencia, los jueces y sus registros.
+
+Uso (con Docker):
+    docker compose exec web python manage.py simular_carrera
+    docker compose exec web python manage.py simular_carrera --jueces 72 --espectadores 500 --llegadas pico
+    docker compose exec web python manage.py simular_carrera --url http://127.0.0.1:8000 --json resultados.json
+
+Opciones:
+    --jueces N           Jueces (y equipos) simulados (default: 72)
+    --espectadores M     Espectadores conectados (default: 200)
+    --llegadas CURVA     uniforme, pico (llegadas concentradas a mitad) o rafaga (default: pico)
+    --duracion S         Segundos en los que se reparten los envíos (default: 30)
+    --url URL            Servidor en marcha (default: en este proceso)
+    --sin-parcial        Los espectadores no piden el parcial
+    --espera S           Segundos de espera tras el último envío (default: 5)
+    --json ARCHIVO       Guarda los resultados en JSON
+    --semilla N          Semilla para tiempos y llegadas (default: 5000)
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.models import Competencia, Equipo, Juez
+from app.utils.metricas import percentil
+
+CONTRASENA = 'simulacion-5k'
+CONCURRENCIA_CONEXIONES = 50
+
+
+class _WsLocal:
+    """WebSocket contra la aplicación ASGI dentro del proceso."""
+
+    def __init__(self, comunicador):
+        self._com = comunicador
+
+    async def recibir_json(self, timeout: float):
+        # El timeout propio del comunicador cancela la aplicación; este solo deja de esperar
+        return await asyncio.wait_for(self._com.receive_json_from(timeout=None), timeout)
+
+    async def cerrar(self):
+        await self._com.disconnect()
+
+
+class _ClienteLocal:
+    """Peticiones HTTP y WebSocket a server.asgi sin pasar por la red."""
+
+    def __init__(self):
+        from server.asgi import application
+        self.application = application
+
+    async def _pedir(self, metodo: str, ruta: str, cuerpo: bytes = b'', cabeceras=()):
+        from channels.testing import HttpCommunicator
+
+        cabeceras = [(b'host', b'localhost'), (b'content-length', str(len(cuerpo)).encode()), *cabeceras]
+        com = HttpCommunicator(self.application, metodo, ruta, body=cuerpo, headers=cabeceras)
+        respuesta = await com.get_response(timeout=60)
+        # Cerrar la petición como lo haría el servidor para que Django libere sus tareas
+        await com.send_input({'type': 'http.disconnect'})
+        await com.wait(timeout=5)
+        return respuesta
+
+    async def post_json(self, ruta: str, datos: Dict, token: str = None):
+        cabeceras = [(b'content-type', b'application/json')]
+        if token:
+            cabeceras.append((b'authorization', f'Bearer {token}'.encode()))
+        respuesta = await self._pedir('POST', ruta, json.dumps(datos).encode(), cabeceras)
+        return respuesta['status'], json.loads(respuesta['body'] or b'{}')
+
+    async def get(self, ruta: str) -> int:
+        respuesta = await self._pedir('GET', ruta)
+        return respuesta['status']
+
+    async def conectar_ws(self, ruta: str):
+        from channels.testing import WebsocketCommunicator
+
+        com = WebsocketCommunicator(self.application, ruta, headers=[(b'host', b'localhost')])
+        conectado, _ = await com.connect(timeout=30)
+        if not conectado:
+            raise ConnectionError(f'WebSocket rechazado: {ruta}')
+        return _WsLocal(com)
+
+    async def cerrar(self):
+        pass
+
+
+class _WsRemoto:
+    def __init__(self, ws):
+        self._ws = ws
+
+    async def recibir_json(self, timeout: float):
+        return await self._ws.receive_json(timeout=timeout)
+
+    async def cerrar(self):
+        await self._ws.close()
+
+
+class _ClienteRemoto:
+    """Peticiones HTTP y WebSocket a un servidor en marcha (aiohttp)."""
+
+    def __init__(self, url: str):
+        import aiohttp
+
+        self.url = url.rstrip('/')
+        self.url_ws = 'ws' + self.url[len('http'):]
+        self.sesion = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+
+    async def post_json(self, ruta: str, datos: Dict, token: str = None):
+        cabeceras = {'Authorization': f'Bearer {token}'} if token else {}
+        async with self.sesion.post(self.url + ruta, json=datos, headers=cabeceras) as respuesta:
+            return respuesta.status, await respuesta.json(content_type=None)
+
+    async def get(self, ruta: str) -> int:
+        async with self.sesion.get(self.url + ruta) as respuesta:
+            await respuesta.read()
+            return respuesta.status
+
+    async def conectar_ws(self, ruta: str):
+        return _WsRemoto(await self.sesion.ws_connect(self.url_ws + ruta, max_msg_size=0))
+
+    async def cerrar(self):
+        await self.sesion.close()
+
+
+def calcular_llegadas(curva: str, cantidad: int, duracion: float, azar: random.Random) -> List[float]:
+    """
+    Segundos (desde el inicio) en que cada juez envía su lote.
+
+    Args:
+        curva: 'uniforme', 'pico' o 'rafaga'
+        cantidad: Número de envíos
+        duracion: Ventana total en segundos
+        azar: Generador con semilla
+
+    Returns:
+        Lista de instantes, uno por juez
+    """
+    if curva == 'rafaga':
+        return [0.0] * cantidad
+    if curva == 'uniforme':
+        return [duracion * i / max(cantidad - 1, 1) for i in range(cantidad)]
+    # pico: los equipos llegan a la meta concentrados alrededor de la mitad
+    return [min(max(azar.gauss(duracion / 2, duracion / 6), 0.0), duracion) for _ in range(cantidad)]
+
+
+class Command(BaseCommand):
+    help = 'Simula jueces y espectadores de una carrera y reporta latencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jueces', type=int, default=72, help='Jueces (y equipos) simulados (default: 72)')
+        parser.add_argument('--espectadores', type=int, default=200, help='Espectadores conectados (default: 200)')
+        parser.add_argument('--llegadas', choices=['uniforme', 'pico', 'rafaga'], default='pico', help='Curva de llegadas')
+        parser.add_argument('--duracion', type=float, default=30, help='Segundos en los que se reparten los envíos')
+        parser.add_argument('--url', default='', help='Servidor en marcha (default: en este proceso)')
+        parser.add_argument('--sin-parcial', action='store_true', help='Los espectadores no piden el parcial')
+        parser.add_argument('--espera', type=float, default=5, help='Segundos de espera tras el último envío')
+        parser.add_argument('--json', default='', help='Guarda los resultados en JSON')
+        parser.add_argument('--semilla', type=int, default=5000, help='Semilla para tiempos y llegadas')
+
+    def handle(self, *args, **options):
+        if options['jueces'] < 1:
+            raise CommandError('--jueces debe ser al menos 1')
+
+        if not options['url']:
+            capa = settings.CHANNEL_LAYERS.get('default', {}).get('BACKEND', '')
+            if capa.endswith('InMemoryChannelLayer') and getattr(settings, 'DIFUSION_VENTANA_MS', 0):
+                # El temporizador de difusión corre en otro hilo y la capa en memoria
+                # solo entrega dentro del event loop: enviar sin ventana
+                settings.DIFUSION_VENTANA_MS = 0
+                self.stdout.write(self.style.WARNING('⚠ Capa en memoria: difusión sin ventana de agrupado'))
+
+        competencia, jueces = self._crear_datos(options['jueces'])
+        try:
+            metricas = asyncio.run(self._simular(competencia, jueces, options))
+        finally:
+            Juez.objects.filter(pk__in=[j.pk for j, _ in jueces]).delete()
+            competencia.delete()
+
+        self._reportar(metricas, options)
+
+    def _crear_datos(self, num_jueces):
+        competencia = Competencia.objects.create(
+            name='Simulación de carrera',
+            datetime=timezone.now(),
+            is_active=True,
+            is_running=True,
+            started_at=timezone.now(),
+        )
+        # Un solo hash para todos: el costo de PBKDF2 es del login, no de la preparación
+        hash_contrasena = make_password(CONTRASENA)
+        sufijo = f'{competencia.id}'
+        Juez.objects.bulk_create([
+            Juez(username=f'sim{sufijo}_{i}', password=hash_contrasena)
+            for i in range(1, num_jueces + 1)
+        ])
+        jueces = list(Juez.objects.filter(username__startswith=f'sim{sufijo}_').order_by('id'))
+        for dorsal, juez in enumerate(jueces, 1):
+            Equipo.objects.create(
+                name=f'Simulado {dorsal}',
+                number=dorsal,
+                competition=competencia,
+                judge=juez,
+            )
+        equipos = dict(Equipo.objects.filter(competition=competencia).values_list('judge_id', 'id'))
+        return competencia, [(juez, equipos[juez.id]) for juez in jueces]
+
+    async def _simular(self, competencia, jueces, options):
+        cliente = _ClienteRemoto(options['url']) if options['url'] else _ClienteLocal()
+        azar = random.Random(options['semilla'])
+        metricas = {
+            nombre: []
+            for nombre in ('login', 'conexion_juez', 'conexion_publico', 'envio_ack', 'difusion', 'parcial')
+        }
+        errores = {nombre: 0 for nombre in metricas}
+        envios: Dict[int, float] = {}
+        sockets = []
+        limite = asyncio.Semaphore(CONCURRENCIA_CONEXIONES)
+        fin = asyncio.Event()
+        publico_listo = asyncio.Event()
+        intentos_publico = []
+
+        async def medir(nombre, corrutina):
+            inicio = time.perf_counter()
+            try:
+                resultado = await corrutina
+            except Exception:
+                errores[nombre] += 1
+                return None
+            metricas[nombre].append(time.perf_counter() - inicio)
+            return resultado
+
+        async def drenar(ws, al_recibir=None):
+            while not fin.is_set():
+                try:
+                    mensaje = await ws.recibir_json(timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+                except Exception:
+                    return
+                if al_recibir:
+                    al_recibir(mensaje)
+
+        # 1. Jueces: login + WebSocket antes de la largada
+        async def preparar_juez(juez):
+            async with limite:
+                respuesta = await medir('login', cliente.post_json(
+                    '/api/login/', {'username': juez.username, 'password': CONTRASENA}
+                ))
+                if not respuesta or respuesta[0] != 200:
+                    if respuesta:
+                        errores['login'] += 1
+                    return None
+                token = respuesta[1]['access']
+                ws = await medir('conexion_juez', cliente.conectar_ws(f'/ws/juez/{juez.id}/?token={token}'))
+                if ws is not None:
+                    sockets.append(ws)
+                return token, ws
+
+        preparados = await asyncio.gather(*(preparar_juez(juez) for juez, _ in jueces))
+        tareas = [asyncio.create_task(drenar(p[1])) for p in preparados if p and p[1]]
+
+        # 2. Espectadores
+        async def abrir_publico():
+            ws = await cliente.conectar_ws(f'/ws/competencia/{competencia.id}/')
+            # conexion_establecida + leaderboard_snapshot
+            await ws.recibir_json(timeout=30)
+            await ws.recibir_json(timeout=30)
+            return ws
+
+        async def conectar_espectador():
+            async with limite:
+                ws = await medir('conexion_publico', abrir_publico())
+            intentos_publico.append(ws)
+            if len(intentos_publico) == options['espectadores']:
+                publico_listo.set()
+            return ws
+
+        async def espectador():
+            ws = await conectar_espectador()
+            if ws is None:
+                return
+            sockets.append(ws)
+            vistos = set()
+            pidiendo = []
+
+            def al_recibir(mensaje):
+                if mensaje.get('tipo') != 'leaderboard_delta':
+                    return
+                llegada = time.perf_counter()
+                for equipo in mensaje['data'].get('equipos', []):
+                    if equipo['id'] in envios and equipo['id'] not in vistos:
+                        vistos.add(equipo['id'])
+                        metricas['difusion'].append(llegada - envios[equipo['id']])
+                if not options['sin_parcial'] and not pidiendo:
+                    # Como la página: un solo refresco del parcial en vuelo
+                    pidiendo.append(asyncio.ensure_future(pedir_parcial()))
+
+            async def pedir_parcial():
+                try:
+                    estado = await medir('parcial', cliente.get(f'/{competencia.id}/partial/'))
+                    if estado is not None and estado != 200:
+                        errores['parcial'] += 1
+                finally:
+                    pidiendo.clear()
+
+            await drenar(ws, al_recibir)
+
+        tareas += [asyncio.create_task(espectador()) for _ in range(options['espectadores'])]
+        if options['espectadores']:
+            await publico_listo.wait()
+
+        # 3. Envíos según la curva de llegadas
+        llegadas = calcular_llegadas(options['llegadas'], len(jueces), options['duracion'], azar)
+        inicio = time.perf_counter()
+
+        async def enviar(indice, juez_equipo, preparado):
+            _, equipo_id = juez_equipo
+            await asyncio.sleep(max(0.0, inicio + llegadas[indice] - time.perf_counter()))
+            if not preparado:
+                errores['envio_ack'] += 1
+                return
+            registros = [{'tiempo': azar.randint(15 * 60000, 35 * 60000)} for _ in range(15)]
+            envios[equipo_id] = time.perf_counter()
+            respuesta = await medir('envio_ack', cliente.post_json(
+                f'/api/equipos/{equipo_id}/registros/', {'registros': registros}, token=preparado[0]
+            ))
+            if respuesta and respuesta[0] not in (201, 202):
+                errores['envio_ack'] += 1
+
+        await asyncio.gather(*(
+            enviar(i, juez_equipo, preparado)
+            for i, (juez_equipo, preparado) in enumerate(zip(jueces, preparados))
+        ))
+        await asyncio.sleep(options['espera'])
+
+        fin.set()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        await asyncio.gather(*(ws.cerrar() for ws in sockets), return_exceptions=True)
+        await cliente.cerrar()
+
+        conectados = sum(1 for ws in intentos_publico if ws is not None)
+        return {
+            'metricas': metricas,
+            'errores': errores,
+            'entregas_esperadas': len(envios) * conectados,
+        }
+
+    def _reportar(self, resultado, options):
+        metricas = resultado['metricas']
+        errores = resultado['errores']
+        modo = options['url'] or 'en proceso'
+        self.stdout.write(
+            f'Jueces: {options["jueces"]}  Espectadores: {options["espectadores"]}  '
+            f'Llegadas: {options["llegadas"]} en {options["duracion"]:.0f}s  Servidor: {modo}'
+        )
+        self.stdout.write(f'{"Medida":<16}{"n":>8}{"errores":>9}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+
+        resumen = {}
+        for nombre, valores in metricas.items():
+            fila = {
+                'n': len(valores),
+                'errores': errores[nombre],
+                'p50_ms': percentil(valores, 50) * 1000,
+                'p95_ms': percentil(valores, 95) * 1000,
+                'p99_ms': percentil(valores, 99) * 1000,
+            }
+            resumen[nombre] = fila
+            self.stdout.write(
+                f'{nombre:<16}{fila["n"]:>8}{fila["errores"]:>9}'
+                f'{fila["p50_ms"]:>10.1f}{fila["p95_ms"]:>10.1f}{fila["p99_ms"]:>10.1f}'
+            )
+        self.stdout.write(
+            f'Entregas de delta: {len(metricas["difusion"])}/{resultado["entregas_esperadas"]}'
+        )
+
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as archivo:
+                json.dump({
+                    'opciones': {k: options[k] for k in ('jueces', 'espectadores', 'llegadas', 'duracion', 'url')},
+                    'medidas': resumen,
+                    'entregas_esperadas': resultado['entregas_esperadas'],
+                }, archivo, indent=2)
+            self.stdout.write(f'Resultados guardados en {options["json"]}')
+
+        self.stdout.write(self.style.SUCCESS('✓ Simulación completada'))
@@ -0,0 +1,9 @@
+"""
+Módulo: middleware
+Middlewares HTTP de la aplicación.
+"""
+
+from .metricas import MetricasMiddleware
+from .perfilador import PerfiladorMiddleware
+
+__all__ = ['MetricasMiddleware', 'PerfiladorMiddleware']
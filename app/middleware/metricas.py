@@ -0,0 +1,50 @@
+"""
+Módulo: metricas (middleware)
+Mide cada petición HTTP: duración y número de consultas SQL.
+
+Características:
+- Cuenta las consultas con connection.execute_wrapper (no requiere DEBUG)
+- Va después de WhiteNoise: los estáticos no se cuentan
+- Las consultas de respuestas en streaming que ocurren al iterar no se incluyen
+"""
+
+import time
+
+from django.db import connection
+
+from app.utils.metricas import LIMITES_CONSULTAS, obtener_histograma
+
+
+class _ContadorConsultas:
+    """execute_wrapper que solo cuenta las sentencias ejecutadas."""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+class MetricasMiddleware:
+    """
+    Registra http_peticion_segundos y http_consultas_por_peticion.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.duracion = obtener_histograma('http_peticion_segundos', 'Duración de las peticiones HTTP')
+        self.consultas = obtener_histograma(
+            'http_consultas_por_peticion',
+            'Consultas SQL por petición HTTP',
+            LIMITES_CONSULTAS,
+        )
+
+    def __call__(self, request):
+        contador = _ContadorConsultas()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contador):
+            respuesta = self.get_response(request)
+        self.duracion.observar(time.perf_counter() - inicio)
+        self.consultas.observar(contador.total)
+        return respuesta
@@ -0,0 +1,40 @@
+"""
+Módulo: perfilador (middleware)
+Perfil de cada petición HTTP: consultas SQL, tiempo SQL, serialización y render.
+
+Solo se carga con PERFILADOR_ACTIVO=True; si no, Django lo descarta al
+arrancar (MiddlewareNotUsed) y no tiene ningún costo. Ver app/utils/perfilador.py.
+"""
+
+import time
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from app.utils.perfilador import instalar, perfilador_activo, perfilar, sumar_tramo
+
+
+class PerfiladorMiddleware:
+    """
+    Perfila la petición completa y registra las que superan los umbrales.
+
+    La respuesta de DRF se renderiza (JSON) después de la vista: ese tiempo
+    cuenta como serialización. El render de las vistas HTML lo miden las vistas.
+    """
+
+    def __init__(self, get_response):
+        if not perfilador_activo():
+            raise MiddlewareNotUsed
+        instalar()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with perfilar(f'{request.method} {request.path}'):
+            return self.get_response(request)
+
+    def process_template_response(self, request, response):
+        if hasattr(response, 'accepted_renderer'):
+            inicio = time.perf_counter()
+            response.add_post_render_callback(
+                lambda respuesta: sumar_tramo('serializacion', time.perf_counter() - inicio)
+            )
+        return response
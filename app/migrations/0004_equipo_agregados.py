@@ -0,0 +1,60 @@
+# Generated by Django 6.0 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+def rellenar_agregados(apps, schema_editor):
+    """Calcula los agregados de los equipos que ya tienen registros."""
+    Equipo = apps.get_model('app', 'Equipo')
+    RegistroTiempo = apps.get_model('app', 'RegistroTiempo')
+
+    tiempos_por_equipo = {}
+    for team_id, time in RegistroTiempo.objects.values_list('team_id', 'time').iterator():
+        tiempos_por_equipo.setdefault(team_id, []).append(time)
+
+    for team_id, tiempos in tiempos_por_equipo.items():
+        positivos = [t for t in tiempos if t > 0]
+        ausentes = len(tiempos) - len(positivos)
+        Equipo.objects.filter(pk=team_id).update(
+            total_ms=sum(tiempos),
+            best_ms=min(positivos) if positivos else 0,
+            record_count=len(tiempos),
+            absent_count=ausentes,
+            is_disqualified=ausentes > 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_remove_competencia_category_equipo_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipo',
+            name='absent_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Jugadores ausentes'),
+        ),
+        migrations.AddField(
+            model_name='equipo',
+            name='best_ms',
+            field=models.BigIntegerField(default=0, verbose_name='Mejor tiempo (ms)'),
+        ),
+        migrations.AddField(
+            model_name='equipo',
+            name='is_disqualified',
+            field=models.BooleanField(default=False, verbose_name='Descalificado'),
+        ),
+        migrations.AddField(
+            model_name='equipo',
+            name='record_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Nº registros'),
+        ),
+        migrations.AddField(
+            model_name='equipo',
+            name='total_ms',
+            field=models.BigIntegerField(default=0, verbose_name='Tiempo total (ms)'),
+        ),
+        migrations.RunPython(rellenar_agregados, migrations.RunPython.noop),
+    ]
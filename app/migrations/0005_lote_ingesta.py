@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-17 23:49
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_equipo_agregados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteIngesta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('receipt_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Recibo')),
+                ('payload', models.JSONField(verbose_name='Registros enviados')),
+                ('status', models.CharField(choices=[('pendiente', 'Pendiente'), ('confirmado', 'Confirmado'), ('rechazado', 'Rechazado')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Resultado')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de recepción')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de procesamiento')),
+                ('judge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_batches', to='app.juez', verbose_name='Juez')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_batches', to='app.equipo', verbose_name='Equipo')),
+            ],
+            options={
+                'verbose_name': 'Lote de Ingesta',
+                'verbose_name_plural': 'Lotes de Ingesta',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='app_loteing_status_4e5c21_idx')],
+            },
+        ),
+    ]
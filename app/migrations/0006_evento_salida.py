@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 00:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_lote_ingesta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoSalida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=120, unique=True, verbose_name='Clave de deduplicación')),
+                ('payload', models.JSONField(verbose_name='Mensaje')),
+                ('status', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('descartado', 'Descartado')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo intento')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Último error')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de creación')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de envío')),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to='app.competencia', verbose_name='Competencia')),
+            ],
+            options={
+                'verbose_name': 'Evento de Salida',
+                'verbose_name_plural': 'Eventos de Salida',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='app_eventos_status_b88fb4_idx')],
+            },
+        ),
+    ]
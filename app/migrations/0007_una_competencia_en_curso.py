@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 00:21
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def detener_sobrantes(apps, schema_editor):
+    """Deja en curso solo la competencia iniciada más recientemente (requisito del índice)."""
+    Competencia = apps.get_model('app', 'Competencia')
+    en_curso = Competencia.objects.filter(is_running=True).order_by(models.F('started_at').desc(nulls_last=True), '-id')
+    sobrantes = list(en_curso.values_list('id', flat=True)[1:])
+    if sobrantes:
+        Competencia.objects.filter(id__in=sobrantes).update(is_running=False, finished_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_evento_salida'),
+    ]
+
+    operations = [
+        migrations.RunPython(detener_sobrantes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='competencia',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_running', True)), fields=('is_running',), name='una_competencia_en_curso'),
+        ),
+    ]
@@ -7,6 +7,8 @@ from .competencia import Competencia
 from .juez import Juez
 from .equipo import Equipo, ResultadoEquipo
 from .registrotiempo import RegistroTiempo
+from .lote_ingesta import LoteIngesta
+from .evento_salida import EventoSalida
 
 __all__ = [
     'Competencia',
@@ -14,4 +16,6 @@ __all__ = [
     'Equipo',
     'RegistroTiempo',
     'ResultadoEquipo',
+    'LoteIngesta',
+    'EventoSalida',
 ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Exists, Q
 from django.utils import timezone
 
 
@@ -14,63 +16,106 @@ class Competencia(models.Model):
     class Meta:
         verbose_name = "Competencia"
         verbose_name_plural = "Competencias"
+        constraints = [
+            # Índice único parcial (PostgreSQL y SQLite): a lo sumo una fila con is_running=True
+            models.UniqueConstraint(
+                fields=['is_running'],
+                condition=Q(is_running=True),
+                name='una_competencia_en_curso',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def clean(self):
+        """Valida en el formulario del admin que no haya otra competencia en curso"""
+        super().clean()
+        if self.is_running:
+            otra_en_curso = Competencia.objects.filter(is_running=True).exclude(pk=self.pk).first()
+            if otra_en_curso:
+                raise ValidationError({
+                    'is_running': f'La competencia "{otra_en_curso.name}" ya está en curso. Primero debes detenerla.'
+                })
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Estado al cargar: la señal post_save detecta el cambio sin otra consulta
+        instancia._is_running_cargado = instancia.__dict__.get('is_running')
+        return instancia
+
+    def cambiar_estado(self, en_curso: bool) -> bool:
+        """
+        Cambia is_running con un UPDATE condicionado al estado anterior.
+
+        Si otra petición ya hizo la misma transición el UPDATE no afecta filas y
+        no se notifica nada: cada inicio o fin produce un solo evento. El UPDATE
+        no dispara post_save, así que la notificación se registra aquí.
+
+        Al iniciar, el mismo UPDATE exige que no haya otra competencia en curso
+        (NOT EXISTS); si dos inicios concurrentes pasan la condición a la vez,
+        el índice único parcial rechaza al segundo.
+
+        Args:
+            en_curso: True para iniciar, False para detener
+
+        Returns:
+            False si la competencia ya estaba en ese estado o, al iniciar, si
+            hay otra en curso
+        """
+        from app.services.competencia_service import CompetenciaService
+        from app.services.leaderboard_service import LeaderboardService
+        from app.utils.cache_competencias import invalidar_estados_competencias
+
+        ahora = timezone.now()
+        campo_fecha = 'started_at' if en_curso else 'finished_at'
+        filas = Competencia.objects.filter(pk=self.pk, is_running=not en_curso)
+        if en_curso:
+            filas = filas.filter(~Exists(Competencia.objects.filter(is_running=True)))
+
+        try:
+            with transaction.atomic():
+                if not filas.update(is_running=en_curso, **{campo_fecha: ahora}):
+                    return False
+                self.is_running = self._is_running_cargado = en_curso
+                setattr(self, campo_fecha, ahora)
+                CompetenciaService()._notificar_jueces_competencia(self)
+                competencia_id = self.pk
+                transaction.on_commit(lambda: LeaderboardService().tocar(competencia_id))
+                transaction.on_commit(invalidar_estados_competencias)
+        except IntegrityError:
+            # Otro inicio confirmó entre la evaluación del NOT EXISTS y el UPDATE
+            return False
+        return True
+
     def start(self):
         """Inicia la competencia solo si no hay otra en curso"""
         if self.is_running:
             return {'success': False, 'message': 'already_running'}
         
-        # Verificar si hay otra competencia en curso
-        otra_en_curso = Competencia.objects.filter(is_running=True).exclude(id=self.id).first()
-        if otra_en_curso:
-            return {
-                'success': False, 
-                'message': 'another_running',
-                'competencia': otra_en_curso
-            }
-        
-        # Iniciar esta competencia
-        self.is_running = True
-        self.started_at = timezone.now()
-        self.save()
+        # Iniciar en un solo UPDATE condicionado (la notificación va a la bandeja de salida)
+        if self.cambiar_estado(True):
+            return {'success': True, 'message': 'started', 'competencia': self}
         
-        # Notificar por WebSocket usando el servicio
-        from app.services.competencia_service import CompetenciaService
-        service = CompetenciaService()
-        service._notificar_jueces_competencia(
-            competencia_id=self.id,
-            tipo='competencia_iniciada',
-            mensaje='La competencia ha iniciado',
-            competencia_nombre=self.name,
-            en_curso=True,
-            started_at=self.started_at.isoformat() if self.started_at else None
-        )
-        
-        return {'success': True, 'message': 'started', 'competencia': self}
+        # Solo si no se pudo iniciar: averiguar por qué
+        en_curso = Competencia.objects.filter(is_running=True).first()
+        if en_curso is None or en_curso.pk == self.pk:
+            return {'success': False, 'message': 'already_running'}
+        return {
+            'success': False, 
+            'message': 'another_running',
+            'competencia': en_curso
+        }
 
     def stop(self):
         """Detiene la competencia"""
         if not self.is_running:
             return {'success': False, 'message': 'not_running'}
         
-        self.is_running = False
-        self.finished_at = timezone.now()
-        self.save()
-        
-        # Notificar por WebSocket usando el servicio
-        from app.services.competencia_service import CompetenciaService
-        service = CompetenciaService()
-        service._notificar_jueces_competencia(
-            competencia_id=self.id,
-            tipo='competencia_detenida',
-            mensaje='La competencia ha finalizado',
-            competencia_nombre=self.name,
-            en_curso=False,
-            finished_at=self.finished_at.isoformat() if self.finished_at else None
-        )
+        # Detener (la notificación va a la bandeja de salida)
+        if not self.cambiar_estado(False):
+            return {'success': False, 'message': 'not_running'}
         
         return {'success': True, 'message': 'stopped', 'competencia': self}
 
@@ -6,6 +6,23 @@ CATEGORIA_CHOICES = [
 ]
 
 
+def calcular_agregados(tiempos):
+    """
+    Calcula los agregados almacenados en Equipo a partir de sus tiempos en milisegundos.
+    Un tiempo de 0 ms representa a un jugador ausente y descalifica al equipo.
+    """
+    tiempos = list(tiempos)
+    positivos = [t for t in tiempos if t > 0]
+    ausentes = len(tiempos) - len(positivos)
+    return {
+        'total_ms': sum(tiempos),
+        'best_ms': min(positivos) if positivos else 0,
+        'record_count': len(tiempos),
+        'absent_count': ausentes,
+        'is_disqualified': ausentes > 0,
+    }
+
+
 class Equipo(models.Model):
     name = models.CharField(max_length=200, verbose_name="Nombre")
     number = models.PositiveIntegerField(verbose_name="Dorsal")
@@ -32,6 +49,13 @@ class Equipo(models.Model):
         verbose_name='Juez asignado',
     )
 
+    # Agregados desnormalizados: se escriben en la misma transacción que los registros
+    total_ms = models.BigIntegerField(default=0, verbose_name="Tiempo total (ms)")
+    best_ms = models.BigIntegerField(default=0, verbose_name="Mejor tiempo (ms)")
+    record_count = models.PositiveIntegerField(default=0, verbose_name="Nº registros")
+    absent_count = models.PositiveIntegerField(default=0, verbose_name="Jugadores ausentes")
+    is_disqualified = models.BooleanField(default=False, verbose_name="Descalificado")
+
     class Meta:
         unique_together = ('competition', 'number')
         ordering = ['number']
@@ -41,17 +65,20 @@ class Equipo(models.Model):
     def __str__(self):
         return f"{self.name} (Dorsal {self.number})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Juez asignado al cargar: si el equipo se reasigna, se invalida el cache de ambos
+        instancia._judge_id_cargado = instancia.__dict__.get('judge_id')
+        return instancia
+
     def total_time(self):
         """Retorna el tiempo total en milisegundos"""
-        from django.db.models import Sum
-        total = self.times.aggregate(total=Sum('time'))['total']
-        return total or 0
+        return self.total_ms
 
     def average_time(self):
         """Retorna el tiempo promedio en milisegundos"""
-        from django.db.models import Avg
-        promedio = self.times.aggregate(promedio=Avg('time'))['promedio']
-        return int(promedio) if promedio else 0
+        return self.total_ms // self.record_count if self.record_count else 0
 
     def best_time(self):
         """Retorna el mejor registro de tiempo"""
@@ -70,7 +97,19 @@ class Equipo(models.Model):
 
     def records_count(self):
         """Retorna el número de registros"""
-        return self.times.count()
+        return self.record_count
+
+    def recalcular_agregados(self, save=True):
+        """
+        Recalcula los agregados desde los registros de tiempo.
+        Usado tras ediciones en el admin y por el comando recalcular_agregados.
+        """
+        agregados = calcular_agregados(self.times.values_list('time', flat=True))
+        for campo, valor in agregados.items():
+            setattr(self, campo, valor)
+        if save:
+            Equipo.objects.filter(pk=self.pk).update(**agregados)
+        return agregados
 
 
 class ResultadoEquipo(Equipo):
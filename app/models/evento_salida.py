@@ -0,0 +1,55 @@
+from django.db import models
+from django.utils import timezone
+
+ESTADO_EVENTO_CHOICES = [
+    ('pendiente', 'Pendiente'),
+    ('enviado', 'Enviado'),
+    ('descartado', 'Descartado'),
+]
+
+
+class EventoSalida(models.Model):
+    """
+    Notificación de cambio de estado de una competencia (bandeja de salida).
+    Se escribe en la misma transacción que el cambio; un despachador en
+    segundo plano la envía al grupo competencia_{id} y reintenta si falla.
+    """
+    key = models.CharField(
+        max_length=120,
+        unique=True,
+        verbose_name="Clave de deduplicación",
+    )
+
+    competition = models.ForeignKey(
+        'Competencia',
+        on_delete=models.CASCADE,
+        related_name='outbox_events',
+        verbose_name='Competencia',
+    )
+
+    payload = models.JSONField(verbose_name="Mensaje")
+
+    status = models.CharField(
+        max_length=20,
+        choices=ESTADO_EVENTO_CHOICES,
+        default='pendiente',
+        verbose_name="Estado",
+    )
+
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Intentos")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Próximo intento")
+    last_error = models.TextField(blank=True, default='', verbose_name="Último error")
+
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Fecha de creación")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de envío")
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+        verbose_name = "Evento de Salida"
+        verbose_name_plural = "Eventos de Salida"
+
+    def __str__(self):
+        return f"Evento {self.key} - {self.status}"
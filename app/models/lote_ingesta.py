@@ -0,0 +1,61 @@
+from django.db import models
+from django.utils import timezone
+import uuid
+
+ESTADO_LOTE_CHOICES = [
+    ('pendiente', 'Pendiente'),
+    ('confirmado', 'Confirmado'),
+    ('rechazado', 'Rechazado'),
+]
+
+
+class LoteIngesta(models.Model):
+    """
+    Lote de registros aceptado y pendiente de confirmar (cola de ingesta).
+    El juez recibe receipt_id de inmediato; un worker lo procesa después.
+    """
+    receipt_id = models.UUIDField(
+        default=uuid.uuid4,
+        unique=True,
+        editable=False,
+        verbose_name="Recibo"
+    )
+
+    judge = models.ForeignKey(
+        'Juez',
+        on_delete=models.CASCADE,
+        related_name='ingestion_batches',
+        verbose_name='Juez',
+    )
+
+    team = models.ForeignKey(
+        'Equipo',
+        on_delete=models.CASCADE,
+        related_name='ingestion_batches',
+        verbose_name='Equipo',
+    )
+
+    payload = models.JSONField(verbose_name="Registros enviados")
+
+    status = models.CharField(
+        max_length=20,
+        choices=ESTADO_LOTE_CHOICES,
+        default='pendiente',
+        verbose_name="Estado",
+    )
+
+    result = models.JSONField(null=True, blank=True, verbose_name="Resultado")
+
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Fecha de recepción")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de procesamiento")
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+        verbose_name = "Lote de Ingesta"
+        verbose_name_plural = "Lotes de Ingesta"
+
+    def __str__(self):
+        return f"Lote {self.receipt_id} - Equipo: {self.team_id} - {self.status}"
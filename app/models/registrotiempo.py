@@ -62,6 +62,11 @@ class RegistroTiempo(models.Model):
 
     def save(self, *args, **kwargs):
         """Calcula tiempo total desde componentes o viceversa"""
+        self.sincronizar_componentes()
+        return super().save(*args, **kwargs)
+
+    def sincronizar_componentes(self):
+        """Calcula el tiempo total desde los componentes o los componentes desde el total"""
         any_component = any([self.hours, self.minutes, self.seconds, self.milliseconds])
         if any_component:
             total_ms = (
@@ -81,5 +86,3 @@ class RegistroTiempo(models.Model):
             self.minutes = m
             self.seconds = s
             self.milliseconds = ms
-
-        return super().save(*args, **kwargs)
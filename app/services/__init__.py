@@ -5,10 +5,21 @@ Contiene la lógica de negocio de la aplicación organizada en servicios.
 
 from .registro_service import RegistroService
 from .competencia_service import CompetenciaService
-from .results_service import ResultsService
+from .results_service import ResultsService, FilaRanking
+from .leaderboard_service import LeaderboardService
+from .ingesta_service import IngestaService
+from .difusion_service import DifusionService
+from .exportacion_service import ExportacionService
+from .bandeja_salida_service import BandejaSalidaService
 
 __all__ = [
     'RegistroService',
     'CompetenciaService',
     'ResultsService',
+    'FilaRanking',
+    'LeaderboardService',
+    'IngestaService',
+    'DifusionService',
+    'ExportacionService',
+    'BandejaSalidaService',
 ]
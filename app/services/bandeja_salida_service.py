@@ -0,0 +1,266 @@
+"""
+Módulo: bandeja_salida_service
+Bandeja de salida (outbox) transaccional para los cambios de estado de las competencias.
+
+Características:
+- El evento se guarda en EventoSalida dentro de la misma transacción que el
+  cambio de estado: si la transacción se revierte no se notifica nada, y si
+  Redis está lento o caído la petición del admin no espera
+- Clave única por transición: una escritura repetida del mismo cambio queda
+  en una sola fila
+- Despachador en segundo plano que envía al grupo competencia_{id} y
+  reintenta con espera exponencial
+- Reclamar, enviar y marcar van por separado: las filas se reclaman con
+  select_for_update(skip_locked=True) en una transacción corta que les da un
+  plazo (next_attempt_at), el envío ocurre fuera de toda transacción y el
+  resultado se guarda en otra transacción corta
+- Un evento pendiente de una competencia (esperando reintento o reclamado por
+  otro proceso) retiene a los siguientes de esa misma competencia, sin frenar
+  a las demás
+- Cada mensaje lleva evento_id para que los consumers descarten un reenvío
+  (caída entre el envío y el commit, o fallo en una sola de las capas)
+"""
+
+import logging
+import threading
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from app.utils.canales import enviar_a_competencia
+from app.utils.metricas import obtener_medidor
+
+logger = logging.getLogger(__name__)
+
+_despertar = threading.Event()
+_despachador = None
+_despachador_lock = threading.Lock()
+
+
+class BandejaSalidaService:
+    """
+    Servicio para registrar y despachar las notificaciones de estado de las competencias.
+    """
+
+    # Espera máxima entre reintentos de un mismo evento (segundos)
+    ESPERA_MAXIMA = 60
+    # Plazo de un evento reclamado: si el proceso cae antes de marcarlo, otro
+    # lo reenvía pasado este tiempo (los consumers descartan el repetido)
+    PLAZO_RECLAMO = 30
+
+    def registrar_cambio_estado(self, competencia) -> None:
+        """
+        Guarda la notificación del estado actual de la competencia.
+
+        Debe llamarse dentro de la transacción que guarda el cambio: el evento
+        se confirma (y el despachador se despierta) junto con él.
+
+        Args:
+            competencia: Instancia ya guardada de Competencia
+        """
+        from app.models import EventoSalida
+
+        if competencia.is_running:
+            tipo = 'competencia_iniciada'
+            mensaje = 'La competencia ha iniciado'
+            marca = competencia.started_at
+        else:
+            tipo = 'competencia_detenida'
+            mensaje = 'La competencia ha finalizado'
+            marca = competencia.finished_at
+
+        # Sin fecha de la transición (edición manual en el admin) no hay forma
+        # de reconocer una escritura repetida: la clave se hace única
+        clave = f'{competencia.id}:{tipo}:{marca.isoformat() if marca else uuid.uuid4().hex}'
+
+        EventoSalida.objects.bulk_create(
+            [
+                EventoSalida(
+                    key=clave,
+                    competition_id=competencia.id,
+                    payload={
+                        'type': tipo,
+                        'data': {
+                            'mensaje': mensaje,
+                            'competencia_id': competencia.id,
+                            'competencia_nombre': competencia.name,
+                            'en_curso': competencia.is_running,
+                            'started_at': competencia.started_at.isoformat() if competencia.started_at else None,
+                            'finished_at': competencia.finished_at.isoformat() if competencia.finished_at else None,
+                        },
+                    },
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        transaction.on_commit(_despertar.set)
+
+    def despachar_pendientes(self, limite: int = None) -> int:
+        """
+        Envía los eventos pendientes en orden, respetando las esperas de reintento.
+
+        Un evento que falla (o que aún espera su reintento) retiene a los
+        siguientes de la misma competencia, para que los clientes nunca reciban
+        'detenida' antes que el 'iniciada' anterior.
+
+        Args:
+            limite: Eventos reclamados por vuelta (default: SALIDA_EVENTOS_POR_LOTE)
+
+        Returns:
+            Cantidad de eventos reclamados (enviados, reintentados o descartados)
+        """
+        from app.models import EventoSalida
+
+        limite = limite or getattr(settings, 'SALIDA_EVENTOS_POR_LOTE', 50)
+        max_intentos = getattr(settings, 'SALIDA_MAX_INTENTOS', 30)
+        fallos = obtener_medidor('salida_fallos_total', 'Envíos de la bandeja de salida que fallaron', 'counter')
+
+        eventos = self._reclamar(limite)
+        if not eventos:
+            return 0
+
+        # Envío fuera de transacción: ninguna fila queda bloqueada mientras tanto
+        retenidas = set()
+        for evento in eventos:
+            ahora = timezone.now()
+            if evento.competition_id in retenidas:
+                # Detrás de un evento que falló: se libera sin contar el intento
+                evento.next_attempt_at = ahora
+                continue
+
+            try:
+                if not enviar_a_competencia(evento.competition_id, self._mensaje(evento)):
+                    raise RuntimeError('Channel layer no disponible')
+            except Exception as e:
+                fallos.sumar(1)
+                evento.attempts += 1
+                evento.last_error = str(e)
+                if evento.attempts >= max_intentos:
+                    evento.status = 'descartado'
+                    logger.error(
+                        "[SALIDA] Evento %s descartado tras %s intentos: %s",
+                        evento.key, evento.attempts, e,
+                    )
+                else:
+                    espera = min(2 ** evento.attempts, self.ESPERA_MAXIMA)
+                    evento.next_attempt_at = ahora + timedelta(seconds=espera)
+                    retenidas.add(evento.competition_id)
+                    logger.warning(
+                        "[SALIDA] Error enviando %s (intento %s, reintento en %ss): %s",
+                        evento.key, evento.attempts, espera, e,
+                    )
+            else:
+                evento.status = 'enviado'
+                evento.sent_at = ahora
+                logger.debug("[SALIDA] Evento %s enviado", evento.key)
+
+        with transaction.atomic():
+            EventoSalida.objects.bulk_update(
+                eventos, ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at']
+            )
+
+        return len(eventos)
+
+    def _reclamar(self, limite: int) -> List:
+        """
+        Reclama los eventos que se pueden enviar ya, en orden de id.
+
+        Solo entra un evento si todos los pendientes anteriores de su
+        competencia también entran: uno que espera reintento, o que otro
+        proceso tiene reclamado o bloqueado, retiene a los que le siguen.
+
+        Args:
+            limite: Máximo de eventos a reclamar
+
+        Returns:
+            Lista de EventoSalida reclamados por PLAZO_RECLAMO segundos
+        """
+        from app.models import EventoSalida
+
+        ahora = timezone.now()
+        anterior_en_espera = EventoSalida.objects.filter(
+            competition_id=OuterRef('competition_id'),
+            status='pendiente',
+            id__lt=OuterRef('id'),
+            next_attempt_at__gt=ahora,
+        )
+
+        with transaction.atomic():
+            candidatos = list(
+                EventoSalida.objects.select_for_update(skip_locked=True)
+                .filter(status='pendiente', next_attempt_at__lte=ahora)
+                .exclude(Exists(anterior_en_espera))
+                .order_by('id')[:limite]
+            )
+            if not candidatos:
+                return []
+
+            # Un anterior que no está entre los candidatos lo bloqueó otro proceso
+            propios = {evento.id for evento in candidatos}
+            pendientes = (
+                EventoSalida.objects.filter(
+                    status='pendiente',
+                    competition_id__in={evento.competition_id for evento in candidatos},
+                    id__lte=max(propios),
+                )
+                .order_by('id')
+                .values_list('competition_id', 'id')
+            )
+            cortadas = set()
+            reclamados = set()
+            for competencia_id, evento_id in pendientes:
+                if competencia_id in cortadas:
+                    continue
+                if evento_id in propios:
+                    reclamados.add(evento_id)
+                else:
+                    cortadas.add(competencia_id)
+
+            EventoSalida.objects.filter(id__in=reclamados).update(
+                next_attempt_at=ahora + timedelta(seconds=self.PLAZO_RECLAMO)
+            )
+
+        return [evento for evento in candidatos if evento.id in reclamados]
+
+    @staticmethod
+    def _mensaje(evento) -> Dict[str, Any]:
+        mensaje = dict(evento.payload)
+        mensaje['data'] = {**mensaje.get('data', {}), 'evento_id': evento.id}
+        return mensaje
+
+    @classmethod
+    def iniciar_despachador(cls):
+        """
+        Arranca (una sola vez por proceso) el hilo que despacha la bandeja de salida.
+        """
+        global _despachador
+
+        with _despachador_lock:
+            if _despachador is not None and _despachador.is_alive():
+                return
+            _despachador = threading.Thread(target=cls()._bucle_despachador, name='salida-despachador', daemon=True)
+            _despachador.start()
+        logger.info("[SALIDA] Despachador de la bandeja de salida iniciado")
+
+    def _bucle_despachador(self):
+        limite = getattr(settings, 'SALIDA_EVENTOS_POR_LOTE', 50)
+
+        while True:
+            # Despierta tras cada commit con eventos; el timeout recoge los
+            # reintentos y lo escrito por otros procesos (comandos, otro worker)
+            _despertar.wait(timeout=2)
+            _despertar.clear()
+
+            close_old_connections()
+            try:
+                while self.despachar_pendientes(limite) == limite:
+                    pass
+            except Exception as e:
+                logger.error("[SALIDA] Error despachando la bandeja de salida: %s", e, exc_info=True)
+            finally:
+                close_old_connections()
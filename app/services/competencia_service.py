@@ -4,24 +4,20 @@ Responsable de la gestión del estado de las competencias.
 
 Características:
 - Iniciar/detener competencias
-- Notificar cambios de estado a jueces conectados
+- Notificar cambios de estado a jueces conectados (bandeja de salida transaccional)
 - Validar transiciones de estado
 """
 
-from django.utils import timezone
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 from typing import Dict, Any
 
+from .bandeja_salida_service import BandejaSalidaService
+
 
 class CompetenciaService:
     """
     Servicio para gestionar el ciclo de vida de las competencias.
     """
     
-    def __init__(self):
-        self.channel_layer = get_channel_layer()
-    
     def iniciar_competencia(self, competencia_id: int) -> Dict[str, Any]:
         """
         Inicia una competencia y notifica a todos los jueces conectados.
@@ -49,29 +45,20 @@ class CompetenciaService:
                     'error': 'La competencia no está activa'
                 }
             
-            # Verificar si hay otra competencia en curso
-            otra_en_curso = Competencia.objects.filter(is_running=True).exclude(id=competencia_id).first()
-            if otra_en_curso:
+            # Iniciar en un solo UPDATE condicionado (notifica vía bandeja de salida)
+            if not competencia.cambiar_estado(True):
+                # Solo si no se pudo iniciar: averiguar si hay otra en curso
+                otra_en_curso = Competencia.objects.filter(is_running=True).exclude(id=competencia_id).first()
+                if otra_en_curso:
+                    return {
+                        'exito': False,
+                        'error': f'No se puede iniciar. La competencia "{otra_en_curso.name}" ya está en curso. Primero debes detenerla.'
+                    }
                 return {
                     'exito': False,
-                    'error': f'No se puede iniciar. La competencia "{otra_en_curso.name}" ya está en curso. Primero debes detenerla.'
+                    'error': 'La competencia ya está en curso'
                 }
             
-            # Iniciar competencia
-            competencia.is_running = True
-            competencia.started_at = timezone.now()
-            competencia.save()
-            
-            # Notificar a todos los jueces de esta competencia
-            self._notificar_jueces_competencia(
-                competencia_id=competencia.id,
-                tipo='competencia_iniciada',
-                mensaje='La competencia ha iniciado',
-                competencia_nombre=competencia.name,
-                en_curso=True,
-                started_at=competencia.started_at.isoformat() if competencia.started_at else None
-            )
-            
             return {
                 'exito': True,
                 'competencia': competencia
@@ -109,21 +96,12 @@ class CompetenciaService:
                     'error': 'La competencia no está en curso'
                 }
             
-            # Detener competencia
-            competencia.is_running = False
-            competencia.finished_at = timezone.now()
-            competencia.save()
-            
-            # Notificar a todos los jueces de esta competencia
-            self._notificar_jueces_competencia(
-                competencia_id=competencia.id,
-                tipo='competencia_detenida',
-                mensaje='La competencia ha finalizado',
-                competencia_nombre=competencia.name,
-                en_curso=False,
-                started_at=competencia.started_at.isoformat() if competencia.started_at else None,
-                finished_at=competencia.finished_at.isoformat() if competencia.finished_at else None
-            )
+            # Detener competencia (UPDATE condicionado; notifica vía bandeja de salida)
+            if not competencia.cambiar_estado(False):
+                return {
+                    'exito': False,
+                    'error': 'La competencia no está en curso'
+                }
             
             return {
                 'exito': True,
@@ -141,45 +119,16 @@ class CompetenciaService:
                 'error': f'Error al detener competencia: {str(e)}'
             }
     
-    def _notificar_jueces_competencia(
-        self,
-        competencia_id: int,
-        tipo: str,
-        mensaje: str,
-        competencia_nombre: str,
-        en_curso: bool,
-        started_at: str = None,
-        finished_at: str = None
-    ):
+    def _notificar_jueces_competencia(self, competencia):
         """
-        Notifica a todos los jueces de una competencia sobre un cambio de estado.
+        Registra en la bandeja de salida la notificación del estado actual de la competencia.
+        
+        Se envía a los jueces y espectadores después del commit (ver BandejaSalidaService).
         
         Args:
-            competencia_id: ID de la competencia
-            tipo: Tipo de evento ('competencia_iniciada' o 'competencia_detenida')
-            mensaje: Mensaje descriptivo
-            competencia_nombre: Nombre de la competencia
-            en_curso: Estado de la competencia
+            competencia: Instancia de Competencia ya guardada
         """
-        if not self.channel_layer:
-            return
-        
-        group_name = f'competencia_{competencia_id}'
-        
-        async_to_sync(self.channel_layer.group_send)(
-            group_name,
-            {
-                'type': tipo,
-                'data': {
-                    'mensaje': mensaje,
-                    'competencia_id': competencia_id,
-                    'competencia_nombre': competencia_nombre,
-                    'en_curso': en_curso,
-                    'started_at': started_at,
-                    'finished_at': finished_at,
-                }
-            }
-        )
+        BandejaSalidaService().registrar_cambio_estado(competencia)
     
     def obtener_estado_competencia(self, competencia_id: int) -> Dict[str, Any]:
         """
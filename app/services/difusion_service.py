@@ -0,0 +1,208 @@
+"""
+Módulo: difusion_service
+Difusión agrupada de actualizaciones de resultados a los grupos competencia_{id}.
+
+Características:
+- Agrupa las actualizaciones de cada competencia durante una ventana (DIFUSION_VENTANA_MS)
+- Un solo evento por ventana con todos los equipos afectados y los deltas fusionados
+- Limita el ritmo por grupo: como máximo un mensaje por ventana, también entre
+  procesos (la ranura de cada ventana se reserva en el cache compartido)
+- Evita llenar la capacidad del channel layer en ráfagas de llegadas
+- Un solo hilo programador vacía las ventanas de todas las competencias
+"""
+
+import heapq
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from app.utils.cache_fragmentos import ERRORES_CACHE
+from app.utils.canales import enviar_a_competencia
+from .leaderboard_service import combinar_deltas
+
+logger = logging.getLogger(__name__)
+
+# competencia_id -> lista de (resumen_equipo, delta) pendientes de enviar
+_pendientes: Dict[int, List] = {}
+_lock = threading.Lock()
+
+# Vida de las claves de ranura en el cache (solo deben sobrevivir a su ventana)
+PLAZO_RANURA_S = 60
+
+
+def _cache():
+    return caches[getattr(settings, 'DIFUSION_CACHE_ALIAS', 'default')]
+
+
+def _esperar_ranura(competencia_id: int, ventana: float) -> float:
+    """
+    Reserva la ranura actual de la competencia en el cache compartido.
+
+    El tiempo se divide en ranuras de `ventana` segundos (reloj de pared, igual
+    en todos los procesos) y cache.add deja que un solo proceso envíe en cada
+    una. Si el cache no responde, se envía sin reserva (límite por proceso).
+
+    Returns:
+        0 si la ranura quedó reservada; si no, segundos hasta la siguiente
+    """
+    ahora = time.time()
+    ranura = int(ahora // ventana)
+    try:
+        if not _cache().add(f'difusion:{competencia_id}:{ranura}', 1, PLAZO_RANURA_S):
+            return (ranura + 1) * ventana - ahora
+    except ERRORES_CACHE as e:
+        logger.warning("[WS] Cache no disponible reservando la difusión de competencia_%s: %s", competencia_id, e)
+    return 0
+
+
+class Programador:
+    """
+    Ejecuta acciones diferidas por competencia desde un único hilo.
+
+    Reemplaza un threading.Timer (un hilo del sistema) por ventana: las
+    ventanas vencidas se vacían en orden desde el mismo hilo, que se crea
+    con la primera programación.
+    """
+
+    def __init__(self, accion: Callable[[int], None], reloj: Callable[[], float] = time.monotonic):
+        self._accion = accion
+        self._reloj = reloj
+        self._cola: List = []
+        self._condicion = threading.Condition()
+        self._hilo = None
+
+    def programar(self, demora: float, competencia_id: int):
+        """
+        Programa la acción de una competencia dentro de `demora` segundos.
+
+        Args:
+            demora: Segundos de espera
+            competencia_id: ID de la competencia (argumento de la acción)
+        """
+        with self._condicion:
+            heapq.heappush(self._cola, (self._reloj() + demora, competencia_id))
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._correr, name='difusion', daemon=True)
+                self._hilo.start()
+            self._condicion.notify()
+
+    def tomar_vencidas(self) -> List[int]:
+        """Retira de la cola las competencias cuya espera ya terminó."""
+        ahora = self._reloj()
+        vencidas = []
+        with self._condicion:
+            while self._cola and self._cola[0][0] <= ahora:
+                vencidas.append(heapq.heappop(self._cola)[1])
+        return vencidas
+
+    def ejecutar_vencidas(self):
+        """Ejecuta la acción de cada competencia vencida; un fallo no detiene al resto."""
+        for competencia_id in self.tomar_vencidas():
+            try:
+                self._accion(competencia_id)
+            except Exception as e:
+                logger.error("[WS] Error en la difusión de competencia_%s: %s", competencia_id, e, exc_info=True)
+
+    def _correr(self):
+        while True:
+            with self._condicion:
+                espera = self._cola[0][0] - self._reloj() if self._cola else None
+                if espera is None or espera > 0:
+                    self._condicion.wait(espera)
+                    continue
+            self.ejecutar_vencidas()
+
+
+class DifusionService:
+    """
+    Servicio para publicar resultados confirmados a los clientes conectados.
+    """
+
+    def publicar_registros(self, competencia_id: int, equipo: Dict[str, Any], delta: Optional[Dict[str, Any]] = None):
+        """
+        Encola la actualización de un equipo para el próximo envío de su competencia.
+
+        Args:
+            competencia_id: ID de la competencia
+            equipo: Resumen del equipo (equipo_id, equipo_nombre, equipo_dorsal,
+                total_registros, tiempo_total)
+            delta: Delta del leaderboard (None si no pudo aplicarse)
+        """
+        ventana = getattr(settings, 'DIFUSION_VENTANA_MS', 250) / 1000
+        if ventana <= 0:
+            self._enviar(competencia_id, [(equipo, delta)])
+            return
+
+        with _lock:
+            pendientes = _pendientes.get(competencia_id)
+            if pendientes is not None:
+                # Ya hay un envío programado para esta ventana
+                pendientes.append((equipo, delta))
+                return
+            _pendientes[competencia_id] = [(equipo, delta)]
+
+        _programador.programar(ventana, competencia_id)
+
+    def vaciar(self, competencia_id: int):
+        """
+        Envía lo acumulado en la ventana de una competencia (lo llama el programador).
+
+        Si otro proceso ya envió en la ranura actual, lo acumulado espera a la
+        siguiente y sigue sumando las actualizaciones que lleguen mientras tanto.
+
+        Args:
+            competencia_id: ID de la competencia
+        """
+        if competencia_id not in _pendientes:
+            return
+        ventana = getattr(settings, 'DIFUSION_VENTANA_MS', 250) / 1000
+        if ventana > 0:
+            espera = _esperar_ranura(competencia_id, ventana)
+            if espera > 0:
+                _programador.programar(espera, competencia_id)
+                return
+
+        with _lock:
+            pendientes = _pendientes.pop(competencia_id, [])
+        if pendientes:
+            self._enviar(competencia_id, pendientes)
+
+    def _enviar(self, competencia_id: int, pendientes: List):
+        """
+        Envía un único evento registros_actualizados con todo lo acumulado.
+        """
+        equipos = {}
+        deltas = []
+        for equipo, delta in pendientes:
+            equipos[equipo['equipo_id']] = equipo
+            if delta:
+                deltas.append(delta)
+        # Los hilos pueden encolar en distinto orden del que aplicaron
+        deltas.sort(key=lambda d: d['secuencia'])
+
+        try:
+            enviado = enviar_a_competencia(
+                competencia_id,
+                {
+                    'type': 'registros_actualizados',
+                    'data': {
+                        'competencia_id': competencia_id,
+                        'equipo_ids': list(equipos),
+                        'equipos': list(equipos.values()),
+                        'deltas': combinar_deltas(deltas),
+                        # Algún equipo sin delta: los clientes deben refrescar
+                        'incompleto': len(deltas) < len(pendientes),
+                    }
+                }
+            )
+            if enviado:
+                logger.info("[WS] Notificación enviada a competencia_%s (%s equipo(s))", competencia_id, len(equipos))
+        except Exception as e:
+            logger.warning("[WS] No se pudo notificar por WebSocket: %s", e)
+
+
+_programador = Programador(lambda competencia_id: DifusionService().vaciar(competencia_id))
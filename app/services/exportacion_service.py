@@ -0,0 +1,217 @@
+"""
+Módulo: exportacion_service
+Exportación en CSV de resultados y registros de tiempo, en streaming.
+
+Características:
+- Las filas se leen con iterator(chunk_size=...) (cursor del lado del
+  servidor en PostgreSQL): nunca se carga la exportación completa en memoria
+- El CSV se genera por bloques de filas
+- Bajo ASGI la respuesta usa un iterador asíncrono: Daphne no bufferiza el
+  archivo y cada bloque se lee en el hilo de la petición (mismo cursor) sin
+  bloquear el event loop entre bloques. Bajo WSGI el iterador es síncrono
+  (Django leería entero un iterador asíncrono antes de enviarlo)
+- Varias competencias en un mismo archivo (historial de eventos)
+- Los textos que una hoja de cálculo interpretaría como fórmula (nombres de
+  equipo o competencia que empiezan con =, +, -, @) se escriben con un ' delante
+"""
+
+import csv
+from typing import Iterable, Iterator, List, Sequence
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from app.models.equipo import CATEGORIA_CHOICES
+from app.utils.timestamps import formatear_tiempo_ms
+from .results_service import ResultsService
+
+CATEGORIAS_DISPLAY = dict(CATEGORIA_CHOICES)
+
+# Primeros caracteres con los que Excel/LibreOffice evalúan una celda como fórmula
+INICIOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _celda_segura(valor):
+    """Antepone ' a los textos que se abrirían como fórmula (inyección CSV)."""
+    if isinstance(valor, str) and valor.startswith(INICIOS_FORMULA):
+        return "'" + valor
+    return valor
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: retorna lo escrito en lugar de guardarlo."""
+
+    def write(self, valor):
+        return valor
+
+
+class ExportacionService:
+    """
+    Servicio para exportar resultados y registros de tiempo a CSV.
+    """
+
+    # Filas por lectura del cursor y por bloque enviado al cliente
+    FILAS_POR_BLOQUE = 2000
+
+    ENCABEZADO_RESULTADOS = [
+        'competencia', 'posicion_general', 'posicion_categoria', 'dorsal', 'equipo',
+        'categoria', 'estado', 'tiempo_total', 'tiempo_total_ms', 'mejor_tiempo',
+        'mejor_tiempo_ms', 'registros', 'ausentes',
+    ]
+
+    ENCABEZADO_REGISTROS = [
+        'competencia', 'dorsal', 'equipo', 'categoria', 'id_registro',
+        'tiempo', 'tiempo_ms', 'creado',
+    ]
+
+    ESTADOS = {
+        ResultsService.GRUPO_CALIFICADO: 'calificado',
+        ResultsService.GRUPO_DESCALIFICADO: 'descalificado',
+        ResultsService.GRUPO_SIN_REGISTROS: 'sin registros',
+    }
+
+    def filas_resultados(self, competencia_ids: Sequence[int]) -> Iterator[List]:
+        """
+        Ranking de cada competencia (mismo motor que la API y el admin).
+
+        Args:
+            competencia_ids: IDs de las competencias a exportar
+
+        Returns:
+            Iterador de filas en el orden de ENCABEZADO_RESULTADOS
+        """
+        from app.models import Equipo
+
+        equipos = Equipo.objects.filter(competition_id__in=competencia_ids)
+        filas = ResultsService.anotar_ranking(equipos).order_by(
+            'competition__datetime', 'competition_id', 'rk_grupo', 'rk_total', 'number',
+        ).values_list(
+            'competition__name', 'number', 'name', 'category',
+            'rk_total', 'rk_mejor', 'rk_registros', 'rk_ausentes',
+            'rk_grupo', 'rk_posicion_categoria', 'rk_posicion_general',
+        )
+
+        for (competencia, dorsal, nombre, categoria, total, mejor, registros,
+             ausentes, grupo, pos_categoria, pos_general) in filas.iterator(chunk_size=self.FILAS_POR_BLOQUE):
+            calificado = grupo == ResultsService.GRUPO_CALIFICADO
+            yield [
+                competencia,
+                pos_general if calificado else '',
+                pos_categoria if calificado else '',
+                dorsal,
+                nombre,
+                CATEGORIAS_DISPLAY.get(categoria, categoria),
+                self.ESTADOS.get(grupo, ''),
+                formatear_tiempo_ms(total, 'corto') if registros else '',
+                total,
+                formatear_tiempo_ms(mejor, 'corto') if mejor else '',
+                mejor,
+                registros,
+                ausentes,
+            ]
+
+    def filas_registros(self, competencia_ids: Sequence[int]) -> Iterator[List]:
+        """
+        Registros de tiempo crudos de cada competencia, por equipo y tiempo.
+
+        Args:
+            competencia_ids: IDs de las competencias a exportar
+
+        Returns:
+            Iterador de filas en el orden de ENCABEZADO_REGISTROS
+        """
+        from app.models import RegistroTiempo
+
+        filas = RegistroTiempo.objects.filter(
+            team__competition_id__in=competencia_ids,
+        ).order_by(
+            'team__competition__datetime', 'team__competition_id', 'team__number', 'time',
+        ).values_list(
+            'team__competition__name', 'team__number', 'team__name', 'team__category',
+            'record_id', 'time', 'created_at',
+        )
+
+        for (competencia, dorsal, nombre, categoria, record_id, tiempo,
+             creado) in filas.iterator(chunk_size=self.FILAS_POR_BLOQUE):
+            yield [
+                competencia,
+                dorsal,
+                nombre,
+                CATEGORIAS_DISPLAY.get(categoria, categoria),
+                str(record_id),
+                formatear_tiempo_ms(tiempo, 'corto'),
+                tiempo,
+                creado.isoformat(),
+            ]
+
+    def bloques_csv(self, encabezado: List[str], filas: Iterable[List]) -> Iterator[bytes]:
+        """
+        Convierte las filas en bloques de CSV codificados en UTF-8.
+
+        El primer bloque lleva BOM para que Excel reconozca la codificación.
+        Las celdas de texto pasan por _celda_segura.
+        """
+        escritor = csv.writer(_Eco())
+        bloque = ['\ufeff', escritor.writerow(encabezado)]
+        for fila in filas:
+            bloque.append(escritor.writerow([_celda_segura(valor) for valor in fila]))
+            if len(bloque) >= self.FILAS_POR_BLOQUE:
+                yield ''.join(bloque).encode('utf-8')
+                bloque = []
+        if bloque:
+            yield ''.join(bloque).encode('utf-8')
+
+    def respuesta_csv(self, nombre_archivo: str, encabezado: List[str], filas: Iterable[List],
+                      asincrono: bool = False) -> StreamingHttpResponse:
+        """
+        Respuesta HTTP en streaming con el CSV como adjunto.
+
+        Args:
+            nombre_archivo: Nombre sugerido para la descarga
+            encabezado: Nombres de columna
+            filas: Iterador de filas (se consume bloque a bloque)
+            asincrono: True si la petición llegó por ASGI (ver es_peticion_asgi)
+
+        Returns:
+            StreamingHttpResponse con contenido asíncrono (ASGI) o síncrono (WSGI)
+        """
+        bloques = self.bloques_csv(encabezado, filas)
+        contenido = _iterar_en_hilo(bloques) if asincrono else bloques
+        respuesta = StreamingHttpResponse(contenido, content_type='text/csv; charset=utf-8')
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+        return respuesta
+
+    def exportar_resultados(self, competencia_ids: Sequence[int], nombre_archivo: str = 'resultados.csv',
+                            asincrono: bool = False) -> StreamingHttpResponse:
+        """Respuesta en streaming con el ranking de las competencias."""
+        return self.respuesta_csv(
+            nombre_archivo, self.ENCABEZADO_RESULTADOS, self.filas_resultados(competencia_ids), asincrono
+        )
+
+    def exportar_registros(self, competencia_ids: Sequence[int], nombre_archivo: str = 'registros.csv',
+                           asincrono: bool = False) -> StreamingHttpResponse:
+        """Respuesta en streaming con los registros de tiempo de las competencias."""
+        return self.respuesta_csv(
+            nombre_archivo, self.ENCABEZADO_REGISTROS, self.filas_registros(competencia_ids), asincrono
+        )
+
+
+def es_peticion_asgi(request) -> bool:
+    """True si la petición la sirve el handler ASGI (Daphne); False bajo WSGI."""
+    return isinstance(request, ASGIRequest)
+
+
+async def _iterar_en_hilo(iterador: Iterator[bytes]):
+    """
+    Recorre un iterador síncrono (con acceso a la base de datos) desde código async.
+
+    Cada bloque se pide con sync_to_async en modo thread_sensitive: todos caen
+    en el hilo de la petición, que es el dueño de la conexión y del cursor.
+    """
+    siguiente = sync_to_async(lambda: next(iterador, None))
+    try:
+        while (bloque := await siguiente()) is not None:
+            yield bloque
+    finally:
+        await sync_to_async(iterador.close)()
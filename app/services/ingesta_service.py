@@ -0,0 +1,252 @@
+"""
+Módulo: ingesta_service
+Cola de ingesta durable para los lotes de tiempos de los jueces.
+
+Características:
+- Validación barata en la petición y acuse inmediato con número de recibo
+- Lotes persistidos en LoteIngesta antes de responder (sobreviven a reinicios)
+- Worker en segundo plano que confirma varios lotes por transacción
+- Confirmación por WebSocket al grupo juez_{id} cuando el lote se guarda
+
+Activación: INGESTA_MODO=cola (por defecto 'directa', que guarda en la petición).
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from app.utils.metricas import database_sync_to_async_medido, medir
+
+from .registro_service import RegistroService
+
+logger = logging.getLogger(__name__)
+
+_despertar = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def modo_cola() -> bool:
+    """Indica si los lotes se encolan en lugar de guardarse en la petición."""
+    return getattr(settings, 'INGESTA_MODO', 'directa') == 'cola'
+
+
+class IngestaService:
+    """
+    Servicio para encolar lotes de registros y confirmarlos en segundo plano.
+    """
+
+    def encolar_lote_sync(self, juez, equipo_id: int, registros: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Valida el lote de forma barata y lo persiste en la cola.
+
+        Comprueba la forma del lote (equipo_id entero y cada registro con
+        RegistroService.validar_registro), la asignación del equipo (desde el
+        cache de jueces) y que la competencia esté en curso; el resto de
+        validaciones las aplica el worker con la misma lógica que el modo directo.
+        Un lote que no pasa estas comprobaciones no se encola.
+
+        Args:
+            juez: Instancia del modelo Juez
+            equipo_id: ID del equipo
+            registros: Lista de diccionarios con datos de registros
+
+        Returns:
+            Dict con 'exito' y 'recibo', o 'error' y 'motivo'
+            ('datos_invalidos', 'equipo_ajeno' o 'competencia_detenida')
+        """
+        from app.models import Competencia, LoteIngesta
+        from app.utils.cache_jueces import obtener_juez
+
+        error = self._validar_lote(equipo_id, registros)
+        if error:
+            return {
+                'exito': False,
+                'motivo': 'datos_invalidos',
+                'error': error,
+            }
+        equipo_id = int(equipo_id)
+
+        equipos_asignados = getattr(juez, 'equipos_asignados', None)
+        if equipos_asignados is None:
+            juez_cacheado = obtener_juez(juez.id)
+            equipos_asignados = juez_cacheado.equipos_asignados if juez_cacheado else []
+
+        competencia_id = dict(equipos_asignados).get(equipo_id)
+        if competencia_id is None:
+            return {
+                'exito': False,
+                'motivo': 'equipo_ajeno',
+                'error': 'Este equipo no te pertenece',
+            }
+
+        if not Competencia.objects.filter(pk=competencia_id, is_running=True).exists():
+            return {
+                'exito': False,
+                'motivo': 'competencia_detenida',
+                'error': 'La competencia no está en curso',
+            }
+
+        lote = LoteIngesta.objects.create(judge_id=juez.id, team_id=equipo_id, payload=registros)
+        transaction.on_commit(_despertar.set)
+
+        logger.info("[INGESTA] Lote encolado: recibo=%s equipo=%s juez=%s", lote.receipt_id, equipo_id, juez.id)
+        return {
+            'exito': True,
+            'recibo': str(lote.receipt_id),
+            'estado': lote.status,
+            'equipo_id': equipo_id,
+        }
+
+    def _validar_lote(self, equipo_id, registros) -> Optional[str]:
+        """Mensaje de error si el lote no tiene la forma esperada, o None."""
+        if isinstance(equipo_id, bool):
+            return 'equipo_id debe ser un entero'
+        try:
+            int(equipo_id)
+        except (TypeError, ValueError):
+            return 'equipo_id debe ser un entero'
+
+        maximo = RegistroService.MAX_REGISTROS_POR_EQUIPO
+        if not isinstance(registros, list) or not registros or len(registros) > maximo:
+            return f'registros debe ser una lista de 1 a {maximo} registros'
+        for indice, reg in enumerate(registros):
+            error = RegistroService.validar_registro(reg)
+            if error:
+                return f'Registro {indice}: {error}'
+        return None
+
+    @database_sync_to_async_medido
+    def encolar_lote(self, juez, equipo_id: int, registros: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Versión ASÍNCRONA de encolar_lote para uso desde WebSocket.
+        """
+        return self.encolar_lote_sync(juez, equipo_id, registros)
+
+    def procesar_pendientes(self, limite: int = None) -> int:
+        """
+        Confirma hasta `limite` lotes pendientes en una sola transacción.
+
+        Cada lote se guarda con RegistroService (mismas reglas que el modo
+        directo) dentro de su propio savepoint; el commit es uno por grupo.
+        Un lote que lanza una excepción se revierte solo y queda 'rechazado'
+        con el error en su resultado, sin bloquear al resto de la cola.
+        Con varios workers, skip_locked evita que dos procesen el mismo lote.
+
+        Args:
+            limite: Máximo de lotes por transacción (default: INGESTA_LOTES_POR_COMMIT)
+
+        Returns:
+            Número de lotes procesados
+        """
+        from app.models import LoteIngesta
+
+        if limite is None:
+            limite = getattr(settings, 'INGESTA_LOTES_POR_COMMIT', 50)
+
+        servicio = RegistroService()
+        with medir('ingesta_commit_segundos', 'Transacción de un grupo de lotes de la cola hasta el commit'), transaction.atomic():
+            lotes = list(
+                LoteIngesta.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('judge')
+                .filter(status='pendiente')
+                .order_by('id')[:limite]
+            )
+            if not lotes:
+                return 0
+
+            ahora = timezone.now()
+            for lote in lotes:
+                try:
+                    with transaction.atomic():
+                        resultado = servicio._registrar_batch_impl(lote.judge, lote.team_id, lote.payload)
+                    rechazado = resultado['total_guardados'] == 0 and resultado['total_fallidos'] > 0
+                except Exception as e:
+                    logger.error("[INGESTA] Lote %s rechazado por error: %s", lote.receipt_id, e, exc_info=True)
+                    registros = lote.payload if isinstance(lote.payload, list) else []
+                    resultado = servicio._rechazar_lote(registros, f'Error procesando el lote: {e}', 'error_procesamiento')
+                    rechazado = True
+                lote.status = 'rechazado' if rechazado else 'confirmado'
+                lote.result = resultado
+                lote.processed_at = ahora
+
+            LoteIngesta.objects.bulk_update(lotes, ['status', 'result', 'processed_at'])
+            transaction.on_commit(lambda: self._notificar_lotes(lotes))
+
+        logger.info("[INGESTA] %s lote(s) confirmados en una transacción", len(lotes))
+        return len(lotes)
+
+    def _notificar_lotes(self, lotes):
+        """
+        Envía a cada juez la confirmación (o rechazo) de sus lotes.
+        Se ejecuta después del commit.
+        """
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            return
+
+        for lote in lotes:
+            resultado = lote.result or {}
+            try:
+                async_to_sync(channel_layer.group_send)(
+                    f'juez_{lote.judge_id}',
+                    {
+                        'type': 'lote_confirmado' if lote.status == 'confirmado' else 'lote_rechazado',
+                        'data': {
+                            'recibo': str(lote.receipt_id),
+                            'equipo_id': lote.team_id,
+                            'estado': lote.status,
+                            'total_guardados': resultado.get('total_guardados', 0),
+                            'total_fallidos': resultado.get('total_fallidos', 0),
+                            'registros_fallidos': resultado.get('registros_fallidos', []),
+                        }
+                    }
+                )
+            except Exception as e:
+                logger.warning("[INGESTA] No se pudo notificar el lote %s: %s", lote.receipt_id, e)
+
+    @classmethod
+    def iniciar_worker(cls):
+        """
+        Arranca (una sola vez por proceso) el hilo que procesa la cola.
+
+        Corre dentro del proceso del servidor para que el leaderboard en
+        memoria reciba los equipos confirmados. No hace nada en modo directo.
+        """
+        global _worker
+
+        if not modo_cola():
+            return
+        with _worker_lock:
+            if _worker is not None and _worker.is_alive():
+                return
+            _worker = threading.Thread(target=cls()._bucle_worker, name='ingesta-worker', daemon=True)
+            _worker.start()
+        logger.info("[INGESTA] Worker de ingesta iniciado")
+
+    def _bucle_worker(self):
+        ventana = getattr(settings, 'INGESTA_VENTANA_MS', 50) / 1000
+        limite = getattr(settings, 'INGESTA_LOTES_POR_COMMIT', 50)
+
+        while True:
+            # Despierta al encolar; el timeout recoge lotes que quedaron de un reinicio
+            _despertar.wait(timeout=5)
+            _despertar.clear()
+            # Esperar un instante para agrupar los lotes que llegan a la vez
+            time.sleep(ventana)
+
+            close_old_connections()
+            try:
+                while self.procesar_pendientes(limite) == limite:
+                    pass
+            except Exception as e:
+                logger.error("[INGESTA] Error procesando la cola: %s", e, exc_info=True)
+            finally:
+                close_old_connections()
@@ -0,0 +1,658 @@
+"""
+Módulo: leaderboard_service
+Responsable de mantener la tabla de posiciones de cada competencia en memoria.
+
+Características:
+- Reconstrucción completa solo en arranque en frío o tras ediciones del admin
+- Actualización incremental al confirmarse el batch de un equipo
+- Posiciones por categoría ya calculadas para las vistas públicas
+- Generación y secuencia compartidas en el cache: con varios procesos, cada uno
+  detecta que su copia quedó atrás y aplica los equipos que le faltan desde
+  el cache; solo la reconstruye si alguno no aparece
+- Un lock por competencia: reconstruir una no bloquea a las demás
+- Si el cache compartido no responde, las lecturas usan la copia local
+"""
+
+import bisect
+import itertools
+import logging
+import threading
+import time
+from dataclasses import astuple, dataclass, replace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from app.models.equipo import CATEGORIA_CHOICES, calcular_agregados
+from app.utils.cache_fragmentos import ERRORES_CACHE
+
+logger = logging.getLogger(__name__)
+
+CATEGORIAS_DISPLAY = dict(CATEGORIA_CHOICES)
+
+_leaderboards: Dict[int, 'Leaderboard'] = {}
+_locks_competencia: Dict[int, threading.RLock] = {}
+_lock = threading.Lock()
+
+# Entradas aplicadas por cada proceso, por secuencia (solo con WEB_WORKERS > 1)
+ENTRADAS_TIMEOUT = 600
+# Una entrada que otro proceso aún no escribió se espera hasta
+# REINTENTOS_HUECO veces antes de reconstruir desde la base de datos
+REINTENTOS_HUECO = 3
+ESPERA_HUECO_S = 0.01
+# Con más entradas pendientes que esto, reconstruir es más barato
+MAX_ENTRADAS_PENDIENTES = 500
+
+
+def _cache():
+    return caches[getattr(settings, 'LEADERBOARD_CACHE_ALIAS', 'default')]
+
+
+def _claves_compartidas(competencia_id: int) -> Tuple[str, str]:
+    return f'leaderboard:{competencia_id}:generacion', f'leaderboard:{competencia_id}:secuencia'
+
+
+def _leer_estado_compartido(competencia_id: int) -> Optional[Tuple[int, int]]:
+    """
+    Retorna (generacion, secuencia) de la competencia, comunes a todos los procesos.
+
+    La generación arranca en el instante actual (ms) para que, si el cache se
+    vacía, no se repitan versiones ya entregadas como ETag.
+
+    Returns:
+        None si el cache no responde (estado desconocido)
+    """
+    clave_generacion, clave_secuencia = _claves_compartidas(competencia_id)
+    cache = _cache()
+    try:
+        valores = cache.get_many([clave_generacion, clave_secuencia])
+        generacion = valores.get(clave_generacion)
+        if generacion is None:
+            cache.add(clave_generacion, int(time.time() * 1000), timeout=None)
+            generacion = cache.get(clave_generacion, 0)
+    except ERRORES_CACHE as e:
+        logger.warning("[LEADERBOARD] Cache no disponible leyendo la versión de %s: %s", competencia_id, e)
+        return None
+    return generacion, valores.get(clave_secuencia, 0)
+
+
+def _lock_competencia(competencia_id: int) -> threading.RLock:
+    """Lock de la competencia: ordena reconstrucciones y batches de esa competencia."""
+    with _lock:
+        return _locks_competencia.setdefault(competencia_id, threading.RLock())
+
+
+def _clave_entrada(competencia_id: int, secuencia: int) -> str:
+    return f'leaderboard:{competencia_id}:entrada:{secuencia}'
+
+
+def _varios_procesos() -> bool:
+    return getattr(settings, 'WEB_WORKERS', 1) > 1
+
+
+def _incrementar_compartido(clave: str, inicial: int = 0) -> int:
+    """Incremento atómico en el cache compartido (crea la clave si no existe)."""
+    cache = _cache()
+    cache.add(clave, inicial, timeout=None)
+    return cache.incr(clave)
+
+
+def _formatear_hms(tiempo_ms: int) -> str:
+    """Formatea milisegundos como HH:MM:SS (sin milisegundos)."""
+    total_seconds = tiempo_ms // 1000
+    s = total_seconds % 60
+    total_minutes = total_seconds // 60
+    m = total_minutes % 60
+    h = total_minutes // 60
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+@dataclass
+class EntradaLeaderboard:
+    """
+    Fila de la tabla de posiciones de un equipo.
+
+    Expone los mismos atributos que usaba el template sobre instancias de Equipo
+    (pk, name, number, get_category_display, ...) para poder renderizarse igual.
+    """
+    equipo_id: int
+    nombre: str
+    dorsal: int
+    categoria: str
+    tiempo_total_ms: int
+    mejor_tiempo_ms: int
+    num_registros: int
+    jugadores_ausentes: int
+    posicion: Optional[int] = None
+
+    @classmethod
+    def desde_tiempos(cls, equipo, tiempos: Iterable[int]) -> 'EntradaLeaderboard':
+        """Construye la entrada de un equipo a partir de sus tiempos en milisegundos."""
+        agregados = calcular_agregados(tiempos)
+        return cls(
+            equipo_id=equipo.id,
+            nombre=equipo.name,
+            dorsal=equipo.number,
+            categoria=equipo.category,
+            tiempo_total_ms=agregados['total_ms'],
+            mejor_tiempo_ms=agregados['best_ms'],
+            num_registros=agregados['record_count'],
+            jugadores_ausentes=agregados['absent_count'],
+        )
+
+    @classmethod
+    def desde_fila(cls, fila) -> 'EntradaLeaderboard':
+        """Construye la entrada de un equipo a partir de una FilaRanking."""
+        return cls(
+            equipo_id=fila.equipo_id,
+            nombre=fila.nombre,
+            dorsal=fila.dorsal,
+            categoria=fila.categoria,
+            tiempo_total_ms=fila.tiempo_total_ms,
+            mejor_tiempo_ms=fila.mejor_tiempo_ms,
+            num_registros=fila.num_registros,
+            jugadores_ausentes=fila.jugadores_ausentes,
+        )
+
+    @property
+    def pk(self):
+        return self.equipo_id
+
+    @property
+    def name(self):
+        return self.nombre
+
+    @property
+    def number(self):
+        return self.dorsal
+
+    @property
+    def category(self):
+        return self.categoria
+
+    def get_category_display(self):
+        return CATEGORIAS_DISPLAY.get(self.categoria, self.categoria)
+
+    @property
+    def descalificado(self):
+        return self.jugadores_ausentes > 0
+
+    @property
+    def jugadores_completados(self):
+        return self.num_registros - self.jugadores_ausentes
+
+    @property
+    def tiempo_total_formateado(self):
+        return _formatear_hms(self.tiempo_total_ms)
+
+    @property
+    def mejor_tiempo_formateado(self):
+        return _formatear_hms(self.mejor_tiempo_ms)
+
+    def como_tupla(self) -> Tuple:
+        """Campos sin la posición, para compartir la entrada con otros procesos."""
+        return astuple(self)[:-1]
+
+    @classmethod
+    def desde_tupla(cls, valores) -> 'EntradaLeaderboard':
+        """Inverso de como_tupla."""
+        return cls(*valores)
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Representación compacta para enviar por WebSocket."""
+        return {
+            'id': self.equipo_id,
+            'nombre': self.nombre,
+            'dorsal': self.dorsal,
+            'categoria': self.categoria,
+            'total_ms': self.tiempo_total_ms,
+            'mejor_ms': self.mejor_tiempo_ms,
+            'registros': self.num_registros,
+            'ausentes': self.jugadores_ausentes,
+            'descalificado': self.descalificado,
+            'posicion': self.posicion,
+        }
+
+
+def _clave_calificado(entrada: EntradaLeaderboard):
+    total = entrada.tiempo_total_ms if entrada.tiempo_total_ms > 0 else float('inf')
+    return (total, entrada.dorsal)
+
+
+def _clave_descalificado(entrada: EntradaLeaderboard):
+    return (entrada.tiempo_total_ms, entrada.dorsal)
+
+
+class _Tabla:
+    """
+    Tabla ordenada para un alcance (todas las categorías o una sola).
+
+    Cada tabla guarda sus propias copias de las entradas porque la posición
+    depende del alcance.
+    """
+
+    def __init__(self):
+        self.calificados: List[EntradaLeaderboard] = []
+        self.descalificados: List[EntradaLeaderboard] = []
+
+    def _quitar(self, equipo_id: int) -> Optional[int]:
+        """Quita al equipo si ya estaba; retorna su índice en calificados (o None)."""
+        for idx, entrada in enumerate(self.calificados):
+            if entrada.equipo_id == equipo_id:
+                del self.calificados[idx]
+                return idx
+        for idx, entrada in enumerate(self.descalificados):
+            if entrada.equipo_id == equipo_id:
+                del self.descalificados[idx]
+                return None
+        return None
+
+    def insertar(self, entrada: EntradaLeaderboard) -> List[Tuple[int, int]]:
+        """
+        Inserta (o reemplaza) la entrada de un equipo y recalcula posiciones.
+
+        Returns:
+            Lista de (equipo_id, nueva_posicion) de los calificados cuya posición cambió
+        """
+        entrada = replace(entrada, posicion=None)
+        idx_anterior = self._quitar(entrada.equipo_id)
+
+        if entrada.descalificado:
+            bisect.insort(self.descalificados, entrada, key=_clave_descalificado)
+            desde = idx_anterior
+        else:
+            idx_nuevo = bisect.bisect_right(
+                self.calificados, _clave_calificado(entrada), key=_clave_calificado
+            )
+            self.calificados.insert(idx_nuevo, entrada)
+            desde = idx_nuevo if idx_anterior is None else min(idx_nuevo, idx_anterior)
+
+        if desde is None:
+            return []
+
+        cambios = []
+        for idx in range(desde, len(self.calificados)):
+            fila = self.calificados[idx]
+            if fila.posicion != idx + 1:
+                # Copia en lugar de mutar: las listas ya entregadas a un render no cambian.
+                self.calificados[idx] = replace(fila, posicion=idx + 1)
+                cambios.append((fila.equipo_id, idx + 1))
+        return cambios
+
+    def cargar(self, entradas: Iterable[EntradaLeaderboard]):
+        """Carga en bloque un conjunto de entradas (reconstrucción completa)."""
+        entradas = [replace(e, posicion=None) for e in entradas]
+        self.calificados = sorted(
+            (e for e in entradas if not e.descalificado), key=_clave_calificado
+        )
+        self.descalificados = sorted(
+            (e for e in entradas if e.descalificado), key=_clave_descalificado
+        )
+        for idx, entrada in enumerate(self.calificados, 1):
+            entrada.posicion = idx
+
+
+class Leaderboard:
+    """
+    Tabla de posiciones de una competencia.
+
+    Las lecturas retornan listas nuevas para que el render no observe
+    modificaciones concurrentes.
+
+    `generacion` y `secuencia` reflejan el estado compartido entre procesos
+    con el que está sincronizada la tabla. `secuencia` avanza de uno en uno con
+    cada equipo aplicado (en cualquier proceso) para que los clientes detecten
+    deltas perdidos; `version` combina ambas y sirve para ETags y fragmentos.
+
+    Cada leaderboard tiene su propio lock para lecturas y escrituras.
+    """
+
+    def __init__(self, competencia_id: int, categorias: Iterable[str] = (), generacion: int = 0, secuencia: int = 0):
+        self.competencia_id = competencia_id
+        self.categorias = set(categorias)
+        self.generacion = generacion
+        self.secuencia = secuencia
+        self._tablas: Dict[str, _Tabla] = {'': _Tabla()}
+        self._lock = threading.RLock()
+
+    def _tabla(self, categoria: str) -> _Tabla:
+        if categoria not in self._tablas:
+            self._tablas[categoria] = _Tabla()
+        return self._tablas[categoria]
+
+    @property
+    def version(self) -> str:
+        return f'{self.generacion}.{self.secuencia}'
+
+    def aplicar(self, entrada: EntradaLeaderboard, secuencia: int) -> List[Tuple[int, int]]:
+        """
+        Aplica la entrada de un equipo y avanza a la secuencia indicada.
+
+        Returns:
+            Cambios de posición en el alcance general (todas las categorías)
+        """
+        with self._lock:
+            self.categorias.add(entrada.categoria)
+            self._tabla(entrada.categoria).insertar(entrada)
+            cambios = self._tablas[''].insertar(entrada)
+            self.secuencia = secuencia
+            return cambios
+
+    def posiciones(self) -> List[Tuple[int, int]]:
+        """Retorna (equipo_id, posicion) de todos los calificados del alcance general."""
+        with self._lock:
+            return [(e.equipo_id, e.posicion) for e in self._tablas[''].calificados]
+
+    def entrada(self, equipo_id: int) -> Optional[EntradaLeaderboard]:
+        """Retorna la entrada actual de un equipo en el alcance general."""
+        with self._lock:
+            tabla = self._tablas['']
+            for fila in itertools.chain(tabla.calificados, tabla.descalificados):
+                if fila.equipo_id == equipo_id:
+                    return fila
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado completo del alcance general para clientes que (re)sincronizan."""
+        with self._lock:
+            calificados, descalificados = self.listar('')
+            return {
+                'competencia_id': self.competencia_id,
+                'secuencia': self.secuencia,
+                'version': self.version,
+                'categorias': {
+                    categoria: CATEGORIAS_DISPLAY.get(categoria, categoria)
+                    for categoria in sorted(self.categorias)
+                },
+                'equipos': [e.como_dict() for e in calificados + descalificados],
+            }
+
+    def cargar(self, entradas: Iterable[EntradaLeaderboard]):
+        """Reemplaza el contenido completo del leaderboard."""
+        entradas = list(entradas)
+        with self._lock:
+            self._tablas = {'': _Tabla()}
+            self._tablas[''].cargar(entradas)
+            for categoria in {e.categoria for e in entradas}:
+                self._tabla(categoria).cargar(e for e in entradas if e.categoria == categoria)
+            self.categorias.update(e.categoria for e in entradas)
+
+    def listar(self, categoria: str = '') -> Tuple[List[EntradaLeaderboard], List[EntradaLeaderboard]]:
+        """Retorna (calificados, descalificados) para el alcance indicado."""
+        with self._lock:
+            tabla = self._tablas.get(categoria or '')
+            if tabla is None:
+                return [], []
+            return list(tabla.calificados), list(tabla.descalificados)
+
+
+def combinar_deltas(deltas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fusiona deltas consecutivos de una competencia en el menor número de mensajes.
+
+    Cada tramo de secuencias contiguas produce un delta combinado con el estado
+    final de los equipos afectados y la última posición de cada equipo movido.
+    Un salto (p. ej. el leaderboard se reconstruyó) abre un tramo nuevo; el
+    cliente lo detecta por `desde` y pide el snapshot.
+
+    Args:
+        deltas: Deltas de registrar_equipo, en orden de aplicación
+
+    Returns:
+        Lista de dicts con competencia_id, desde, secuencia, version, equipos y cambios
+    """
+    tramos = []
+    actual = None
+    for delta in deltas:
+        if actual is None or delta['secuencia'] != actual['secuencia'] + 1:
+            actual = {
+                'competencia_id': delta['competencia_id'],
+                'desde': delta['secuencia'],
+                'secuencia': delta['secuencia'],
+                'version': delta['version'],
+                'equipos': {},
+                'cambios': {},
+            }
+            tramos.append(actual)
+
+        equipo = delta['equipo']
+        actual['secuencia'] = delta['secuencia']
+        actual['version'] = delta['version']
+        actual['equipos'][equipo['id']] = dict(equipo)
+        actual['cambios'][equipo['id']] = equipo['posicion']
+        for equipo_id, posicion in delta['cambios']:
+            actual['cambios'][equipo_id] = posicion
+
+    for tramo in tramos:
+        for equipo_id, equipo in tramo['equipos'].items():
+            equipo['posicion'] = tramo['cambios'][equipo_id]
+        tramo['equipos'] = list(tramo['equipos'].values())
+        tramo['cambios'] = list(tramo['cambios'].items())
+    return tramos
+
+
+class LeaderboardService:
+    """
+    Servicio para leer y actualizar los leaderboards en memoria del proceso.
+
+    Cada proceso mantiene su propia copia; la generación y la secuencia en el
+    cache compartido indican cuándo una copia quedó atrás por cambios hechos
+    en otro proceso. Con WEB_WORKERS > 1 cada equipo aplicado se publica en el
+    cache con su secuencia y los demás procesos lo aplican desde ahí.
+    """
+
+    def obtener_leaderboard(self, competencia_id: int) -> Leaderboard:
+        """
+        Retorna el leaderboard de una competencia al día con el estado compartido.
+
+        Si otro proceso aplicó equipos, se aplican desde el cache; se reconstruye
+        si no está cargado, cambió la generación o falta alguna entrada. Si el
+        cache no responde se usa la copia local (o se reconstruye con una
+        versión propia, que no coincide con ninguna ya cacheada).
+
+        Args:
+            competencia_id: ID de la competencia
+
+        Returns:
+            Leaderboard listo para lectura
+        """
+        estado = _leer_estado_compartido(competencia_id)
+        leaderboard = _leaderboards.get(competencia_id)
+        if leaderboard is not None and (leaderboard.generacion, leaderboard.secuencia) == estado:
+            return leaderboard
+
+        # Solo el lock de esta competencia: un batch que confirme a la vez espera
+        # y se aplica sobre la tabla nueva, sin frenar a las otras competencias.
+        with _lock_competencia(competencia_id):
+            estado = _leer_estado_compartido(competencia_id)
+            leaderboard = _leaderboards.get(competencia_id)
+            if estado is None:
+                if leaderboard is None:
+                    leaderboard = self._reconstruir(competencia_id, int(time.time() * 1000), 0)
+                    _leaderboards[competencia_id] = leaderboard
+                return leaderboard
+            generacion, secuencia = estado
+            if (
+                leaderboard is not None
+                and leaderboard.generacion == generacion
+                and self._ponerse_al_dia(leaderboard, secuencia)
+            ):
+                return leaderboard
+            leaderboard = self._reconstruir(competencia_id, generacion, secuencia)
+            _leaderboards[competencia_id] = leaderboard
+            return leaderboard
+
+    def version_actual(self, competencia_id: int) -> str:
+        """
+        Retorna la versión compartida del leaderboard sin tocar la base de datos.
+
+        Args:
+            competencia_id: ID de la competencia
+
+        Returns:
+            Versión actual ('generacion.secuencia'), igual en todos los procesos;
+            None si el cache no responde
+        """
+        estado = _leer_estado_compartido(competencia_id)
+        if estado is None:
+            return None
+        generacion, secuencia = estado
+        return f'{generacion}.{secuencia}'
+
+    def registrar_equipo(self, equipo, tiempos: Iterable[int]) -> Dict[str, Any]:
+        """
+        Aplica de forma incremental los tiempos recién confirmados de un equipo.
+
+        Debe llamarse después del commit. Si otro proceso avanzó la secuencia,
+        primero se aplican sus equipos desde el cache y el delta es exacto. Si el
+        leaderboard no estaba cargado o falta alguna entrada se reconstruye (ya
+        incluye al equipo) y el delta trae las posiciones de todos los calificados.
+
+        Args:
+            equipo: Instancia de Equipo
+            tiempos: Tiempos del equipo en milisegundos
+
+        Returns:
+            Delta con la secuencia, la fila del equipo y las posiciones que cambiaron
+        """
+        entrada = EntradaLeaderboard.desde_tiempos(equipo, tiempos)
+        competencia_id = equipo.competition_id
+        _, clave_secuencia = _claves_compartidas(competencia_id)
+        with _lock_competencia(competencia_id):
+            # Sin estado compartido el incremento también falla: lo maneja quien llama
+            generacion, _ = _leer_estado_compartido(competencia_id) or (None, None)
+            secuencia = _incrementar_compartido(clave_secuencia)
+            if _varios_procesos():
+                _cache().set(_clave_entrada(competencia_id, secuencia), entrada.como_tupla(), ENTRADAS_TIMEOUT)
+            leaderboard = _leaderboards.get(competencia_id)
+            if (
+                leaderboard is not None
+                and leaderboard.generacion == generacion
+                and self._ponerse_al_dia(leaderboard, secuencia - 1)
+            ):
+                cambios = leaderboard.aplicar(entrada, secuencia)
+            else:
+                leaderboard = self._reconstruir(competencia_id, generacion, secuencia)
+                _leaderboards[competencia_id] = leaderboard
+                cambios = leaderboard.posiciones()
+            actual = leaderboard.entrada(equipo.id)
+            return {
+                'competencia_id': leaderboard.competencia_id,
+                'secuencia': leaderboard.secuencia,
+                'version': leaderboard.version,
+                'equipo': actual.como_dict() if actual else entrada.como_dict(),
+                'cambios': cambios,
+            }
+
+    def obtener_snapshot(self, competencia_id: int) -> Dict[str, Any]:
+        """
+        Retorna el estado completo del leaderboard para enviarlo a un cliente.
+
+        Args:
+            competencia_id: ID de la competencia
+
+        Returns:
+            Dict con secuencia, categorías y equipos ordenados
+        """
+        return self.obtener_leaderboard(competencia_id).snapshot()
+
+    def tocar(self, competencia_id: int):
+        """
+        Avanza la versión sin cambiar el contenido (p. ej. al iniciar o detener la
+        competencia) para que se descarten los fragmentos cacheados.
+        """
+        clave_generacion, _ = _claves_compartidas(competencia_id)
+        with _lock_competencia(competencia_id):
+            try:
+                generacion = _incrementar_compartido(clave_generacion, int(time.time() * 1000))
+            except ERRORES_CACHE as e:
+                # Sin versión nueva la copia local no sirve: se reconstruye al volver el cache
+                logger.warning("[LEADERBOARD] Cache no disponible tocando %s: %s", competencia_id, e)
+                _leaderboards.pop(competencia_id, None)
+                return
+            leaderboard = _leaderboards.get(competencia_id)
+            if leaderboard is not None:
+                leaderboard.generacion = generacion
+
+    def invalidar(self, competencia_id: int):
+        """
+        Descarta el leaderboard de una competencia en todos los procesos
+        (p. ej. tras editar en el admin).
+
+        También salta una secuencia para que los clientes conectados detecten
+        el hueco y pidan el snapshot con los datos editados.
+        """
+        clave_generacion, clave_secuencia = _claves_compartidas(competencia_id)
+        with _lock_competencia(competencia_id):
+            _leaderboards.pop(competencia_id, None)
+            try:
+                _incrementar_compartido(clave_generacion, int(time.time() * 1000))
+                _incrementar_compartido(clave_secuencia)
+            except ERRORES_CACHE as e:
+                logger.warning("[LEADERBOARD] Cache no disponible invalidando %s: %s", competencia_id, e)
+
+    def invalidar_todo(self):
+        """
+        Descarta los leaderboards de todas las competencias en todos los procesos
+        (p. ej. tras un borrado en cascada en el que ya no se conoce la competencia).
+
+        Limpia la copia local y avanza la generación compartida de cada
+        competencia, como invalidar.
+        """
+        from app.models import Competencia
+
+        with _lock:
+            _leaderboards.clear()
+        for competencia_id in Competencia.objects.values_list('id', flat=True):
+            self.invalidar(competencia_id)
+
+    def _ponerse_al_dia(self, leaderboard: Leaderboard, hasta: int) -> bool:
+        """
+        Aplica, en orden, las entradas que otros procesos publicaron hasta la
+        secuencia `hasta`.
+
+        Una entrada puede faltar un instante (el otro proceso incrementó la
+        secuencia y aún no la escribió): se reintenta REINTENTOS_HUECO veces.
+
+        Returns:
+            True si el leaderboard quedó en `hasta`; False si falta alguna
+            entrada (hay que reconstruir)
+        """
+        if hasta - leaderboard.secuencia > MAX_ENTRADAS_PENDIENTES:
+            return False
+        for intento in range(REINTENTOS_HUECO + 1):
+            if leaderboard.secuencia >= hasta:
+                return True
+            if intento:
+                time.sleep(ESPERA_HUECO_S)
+            secuencias = range(leaderboard.secuencia + 1, hasta + 1)
+            claves = {_clave_entrada(leaderboard.competencia_id, n): n for n in secuencias}
+            try:
+                leidas = _cache().get_many(list(claves))
+            except ERRORES_CACHE as e:
+                logger.warning("[LEADERBOARD] Cache no disponible leyendo entradas de %s: %s",
+                               leaderboard.competencia_id, e)
+                return False
+            encontradas = {claves[clave]: valores for clave, valores in leidas.items()}
+            for secuencia in secuencias:
+                if secuencia not in encontradas:
+                    break
+                leaderboard.aplicar(EntradaLeaderboard.desde_tupla(encontradas[secuencia]), secuencia)
+        return leaderboard.secuencia >= hasta
+
+    def _reconstruir(self, competencia_id: int, generacion: int = 0, secuencia: int = 0) -> Leaderboard:
+        from app.models import Equipo
+        from app.services.results_service import ResultsService
+
+        # El ranking (agregados + RANK()) sale de una sola sentencia SQL;
+        # los equipos sin registros no aparecen, pero sí sus categorías.
+        filas = ResultsService().calcular_ranking(competencia_id)
+        categorias = set(
+            Equipo.objects.filter(competition_id=competencia_id)
+            .order_by().values_list('category', flat=True).distinct()
+        )
+
+        leaderboard = Leaderboard(competencia_id, categorias, generacion, secuencia)
+        leaderboard.cargar([EntradaLeaderboard.desde_fila(fila) for fila in filas])
+        return leaderboard
@@ -1,14 +1,58 @@
-from django.db import transaction
-from channels.db import database_sync_to_async
-from typing import Dict, List, Any
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from typing import Dict, List, Any, Optional
+import logging
 import uuid
 
+from app.models.equipo import calcular_agregados
+from app.utils.metricas import database_sync_to_async_medido, medir
+from .difusion_service import DifusionService
+from .leaderboard_service import LeaderboardService
+
+logger = logging.getLogger(__name__)
+
+
+def _entero_no_negativo(valor) -> bool:
+    """Indica si el valor es un entero >= 0 (se acepta un float sin decimales, como 1500.0)."""
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return False
+    if isinstance(valor, float) and not valor.is_integer():
+        return False
+    return valor >= 0
+
 
 class RegistroService:
     
     MAX_REGISTROS_POR_EQUIPO = 15
     
-    @database_sync_to_async
+    @staticmethod
+    def validar_registro(reg) -> Optional[str]:
+        """
+        Valida la forma de un registro de un lote (sin consultar la base de datos).
+        
+        Args:
+            reg: Elemento de la lista 'registros' tal como llegó del cliente
+            
+        Returns:
+            Mensaje de error, o None si el registro es válido
+        """
+        if not isinstance(reg, dict):
+            return 'El registro debe ser un objeto'
+        if reg.get('tiempo') is None:
+            return 'Falta el campo tiempo'
+        if not _entero_no_negativo(reg['tiempo']):
+            return 'El tiempo debe ser un entero de milisegundos no negativo'
+        for campo in ('horas', 'minutos', 'segundos', 'milisegundos'):
+            if not _entero_no_negativo(reg.get(campo, 0)):
+                return f'El campo {campo} debe ser un entero no negativo'
+        if reg.get('id_registro'):
+            try:
+                uuid.UUID(str(reg['id_registro']))
+            except ValueError:
+                return 'id_registro no es un UUID válido'
+        return None
+    
+    @database_sync_to_async_medido
     def registrar_tiempo(
         self,
         juez,
@@ -114,6 +158,12 @@ class RegistroService:
                     ignore_conflicts=True  # si llega un UUID repetido no rompe la transacción
                 )
                 
+                if creados:
+                    equipo.recalcular_agregados()
+                    # Registro individual fuera del flujo de batch: reconstruir en la próxima lectura
+                    competencia_id = equipo.competition_id
+                    transaction.on_commit(lambda: LeaderboardService().invalidar(competencia_id))
+
                 if not creados:
                     # Ya existía; devolver como duplicado
                     existente = RegistroTiempo.objects.get(record_id=registro.record_id)
@@ -147,7 +197,7 @@ class RegistroService:
         """
         return self._registrar_batch_impl(juez, equipo_id, registros)
     
-    @database_sync_to_async
+    @database_sync_to_async_medido
     def registrar_batch(
         self,
         juez,
@@ -166,7 +216,155 @@ class RegistroService:
         registros: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """
-        Registra múltiples tiempos en batch de manera transaccional.
+        Registra múltiples tiempos en batch.
+        
+        Los lotes completos y bien formados van por la ruta rápida; si el equipo
+        no puede reclamarse (o hay registros inválidos) se usa la ruta completa,
+        que guarda los válidos o explica el motivo del rechazo.
+        
+        Args:
+            juez: Instancia del modelo Juez
+            equipo_id: ID del equipo
+            registros: Lista de diccionarios con datos de registros
+            
+        Returns:
+            Dict con resumen de registros guardados y fallidos
+        """
+        preparados = self._preparar_registros(registros)
+        if preparados is not None:
+            resultado = self._registrar_batch_rapido(juez, equipo_id, preparados)
+            if resultado is not None:
+                return resultado
+        return self._registrar_batch_completo(juez, equipo_id, registros)
+    
+    def _preparar_registros(self, registros: List[Dict[str, Any]]):
+        """
+        Normaliza un lote para la ruta rápida.
+        
+        Returns:
+            Lista de dicts con los campos de RegistroTiempo, o None si algún
+            registro es inválido, repite un id_registro del mismo lote o el
+            lote supera el máximo por equipo
+        """
+        if not isinstance(registros, list) or not registros or len(registros) > self.MAX_REGISTROS_POR_EQUIPO:
+            return None
+        
+        preparados = []
+        vistos = set()
+        for reg in registros:
+            if self.validar_registro(reg) is not None:
+                return None
+            registro = self._normalizar_registro(reg)
+            if registro['record_id'] in vistos:
+                return None
+            vistos.add(registro['record_id'])
+            preparados.append(registro)
+        return preparados
+    
+    def _normalizar_registro(self, reg: Dict[str, Any]) -> Dict[str, Any]:
+        """Campos de RegistroTiempo de un registro ya validado (enteros y UUID)."""
+        return {
+            'record_id': uuid.UUID(str(reg['id_registro'])) if reg.get('id_registro') else uuid.uuid4(),
+            'time': int(reg['tiempo']),
+            'hours': int(reg.get('horas', 0)),
+            'minutes': int(reg.get('minutos', 0)),
+            'seconds': int(reg.get('segundos', 0)),
+            'milliseconds': int(reg.get('milisegundos', 0)),
+        }
+    
+    def _registrar_batch_rapido(
+        self,
+        juez,
+        equipo_id: int,
+        preparados: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Ruta rápida: pertenencia, competencia en curso y "sin registros previos"
+        se validan en un único UPDATE condicional que a la vez reclama el equipo
+        y guarda sus agregados; después, un INSERT con los registros.
+        
+        El UPDATE bloquea la fila del equipo: un segundo lote concurrente para el
+        mismo equipo ve record_count > 0 al reevaluar la condición y no lo reclama.
+        
+        El INSERT no ignora conflictos: si algún id_registro ya existe (de otro
+        equipo) la transacción se revierte entera, incluidos los agregados, y
+        la ruta completa informa cuáles son duplicados.
+        
+        Returns:
+            Dict con el resumen, o None si el equipo existe pero no pudo
+            reclamarse o algún registro ya existía
+        """
+        from app.models import Competencia, Equipo, RegistroTiempo
+        
+        # Datos para la respuesta y el leaderboard (lectura sin bloqueo)
+        equipo = Equipo.objects.only(
+            'id', 'name', 'number', 'category', 'competition_id'
+        ).filter(pk=equipo_id).first()
+        if equipo is None:
+            return self._rechazar_lote(preparados, f'El equipo con ID {equipo_id} no existe', 'equipo_inexistente')
+        
+        tiempos = [p['time'] for p in preparados]
+        registros_a_crear = [RegistroTiempo(team_id=equipo.id, **p) for p in preparados]
+        
+        try:
+            with medir('registro_batch_commit_segundos', 'Transacción de un lote de registros hasta el commit'), transaction.atomic():
+                en_curso = Competencia.objects.filter(pk=OuterRef('competition_id'), is_running=True)
+                reclamado = Equipo.objects.filter(
+                    pk=equipo.id,
+                    judge_id=juez.id,
+                    record_count=0,
+                ).filter(Exists(en_curso)).update(**calcular_agregados(tiempos))
+                
+                if not reclamado:
+                    return None
+                
+                RegistroTiempo.objects.bulk_create(registros_a_crear)
+                transaction.on_commit(lambda: self._publicar_resultado_equipo(equipo, tiempos))
+        except IntegrityError as e:
+            logger.info("[BATCH] Registros ya existentes para equipo %s, se usa la ruta completa: %s", equipo_id, e)
+            return None
+        
+        return {
+            'total_enviados': len(preparados),
+            'total_guardados': len(registros_a_crear),
+            'total_fallidos': 0,
+            'equipo_nombre': equipo.name,
+            'equipo_dorsal': equipo.number,
+            'registros_guardados': [
+                {
+                    'indice': idx,
+                    'id_registro': str(registro.record_id),
+                    'tiempo': registro.time,
+                    'duplicado': False,
+                }
+                for idx, registro in enumerate(registros_a_crear)
+            ],
+            'registros_fallidos': [],
+        }
+    
+    def _rechazar_lote(self, registros: List[Dict[str, Any]], error: str, motivo: str) -> Dict[str, Any]:
+        """Resumen de un lote rechazado completo, con el motivo para la vista HTTP."""
+        return {
+            'total_enviados': len(registros),
+            'total_guardados': 0,
+            'total_fallidos': len(registros),
+            'motivo': motivo,
+            'registros_guardados': [],
+            'registros_fallidos': [
+                {'indice': i, 'error': error}
+                for i in range(len(registros))
+            ]
+        }
+    
+    def _registrar_batch_completo(
+        self,
+        juez,
+        equipo_id: int,
+        registros: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Ruta completa: valida paso a paso y guarda los registros válidos.
+        Se usa para lotes parciales y para diagnosticar rechazos.
         
         Args:
             juez: Instancia del modelo Juez
@@ -182,104 +380,60 @@ class RegistroService:
         registros_fallidos = []
         
         try:
-            with transaction.atomic():
+            with medir('registro_batch_commit_segundos', 'Transacción de un lote de registros hasta el commit'), transaction.atomic():
                 # Refrescar el juez con sus equipos asignados
                 juez_actualizado = Juez.objects.prefetch_related('teams', 'teams__competition').get(id=juez.id)
                 
                 # Verificar que el juez tenga equipos asignados
                 equipos = juez_actualizado.teams.all()
                 if not equipos:
-                    return {
-                        'total_enviados': len(registros),
-                        'total_guardados': 0,
-                        'total_fallidos': len(registros),
-                        'registros_guardados': [],
-                        'registros_fallidos': [
-                            {'indice': i, 'error': 'El juez no tiene equipos asignados'}
-                            for i in range(len(registros))
-                        ]
-                    }
+                    return self._rechazar_lote(registros, 'El juez no tiene equipos asignados', 'sin_equipos')
                 
                 # Obtener la competencia del primer equipo
                 competencia_juez = equipos.first().competition
                 
                 # Verificar que la competencia esté en curso
                 if not competencia_juez or not competencia_juez.is_running:
-                    return {
-                        'total_enviados': len(registros),
-                        'total_guardados': 0,
-                        'total_fallidos': len(registros),
-                        'registros_guardados': [],
-                        'registros_fallidos': [
-                            {'indice': i, 'error': 'La competencia no está en curso'}
-                            for i in range(len(registros))
-                        ]
-                    }
+                    return self._rechazar_lote(registros, 'La competencia no está en curso', 'competencia_detenida')
                 
                 # Verificar que el equipo existe y pertenece a este juez
                 try:
                     equipo = Equipo.objects.select_for_update().get(id=equipo_id)
                 except Equipo.DoesNotExist:
-                    return {
-                        'total_enviados': len(registros),
-                        'total_guardados': 0,
-                        'total_fallidos': len(registros),
-                        'registros_guardados': [],
-                        'registros_fallidos': [
-                            {'indice': i, 'error': f'El equipo con ID {equipo_id} no existe'}
-                            for i in range(len(registros))
-                        ]
-                    }
+                    return self._rechazar_lote(registros, f'El equipo con ID {equipo_id} no existe', 'equipo_inexistente')
                 
                 if equipo.judge_id != juez.id:
-                    return {
-                        'total_enviados': len(registros),
-                        'total_guardados': 0,
-                        'total_fallidos': len(registros),
-                        'registros_guardados': [],
-                        'registros_fallidos': [
-                            {'indice': i, 'error': 'El equipo no pertenece al juez'}
-                            for i in range(len(registros))
-                        ]
-                    }
+                    return self._rechazar_lote(registros, 'El equipo no pertenece al juez', 'equipo_ajeno')
                 
                 # Contar registros actuales
                 num_registros_actuales = RegistroTiempo.objects.filter(team=equipo).count()
                 
                 # Verificar si el equipo ya tiene registros (evitar envíos duplicados)
                 if num_registros_actuales > 0:
-                    return {
-                        'total_enviados': len(registros),
-                        'total_guardados': 0,
-                        'total_fallidos': len(registros),
-                        'registros_guardados': [],
-                        'registros_fallidos': [
-                            {'indice': i, 'error': f'El equipo ya tiene {num_registros_actuales} registros guardados. No se permiten envíos adicionales.'}
-                            for i in range(len(registros))
-                        ]
-                    }
+                    return self._rechazar_lote(
+                        registros,
+                        f'El equipo ya tiene {num_registros_actuales} registros guardados. No se permiten envíos adicionales.',
+                        'registros_existentes',
+                    )
                 
                 # Filtrar y normalizar datos válidos
                 registros_a_crear = []
                 mapping_idx_registro = []  # (indice_original, instancia_registro)
+                vistos = set()
                 for idx, reg in enumerate(registros):
-                    time = reg.get('tiempo')
-                    if time is None:
-                        registros_fallidos.append({'indice': idx, 'error': 'Falta el campo tiempo'})
+                    error = self.validar_registro(reg)
+                    if error:
+                        registros_fallidos.append({'indice': idx, 'error': error})
                         continue
                     if num_registros_actuales + len(registros_a_crear) >= self.MAX_REGISTROS_POR_EQUIPO:
                         registros_fallidos.append({'indice': idx, 'error': f'Se alcanzó el límite de {self.MAX_REGISTROS_POR_EQUIPO} registros'})
                         continue
-                    record_id = reg.get('id_registro') or uuid.uuid4()
-                    registro_obj = RegistroTiempo(
-                        record_id=record_id,
-                        team=equipo,
-                        time=time,
-                        hours=reg.get('horas', 0),
-                        minutes=reg.get('minutos', 0),
-                        seconds=reg.get('segundos', 0),
-                        milliseconds=reg.get('milisegundos', 0)
-                    )
+                    campos = self._normalizar_registro(reg)
+                    if campos['record_id'] in vistos:
+                        registros_fallidos.append({'indice': idx, 'error': 'id_registro repetido en el lote'})
+                        continue
+                    vistos.add(campos['record_id'])
+                    registro_obj = RegistroTiempo(team=equipo, **campos)
                     registros_a_crear.append(registro_obj)
                     mapping_idx_registro.append((idx, registro_obj))
 
@@ -293,13 +447,30 @@ class RegistroService:
                     }
 
                 # Crear en bloque con ignore_conflicts para idempotencia
-                creados = RegistroTiempo.objects.bulk_create(
+                RegistroTiempo.objects.bulk_create(
                     registros_a_crear,
                     ignore_conflicts=True,
                 )
 
+                # bulk_create con ignore_conflicts devuelve todos los objetos, también
+                # los descartados; el equipo no tenía registros (fila bloqueada), así
+                # que los suyos ahora son exactamente los insertados
+                creados = {
+                    record_id: time
+                    for record_id, time in RegistroTiempo.objects.filter(team=equipo).values_list('record_id', 'time')
+                }
+
+                # Al confirmar la transacción, actualizar el leaderboard y notificar el delta
+                if creados:
+                    tiempos_equipo = list(creados.values())
+                    # Agregados desnormalizados en la misma transacción que los registros
+                    Equipo.objects.filter(pk=equipo.pk).update(**calcular_agregados(tiempos_equipo))
+                    transaction.on_commit(
+                        lambda: self._publicar_resultado_equipo(equipo, tiempos_equipo)
+                    )
+
                 # Mapear resultados: los no creados son duplicados
-                creados_ids = {r.record_id for r in creados}
+                creados_ids = set(creados)
                 for idx, registro_obj in mapping_idx_registro:
                     if registro_obj.record_id in creados_ids:
                         registros_guardados.append({
@@ -320,6 +491,8 @@ class RegistroService:
                     'total_enviados': len(registros),
                     'total_guardados': len(creados),
                     'total_fallidos': len(registros_fallidos),
+                    'equipo_nombre': equipo.name,
+                    'equipo_dorsal': equipo.number,
                     'registros_guardados': registros_guardados,
                     'registros_fallidos': registros_fallidos
                 }
@@ -335,3 +508,35 @@ class RegistroService:
                     for i in range(len(registros))
                 ]
             }
+
+    def _publicar_resultado_equipo(self, equipo, tiempos: List[int]):
+        """
+        Inserta el equipo en el leaderboard en memoria y envía el delta resultante
+        a los clientes de la competencia. Se ejecuta después del commit.
+        """
+        try:
+            delta = LeaderboardService().registrar_equipo(equipo, tiempos)
+        except Exception as e:
+            logger.error("[LEADERBOARD] Error aplicando equipo %s: %s", equipo.id, e, exc_info=True)
+            LeaderboardService().invalidar(equipo.competition_id)
+            delta = None
+
+        self._notificar_actualizacion(equipo, tiempos, delta)
+
+    def _notificar_actualizacion(self, equipo, tiempos: List[int], delta: Dict[str, Any] = None):
+        """
+        Notifica a los clientes conectados que hay nuevos registros.
+        Incluye el delta del leaderboard para que la UI pública no tenga que refrescar.
+        El envío se agrupa por competencia en DifusionService.
+        """
+        DifusionService().publicar_registros(
+            equipo.competition_id,
+            {
+                'equipo_id': equipo.id,
+                'equipo_nombre': equipo.name,
+                'equipo_dorsal': equipo.number,
+                'total_registros': len(tiempos),
+                'tiempo_total': sum(tiempos),
+            },
+            delta,
+        )
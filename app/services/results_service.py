@@ -7,10 +7,39 @@ Características:
 - Sumar los primeros 15 registros
 - Calcular promedios y mejores tiempos
 - Evitar recomputación innecesaria
+- Ranking por competencia en una sola consulta SQL (funciones de ventana)
 """
 
-from typing import Dict, List, Any
-from django.db.models import Sum, Avg, Count, Min
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Any, Optional
+from django.db.models import (
+    Case, Count, F, IntegerField, Min, Q, Sum, Value, When, Window,
+)
+from django.db.models.functions import Coalesce, Rank
+
+
+@dataclass(frozen=True)
+class FilaRanking:
+    """
+    Fila liviana del ranking de una competencia.
+
+    Los equipos descalificados (con jugadores ausentes) se ordenan en su
+    propio grupo, después de los calificados, y no tienen posición general.
+    """
+    equipo_id: int
+    nombre: str
+    dorsal: int
+    categoria: str
+    tiempo_total_ms: int
+    mejor_tiempo_ms: int
+    num_registros: int
+    jugadores_ausentes: int
+    descalificado: bool
+    posicion_categoria: int
+    posicion_general: Optional[int]
+
+    def como_dict(self) -> Dict[str, Any]:
+        return asdict(self)
 
 
 class ResultsService:
@@ -19,6 +48,108 @@ class ResultsService:
     """
     
     MAX_REGISTROS_CONSIDERADOS = 15
+
+    # Grupos de ordenamiento del ranking
+    GRUPO_CALIFICADO = 0
+    GRUPO_DESCALIFICADO = 1
+    GRUPO_SIN_REGISTROS = 2
+
+    @classmethod
+    def anotar_ranking(cls, queryset):
+        """
+        Anota un queryset de Equipo con sus agregados y posiciones.
+
+        Todo se resuelve en una sola sentencia: SUM/COUNT/MIN agrupados por
+        equipo y RANK() OVER (PARTITION BY ...) sobre esos agregados. Funciona
+        igual en PostgreSQL y en SQLite (>= 3.25).
+
+        Las posiciones se calculan dentro de cada competencia y grupo
+        (calificados, descalificados, sin registros), sobre las filas que
+        deja el queryset recibido.
+
+        Args:
+            queryset: QuerySet de Equipo (ya filtrado)
+
+        Returns:
+            QuerySet anotado con rk_total, rk_mejor, rk_registros, rk_ausentes,
+            rk_grupo, rk_posicion_categoria y rk_posicion_general
+        """
+        grupo = Case(
+            When(rk_registros=0, then=Value(cls.GRUPO_SIN_REGISTROS)),
+            When(rk_ausentes__gt=0, then=Value(cls.GRUPO_DESCALIFICADO)),
+            default=Value(cls.GRUPO_CALIFICADO),
+            output_field=IntegerField(),
+        )
+        # Empates en tiempo total comparten posición (RANK deja el hueco siguiente)
+        orden = [F('rk_total').asc()]
+
+        return queryset.annotate(
+            rk_total=Coalesce(Sum('times__time'), 0),
+            rk_mejor=Coalesce(Min('times__time', filter=Q(times__time__gt=0)), 0),
+            rk_registros=Count('times'),
+            rk_ausentes=Count('times', filter=Q(times__time=0)),
+        ).annotate(
+            rk_grupo=grupo,
+        ).annotate(
+            rk_posicion_categoria=Window(
+                Rank(),
+                partition_by=[F('competition_id'), F('category'), F('rk_grupo')],
+                order_by=orden,
+            ),
+            rk_posicion_general=Window(
+                Rank(),
+                partition_by=[F('competition_id'), F('rk_grupo')],
+                order_by=orden,
+            ),
+        )
+
+    def calcular_ranking(self, competencia_id: int, categoria: str = None) -> List[FilaRanking]:
+        """
+        Calcula el ranking de una competencia en una sola consulta.
+
+        Es el motor de ranking común para las vistas HTML (vía el leaderboard),
+        la API JSON y el admin.
+
+        Args:
+            competencia_id: ID de la competencia
+            categoria: Filtro opcional de categoría (se aplica después del
+                ranking para que la posición general siga siendo global)
+
+        Returns:
+            Lista de FilaRanking: calificados por tiempo total y luego descalificados
+        """
+        from app.models import Equipo
+
+        equipos = Equipo.objects.filter(competition_id=competencia_id)
+
+        # IMPORTANTE UX: los equipos sin registros no aparecen en resultados.
+        # El filtro sobre el agregado va al HAVING, antes de calcular RANK().
+        filas = self.anotar_ranking(equipos).filter(rk_registros__gt=0).order_by(
+            'rk_grupo', 'rk_total', 'number',
+        ).values_list(
+            'id', 'name', 'number', 'category',
+            'rk_total', 'rk_mejor', 'rk_registros', 'rk_ausentes',
+            'rk_grupo', 'rk_posicion_categoria', 'rk_posicion_general',
+        )
+
+        return [
+            FilaRanking(
+                equipo_id=equipo_id,
+                nombre=nombre,
+                dorsal=dorsal,
+                categoria=cat,
+                tiempo_total_ms=total,
+                mejor_tiempo_ms=mejor,
+                num_registros=registros,
+                jugadores_ausentes=ausentes,
+                descalificado=grupo == self.GRUPO_DESCALIFICADO,
+                posicion_categoria=pos_categoria,
+                posicion_general=pos_general if grupo == self.GRUPO_CALIFICADO else None,
+            )
+            for (equipo_id, nombre, dorsal, cat, total, mejor, registros,
+                 ausentes, grupo, pos_categoria, pos_general) in filas
+            if not categoria or cat == categoria
+        ]
     
     def obtener_resultados_equipo(self, equipo_id: int, competencia_id: int = None) -> Dict[str, Any]:
         """
@@ -38,8 +169,8 @@ class ResultsService:
             
             # Filtrar registros del equipo (equipo ya pertenece a una competencia)
             registros = RegistroTiempo.objects.filter(
-                equipo=equipo
-            ).order_by('tiempo')[:self.MAX_REGISTROS_CONSIDERADOS]
+                team=equipo
+            ).order_by('time')[:self.MAX_REGISTROS_CONSIDERADOS]
             
             if not registros:
                 return {
@@ -92,44 +223,30 @@ class ResultsService:
                 'error': f'Error al obtener resultados: {str(e)}'
             }
     
-    def obtener_ranking_competencia(self, competencia_id: int) -> Dict[str, Any]:
+    def obtener_ranking_competencia(self, competencia_id: int, categoria: str = None) -> Dict[str, Any]:
         """
         Obtiene el ranking de equipos de una competencia.
         
         Args:
             competencia_id: ID de la competencia
+            categoria: Filtro opcional de categoría
             
         Returns:
-            Dict con lista de equipos ordenados por mejor tiempo
+            Dict con lista de equipos ordenados por tiempo total
         """
-        from app.models import Equipo, Competencia
+        from app.models import Competencia
         
         try:
-            competencia = Competencia.objects.get(id=competencia_id)
-            
-            # Obtener equipos de esta competencia
-            equipos = Equipo.objects.filter(competencia_id=competencia_id)
-            
-            # Calcular resultados para cada equipo
-            resultados = []
-            for equipo in equipos:
-                resultado = self.obtener_resultados_equipo(equipo.id, competencia_id)
-                if resultado['exito']:
-                    resultados.append(resultado)
-            
-            # Ordenar por mejor tiempo (ascendente)
-            resultados.sort(key=lambda x: x['mejor_tiempo'] if x['mejor_tiempo'] is not None else float('inf'))
-            
-            # Asignar posiciones
-            for idx, resultado in enumerate(resultados, 1):
-                resultado['posicion'] = idx
+            competencia = Competencia.objects.only('id', 'name').get(id=competencia_id)
+            ranking = self.calcular_ranking(competencia_id, categoria)
             
             return {
                 'exito': True,
                 'competencia_id': competencia_id,
                 'competencia_nombre': competencia.name,
-                'total_equipos': len(resultados),
-                'ranking': resultados_ordenados
+                'categoria': categoria or None,
+                'total_equipos': len(ranking),
+                'ranking': [fila.como_dict() for fila in ranking]
             }
             
         except Competencia.DoesNotExist:
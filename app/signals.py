@@ -4,11 +4,14 @@ Señales de Django para notificar cambios en tiempo real vía WebSocket.
 """
 
 import logging
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from app.models import Competencia
+from app.models import Competencia, Equipo, Juez, RegistroTiempo
+from app.services.bandeja_salida_service import BandejaSalidaService
+from app.services.leaderboard_service import LeaderboardService
+from app.utils.cache_competencias import invalidar_estados_competencias
+from app.utils.cache_jueces import invalidar_juez
 
 logger = logging.getLogger(__name__)
 
@@ -16,64 +19,103 @@ logger = logging.getLogger(__name__)
 @receiver(pre_save, sender=Competencia)
 def competencia_pre_save(sender, instance, **kwargs):
     """
-    Guarda el estado anterior de is_running antes de guardar.
+    Consulta el estado anterior de is_running solo si la instancia no lo trae
+    de from_db (creada a mano con pk o cargada con only()/defer()).
     """
-    if instance.pk:
-        try:
-            instance._previous_is_running = Competencia.objects.get(pk=instance.pk).is_running
-        except Competencia.DoesNotExist:
-            instance._previous_is_running = False
-    else:
-        instance._previous_is_running = False
+    if instance.pk and getattr(instance, '_is_running_cargado', None) is None:
+        instance._is_running_cargado = Competencia.objects.filter(
+            pk=instance.pk
+        ).values_list('is_running', flat=True).first()
 
 
 @receiver(post_save, sender=Competencia)
 def competencia_estado_cambiado(sender, instance, created, **kwargs):
     """
     Notifica a los jueces cuando cambia el estado de una competencia.
-    Se dispara cuando se cambia is_running desde el admin de Django.
+    Se dispara cuando se cambia is_running con save(); el admin y la API usan
+    cambiar_estado, que registra su propia notificación.
     """
+    previous_is_running = bool(getattr(instance, '_is_running_cargado', None))
+    instance._is_running_cargado = instance.is_running
+    transaction.on_commit(invalidar_estados_competencias)
+
     # Solo notificar si no es una creación y el estado cambió
     if created:
         return
-    
-    previous_is_running = getattr(instance, '_previous_is_running', False)
+
+    # Nombre, fecha, estado o visibilidad se muestran en las páginas públicas:
+    # avanzar la versión tras el commit para invalidar fragmentos cacheados y ETags
+    # (antes, una petición podría cachear los datos viejos bajo la versión nueva)
+    competencia_id = instance.id
+    transaction.on_commit(lambda: LeaderboardService().tocar(competencia_id))
     
     # Si el estado no cambió, no hacer nada
     if previous_is_running == instance.is_running:
         return
     
-    channel_layer = get_channel_layer()
-    if not channel_layer:
-        logger.warning("Channel layer no disponible; no se puede enviar notificación")
-        return
-    
-    group_name = f'competencia_{instance.id}'
-    
-    # Determinar el tipo de evento
     if instance.is_running:
-        tipo_evento = 'competencia_iniciada'
-        mensaje = 'La competencia ha iniciado'
         logger.info("Competencia iniciada: %s (id=%s)", instance.name, instance.id)
     else:
-        tipo_evento = 'competencia_detenida'
-        mensaje = 'La competencia ha finalizado'
         logger.info("Competencia detenida: %s (id=%s)", instance.name, instance.id)
     
-    # Enviar notificación al grupo de la competencia
-    try:
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': tipo_evento,
-                'data': {
-                    'mensaje': mensaje,
-                    'competencia_id': instance.id,
-                    'competencia_nombre': instance.name,
-                    'en_curso': instance.is_running,
-                }
-            }
-        )
-        logger.debug("Notificación enviada al grupo %s: %s", group_name, tipo_evento)
-    except Exception as e:
-        logger.error("Error enviando notificación WebSocket: %s", e, exc_info=True)
+    # La notificación se guarda en la misma transacción y se envía después del commit
+    BandejaSalidaService().registrar_cambio_estado(instance)
+
+
+@receiver(post_delete, sender=Competencia)
+def competencia_eliminada(sender, instance, **kwargs):
+    """
+    Invalida el cache de estados al eliminar una competencia.
+    """
+    transaction.on_commit(invalidar_estados_competencias)
+
+
+@receiver(post_save, sender=Equipo)
+@receiver(post_delete, sender=Equipo)
+def equipo_modificado(sender, instance, **kwargs):
+    """
+    Invalida el leaderboard de la competencia cuando se edita un equipo
+    (nombre, dorsal, categoría o eliminación desde el admin).
+    """
+    competencia_id = instance.competition_id
+    transaction.on_commit(lambda: LeaderboardService().invalidar(competencia_id))
+
+
+@receiver(post_save, sender=Juez)
+@receiver(post_delete, sender=Juez)
+def juez_modificado(sender, instance, **kwargs):
+    """
+    Invalida el cache de autenticación del juez (desactivación, cambio de datos o eliminación).
+    """
+    juez_id = instance.id
+    transaction.on_commit(lambda: invalidar_juez(juez_id))
+
+
+@receiver(post_save, sender=Equipo)
+@receiver(post_delete, sender=Equipo)
+def equipo_asignacion_modificada(sender, instance, **kwargs):
+    """
+    Invalida el cache de los jueces afectados cuando se crea, reasigna o elimina un equipo.
+    """
+    jueces = {instance.judge_id, getattr(instance, '_judge_id_cargado', None)} - {None}
+    instance._judge_id_cargado = instance.judge_id
+    for juez_id in jueces:
+        transaction.on_commit(lambda juez_id=juez_id: invalidar_juez(juez_id))
+
+
+@receiver(post_save, sender=RegistroTiempo)
+@receiver(post_delete, sender=RegistroTiempo)
+def registro_tiempo_modificado(sender, instance, **kwargs):
+    """
+    Recalcula los agregados del equipo e invalida los leaderboards cuando se edita
+    o elimina un registro desde el admin.
+    Los batches de los jueces usan bulk_create (sin señales) y se aplican de forma incremental.
+    """
+    equipo = Equipo.objects.filter(pk=instance.team_id).first()
+    if equipo is None:
+        # Borrado en cascada del equipo: equipo_modificado invalida su competencia
+        transaction.on_commit(lambda: LeaderboardService().invalidar_todo())
+        return
+    equipo.recalcular_agregados()
+    competencia_id = equipo.competition_id
+    transaction.on_commit(lambda: LeaderboardService().invalidar(competencia_id))
@@ -0,0 +1,75 @@
+"""
+Módulo: base (tests)
+Ajustes y datos comunes de los tests.
+
+Los tests no dependen de Redis: AJUSTES_SIN_REDIS cambia el cache y las
+channel layers por sus versiones en memoria (se aplica con override_settings).
+"""
+
+from django.utils import timezone
+
+from app.models import Competencia, Equipo, Juez
+
+AJUSTES_SIN_REDIS = {
+    'CACHES': {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    },
+    'CHANNEL_LAYERS': {
+        'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+        'publico': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+    },
+    'INGESTA_MODO': 'directa',
+}
+
+# Redis en un puerto sin servidor: cada operación falla con ConnectionError
+CACHE_CAIDO = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:1/1',
+    },
+}
+
+# Las páginas completas se renderizan sin haber corrido collectstatic
+STORAGES_SIN_MANIFEST = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def crear_competencia(nombre='5K Prueba', en_curso=True, equipos=1, juez=None):
+    """
+    Crea una competencia con un juez y sus equipos.
+
+    Args:
+        nombre: Nombre de la competencia
+        en_curso: Si se crea ya iniciada
+        equipos: Número de equipos del juez
+        juez: Juez existente (si no, se crea uno)
+
+    Returns:
+        Tupla (competencia, juez, lista de equipos)
+    """
+    competencia = Competencia.objects.create(
+        name=nombre,
+        datetime=timezone.now(),
+        is_running=en_curso,
+        started_at=timezone.now() if en_curso else None,
+    )
+    if juez is None:
+        juez = Juez.objects.create(username=f'juez_{competencia.id}', password='x')
+    creados = [
+        Equipo.objects.create(
+            competition=competencia,
+            judge=juez,
+            number=numero,
+            name=f'Equipo {numero}',
+            category='estudiantes',
+        )
+        for numero in range(1, equipos + 1)
+    ]
+    return competencia, juez, creados
+
+
+def lote_registros(cantidad=15, tiempo=1000):
+    """Lote de registros como lo envía la app de los jueces (tiempos en ms)."""
+    return [{'tiempo': tiempo + indice} for indice in range(cantidad)]
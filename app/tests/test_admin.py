@@ -0,0 +1,69 @@
+"""
+Tests de los listados del admin: número de consultas constante sin importar
+cuántas filas se muestran.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from app.models import RegistroTiempo
+
+from .base import AJUSTES_SIN_REDIS, STORAGES_SIN_MANIFEST, crear_competencia
+
+
+@override_settings(STORAGES=STORAGES_SIN_MANIFEST, **AJUSTES_SIN_REDIS)
+class ConsultasListadosAdminTests(TestCase):
+
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        self.competencia, self.juez, (self.equipo,) = crear_competencia()
+        RegistroTiempo.objects.create(team=self.equipo, time=1000)
+
+    def _poblar(self):
+        for indice in range(5):
+            competencia, juez, equipos = crear_competencia(nombre=f'Carrera {indice}', en_curso=False, equipos=4)
+            RegistroTiempo.objects.bulk_create(
+                RegistroTiempo(team=equipo, time=1000 * numero)
+                for numero, equipo in enumerate(equipos, 1)
+                for _ in range(3)
+            )
+            RegistroTiempo.objects.create(team=equipos[0], time=0)
+
+    def _consultas(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return len(consultas)
+
+    def _verificar_constante(self, nombre, filas_esperadas):
+        url = reverse(nombre)
+        con_una_fila = self._consultas(url)
+
+        self._poblar()
+        with self.assertNumQueries(con_una_fila):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.context['cl'].result_count, filas_esperadas)
+
+    def test_listado_de_competencias(self):
+        self._verificar_constante('admin:app_competencia_changelist', 6)
+
+    def test_listado_de_equipos(self):
+        self._verificar_constante('admin:app_equipo_changelist', 21)
+
+    def test_listado_de_resultados(self):
+        self._verificar_constante('admin:app_resultadoequipo_changelist', 21)
+
+    def test_listado_de_jueces(self):
+        self._verificar_constante('admin:app_juez_changelist', 6)
+
+    def test_resultados_muestran_la_posicion_del_ranking(self):
+        self._poblar()
+
+        respuesta = self.client.get(reverse('admin:app_resultadoequipo_changelist'))
+
+        self.assertContains(respuesta, 'DESCALIFICADO')
+        self.assertContains(respuesta, '1º')
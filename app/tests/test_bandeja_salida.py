@@ -0,0 +1,147 @@
+"""
+Tests de la bandeja de salida (app/services/bandeja_salida_service.py).
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from app.models import EventoSalida
+from app.services import BandejaSalidaService
+
+from .base import AJUSTES_SIN_REDIS, crear_competencia
+
+ENVIAR = 'app.services.bandeja_salida_service.enviar_a_competencia'
+
+
+@override_settings(SALIDA_MAX_INTENTOS=3, **AJUSTES_SIN_REDIS)
+class DespacharPendientesTests(TestCase):
+
+    def setUp(self):
+        self.competencia, _, _ = crear_competencia()
+        self.otra, _, _ = crear_competencia(nombre='Otra', en_curso=False)
+        EventoSalida.objects.all().delete()
+        self.servicio = BandejaSalidaService()
+
+    def _evento(self, competencia, tipo, **campos):
+        return EventoSalida.objects.create(
+            key=f'{competencia.id}:{tipo}:{EventoSalida.objects.count()}',
+            competition=competencia,
+            payload={'type': tipo, 'data': {'competencia_id': competencia.id}},
+            **campos,
+        )
+
+    def _estado(self, evento):
+        evento.refresh_from_db()
+        return evento.status
+
+    def test_envia_en_orden_con_el_evento_id(self):
+        iniciada = self._evento(self.competencia, 'competencia_iniciada')
+        detenida = self._evento(self.competencia, 'competencia_detenida')
+
+        with mock.patch(ENVIAR, return_value=True) as enviar:
+            self.assertEqual(self.servicio.despachar_pendientes(), 2)
+
+        enviados = [llamada.args[1] for llamada in enviar.call_args_list]
+        self.assertEqual([m['type'] for m in enviados], ['competencia_iniciada', 'competencia_detenida'])
+        self.assertEqual([m['data']['evento_id'] for m in enviados], [iniciada.id, detenida.id])
+        self.assertEqual(self._estado(iniciada), 'enviado')
+        self.assertIsNotNone(iniciada.sent_at)
+        self.assertEqual(self._estado(detenida), 'enviado')
+
+    def test_fallo_retiene_solo_a_su_competencia_y_se_reintenta(self):
+        iniciada = self._evento(self.competencia, 'competencia_iniciada')
+        detenida = self._evento(self.competencia, 'competencia_detenida')
+        de_otra = self._evento(self.otra, 'competencia_iniciada')
+
+        def falla_la_primera(competencia_id, mensaje):
+            if competencia_id == self.competencia.id:
+                raise ConnectionError('redis caído')
+            return True
+
+        with mock.patch(ENVIAR, side_effect=falla_la_primera):
+            self.servicio.despachar_pendientes()
+
+        iniciada.refresh_from_db()
+        self.assertEqual(iniciada.status, 'pendiente')
+        self.assertEqual(iniciada.attempts, 1)
+        self.assertIn('redis caído', iniciada.last_error)
+        self.assertGreater(iniciada.next_attempt_at, timezone.now())
+        self.assertEqual(self._estado(detenida), 'pendiente')
+        self.assertEqual(self._estado(de_otra), 'enviado')
+
+        # Mientras espera el reintento, 'detenida' no se adelanta
+        with mock.patch(ENVIAR, return_value=True) as enviar:
+            self.assertEqual(self.servicio.despachar_pendientes(), 0)
+        enviar.assert_not_called()
+
+        EventoSalida.objects.filter(pk=iniciada.pk).update(next_attempt_at=timezone.now())
+        with mock.patch(ENVIAR, return_value=True) as enviar:
+            self.assertEqual(self.servicio.despachar_pendientes(), 2)
+        self.assertEqual(
+            [llamada.args[1]['type'] for llamada in enviar.call_args_list],
+            ['competencia_iniciada', 'competencia_detenida'],
+        )
+        self.assertEqual(self._estado(iniciada), 'enviado')
+        self.assertEqual(self._estado(detenida), 'enviado')
+
+    def test_eventos_en_espera_no_bloquean_a_otras_competencias(self):
+        en_espera = timezone.now() + timedelta(minutes=5)
+        for indice in range(3):
+            self._evento(self.competencia, f'espera_{indice}', next_attempt_at=en_espera)
+        de_otra = self._evento(self.otra, 'competencia_iniciada')
+
+        with mock.patch(ENVIAR, return_value=True):
+            self.assertEqual(self.servicio.despachar_pendientes(limite=1), 1)
+
+        self.assertEqual(self._estado(de_otra), 'enviado')
+
+    def test_evento_reclamado_por_otro_proceso_retiene_a_los_siguientes(self):
+        # Otro despachador lo reclamó: tiene plazo en el futuro y sigue pendiente
+        self._evento(
+            self.competencia, 'competencia_iniciada',
+            next_attempt_at=timezone.now() + timedelta(seconds=BandejaSalidaService.PLAZO_RECLAMO),
+        )
+        detenida = self._evento(self.competencia, 'competencia_detenida')
+
+        with mock.patch(ENVIAR, return_value=True) as enviar:
+            self.assertEqual(self.servicio.despachar_pendientes(), 0)
+
+        enviar.assert_not_called()
+        self.assertEqual(self._estado(detenida), 'pendiente')
+
+    def test_envio_fuera_de_la_transaccion_de_reclamo(self):
+        evento = self._evento(self.competencia, 'competencia_iniciada')
+        plazos = []
+
+        def enviar(competencia_id, mensaje):
+            # Ya reclamado (y confirmado) cuando se envía
+            plazos.append(EventoSalida.objects.get(pk=evento.pk).next_attempt_at)
+            return True
+
+        with mock.patch(ENVIAR, side_effect=enviar):
+            self.servicio.despachar_pendientes()
+
+        self.assertGreater(plazos[0], timezone.now())
+
+    def test_se_descarta_tras_el_maximo_de_intentos(self):
+        evento = self._evento(self.competencia, 'competencia_iniciada', attempts=2)
+        siguiente = self._evento(self.competencia, 'competencia_detenida')
+
+        with mock.patch(ENVIAR, side_effect=[ConnectionError('redis caído'), True]):
+            self.servicio.despachar_pendientes()
+
+        self.assertEqual(self._estado(evento), 'descartado')
+        self.assertEqual(self._estado(siguiente), 'enviado')
+
+    def test_sin_capa_cuenta_como_fallo(self):
+        evento = self._evento(self.competencia, 'competencia_iniciada')
+
+        with mock.patch(ENVIAR, return_value=False):
+            self.servicio.despachar_pendientes()
+
+        evento.refresh_from_db()
+        self.assertEqual(evento.attempts, 1)
+        self.assertEqual(evento.status, 'pendiente')
@@ -0,0 +1,80 @@
+"""
+Tests del cache de jueces (app/utils/cache_jueces.py): aciertos, invalidación
+desde las señales y caída del cache.
+"""
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from app.models import Equipo
+from app.utils.cache_jueces import invalidar_juez, obtener_juez
+
+from .base import AJUSTES_SIN_REDIS, CACHE_CAIDO, crear_competencia
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class CacheJuecesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.competencia, self.juez, self.equipos = crear_competencia(equipos=2)
+
+    def test_acierto_no_consulta_la_base(self):
+        juez = obtener_juez(self.juez.id)
+        self.assertEqual(
+            juez.equipos_asignados,
+            [(equipo.id, self.competencia.id) for equipo in self.equipos],
+        )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(obtener_juez(self.juez.id).id, self.juez.id)
+
+    def test_juez_inactivo_o_inexistente(self):
+        self.juez.is_active = False
+        self.juez.save()
+
+        self.assertIsNone(obtener_juez(self.juez.id))
+        self.assertIsNone(obtener_juez(self.juez.id + 1000))
+
+    def test_desactivar_juez_invalida_tras_el_commit(self):
+        obtener_juez(self.juez.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.juez.is_active = False
+            self.juez.save()
+
+        self.assertIsNone(obtener_juez(self.juez.id))
+
+    def test_crear_o_reasignar_equipo_invalida_tras_el_commit(self):
+        obtener_juez(self.juez.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = Equipo.objects.create(
+                competition=self.competencia, judge=self.juez, number=3,
+                name='Equipo 3', category='estudiantes',
+            )
+        self.assertIn((nuevo.id, self.competencia.id), obtener_juez(self.juez.id).equipos_asignados)
+
+        _, otro_juez, _ = crear_competencia(nombre='Otra', en_curso=False, equipos=0)
+        obtener_juez(otro_juez.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.judge = otro_juez
+            nuevo.save()
+
+        self.assertNotIn(nuevo.id, dict(obtener_juez(self.juez.id).equipos_asignados))
+        self.assertIn(nuevo.id, dict(obtener_juez(otro_juez.id).equipos_asignados))
+
+    @override_settings(CACHES=CACHE_CAIDO)
+    def test_cache_caido_consulta_la_base(self):
+        with self.assertLogs('app.utils.cache_jueces', 'WARNING'):
+            juez = obtener_juez(self.juez.id)
+            invalidar_juez(self.juez.id)
+
+        self.assertEqual(juez.id, self.juez.id)
+        self.assertEqual(len(juez.equipos_asignados), 2)
+
+        # Las señales invalidan tras el commit sin propagar el error
+        with self.assertLogs('app.utils.cache_jueces', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.juez.is_active = False
+                self.juez.save()
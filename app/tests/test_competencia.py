@@ -0,0 +1,166 @@
+"""
+Tests del cambio de estado de las competencias (Competencia.cambiar_estado y
+el índice único parcial que admite una sola competencia en curso).
+"""
+
+import threading
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from app.models import Competencia, EventoSalida
+
+from .base import AJUSTES_SIN_REDIS, STORAGES_SIN_MANIFEST, crear_competencia
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class CambiarEstadoTests(TestCase):
+
+    def setUp(self):
+        self.competencia, _, _ = crear_competencia(en_curso=False)
+        self.otra, _, _ = crear_competencia(nombre='Otra', en_curso=False)
+
+    def test_iniciar_y_detener(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.competencia.cambiar_estado(True))
+        self.competencia.refresh_from_db()
+        self.assertTrue(self.competencia.is_running)
+        self.assertIsNotNone(self.competencia.started_at)
+
+        self.assertTrue(self.competencia.cambiar_estado(False))
+        self.competencia.refresh_from_db()
+        self.assertFalse(self.competencia.is_running)
+        self.assertIsNotNone(self.competencia.finished_at)
+        self.assertEqual(
+            list(EventoSalida.objects.filter(competition=self.competencia).values_list('payload__type', flat=True)),
+            ['competencia_iniciada', 'competencia_detenida'],
+        )
+
+    def test_iniciar_dos_veces(self):
+        self.assertTrue(self.competencia.cambiar_estado(True))
+
+        self.assertFalse(self.competencia.cambiar_estado(True))
+        self.assertEqual(EventoSalida.objects.filter(competition=self.competencia).count(), 1)
+
+    def test_no_inicia_con_otra_en_curso(self):
+        self.assertTrue(self.otra.cambiar_estado(True))
+
+        self.assertFalse(self.competencia.cambiar_estado(True))
+        self.assertEqual(self.competencia.start()['message'], 'another_running')
+        self.assertFalse(Competencia.objects.get(pk=self.competencia.pk).is_running)
+
+    def test_indice_unico_admite_una_sola_en_curso(self):
+        Competencia.objects.filter(pk=self.otra.pk).update(is_running=True)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Competencia.objects.filter(pk=self.competencia.pk).update(is_running=True)
+
+    def test_inicio_que_pierde_la_carrera_contra_el_indice(self):
+        # La otra confirma entre el NOT EXISTS y el UPDATE: lo rechaza el índice
+        Competencia.objects.filter(pk=self.otra.pk).update(is_running=True)
+
+        sin_otras = lambda consulta: Exists(consulta.none())
+        with mock.patch('app.models.competencia.Exists', side_effect=sin_otras):
+            self.assertFalse(self.competencia.cambiar_estado(True))
+
+        self.assertFalse(Competencia.objects.get(pk=self.competencia.pk).is_running)
+        self.assertFalse(EventoSalida.objects.filter(competition=self.competencia).exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite en memoria no admite escrituras concurrentes entre hilos')
+@override_settings(**AJUSTES_SIN_REDIS)
+class InicioConcurrenteTests(TransactionTestCase):
+    """Dos peticiones inician a la vez competencias distintas: solo una gana."""
+
+    def test_doble_inicio_concurrente(self):
+        competencias = [
+            crear_competencia(nombre=f'Competencia {indice}', en_curso=False)[0]
+            for indice in range(2)
+        ]
+        barrera = threading.Barrier(len(competencias))
+        resultados = {}
+
+        def iniciar(competencia):
+            try:
+                barrera.wait(5)
+                resultados[competencia.pk] = competencia.cambiar_estado(True)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=iniciar, args=(c,)) for c in competencias]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join(10)
+
+        self.assertEqual(sorted(resultados.values()), [False, True])
+        self.assertEqual(Competencia.objects.filter(is_running=True).count(), 1)
+        ganadora = next(pk for pk, inicio in resultados.items() if inicio)
+        self.assertEqual(
+            list(EventoSalida.objects.values_list('competition_id', flat=True)),
+            [ganadora],
+        )
+
+
+@override_settings(STORAGES=STORAGES_SIN_MANIFEST, **AJUSTES_SIN_REDIS)
+class CambiarEstadoDesdeAdminTests(TestCase):
+
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        self.competencia, _, _ = crear_competencia(en_curso=False, equipos=0)
+        self.otra, _, _ = crear_competencia(nombre='Otra', en_curso=False, equipos=0)
+
+    def _guardar(self, competencia, en_curso):
+        datos = {
+            'name': competencia.name,
+            'datetime_0': competencia.datetime.strftime('%Y-%m-%d'),
+            'datetime_1': competencia.datetime.strftime('%H:%M:%S'),
+            'is_active': 'on',
+            'teams-TOTAL_FORMS': '0',
+            'teams-INITIAL_FORMS': '0',
+            'teams-MIN_NUM_FORMS': '0',
+            'teams-MAX_NUM_FORMS': '1000',
+        }
+        if en_curso:
+            datos['is_running'] = 'on'
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('admin:app_competencia_change', args=[competencia.pk]), datos)
+
+    def test_iniciar_desde_el_formulario_usa_cambiar_estado(self):
+        respuesta = self._guardar(self.competencia, en_curso=True)
+
+        self.assertEqual(respuesta.status_code, 302)
+        self.competencia.refresh_from_db()
+        self.assertTrue(self.competencia.is_running)
+        self.assertIsNotNone(self.competencia.started_at)
+        self.assertEqual(
+            list(EventoSalida.objects.filter(competition=self.competencia).values_list('payload__type', flat=True)),
+            ['competencia_iniciada'],
+        )
+
+    def test_otra_en_curso_es_error_del_formulario(self):
+        self.otra.cambiar_estado(True)
+
+        respuesta = self._guardar(self.competencia, en_curso=True)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('is_running', respuesta.context['adminform'].form.errors)
+
+    def test_inicio_concurrente_muestra_mensaje_y_no_un_500(self):
+        # El otro admin inició después de que este formulario pasara la validación
+        self.otra.cambiar_estado(True)
+
+        with mock.patch.object(Competencia, 'clean'), mock.patch.object(Competencia, 'validate_constraints'):
+            respuesta = self._guardar(self.competencia, en_curso=True)
+
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertFalse(Competencia.objects.get(pk=self.competencia.pk).is_running)
+        self.assertTrue(any(
+            "'Otra' ya está en curso" in str(mensaje) for mensaje in get_messages(respuesta.wsgi_request)
+        ))
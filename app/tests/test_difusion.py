@@ -0,0 +1,198 @@
+"""
+Tests de la difusión agrupada (app/services/difusion_service.py) con un reloj
+falso: sin hilos ni esperas reales.
+"""
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from app.services import difusion_service
+from app.services.difusion_service import DifusionService, Programador
+
+from .base import AJUSTES_SIN_REDIS, CACHE_CAIDO
+
+
+class RelojFalso:
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+    def avanzar(self, segundos):
+        self.ahora += segundos
+
+
+def resumen(equipo_id, total=1000):
+    return {
+        'equipo_id': equipo_id,
+        'equipo_nombre': f'Equipo {equipo_id}',
+        'equipo_dorsal': equipo_id,
+        'total_registros': 15,
+        'tiempo_total': total,
+    }
+
+
+def delta(secuencia, equipo_id):
+    return {
+        'competencia_id': 7,
+        'secuencia': secuencia,
+        'version': f'1.{secuencia}',
+        'equipo': {'id': equipo_id, 'posicion': 1},
+        'cambios': [],
+    }
+
+
+class ProgramadorTests(SimpleTestCase):
+
+    def test_ejecuta_solo_lo_vencido_en_orden(self):
+        reloj = RelojFalso()
+        ejecutadas = []
+        programador = Programador(ejecutadas.append, reloj=reloj)
+
+        with mock.patch.object(programador, '_correr'):
+            programador.programar(0.5, 2)
+            programador.programar(0.25, 1)
+            programador.ejecutar_vencidas()
+            self.assertEqual(ejecutadas, [])
+
+            reloj.avanzar(0.3)
+            programador.ejecutar_vencidas()
+            self.assertEqual(ejecutadas, [1])
+
+            reloj.avanzar(0.3)
+            programador.ejecutar_vencidas()
+        self.assertEqual(ejecutadas, [1, 2])
+
+    def test_un_solo_hilo_para_todas_las_ventanas(self):
+        programador = Programador(lambda competencia_id: None)
+
+        with mock.patch('app.services.difusion_service.threading.Thread') as hilo:
+            for competencia_id in range(5):
+                programador.programar(10, competencia_id)
+
+        hilo.assert_called_once()
+
+    def test_un_fallo_no_detiene_las_demas(self):
+        reloj = RelojFalso()
+        ejecutadas = []
+
+        def accion(competencia_id):
+            if competencia_id == 1:
+                raise RuntimeError('capa caída')
+            ejecutadas.append(competencia_id)
+
+        programador = Programador(accion, reloj=reloj)
+        with mock.patch.object(programador, '_correr'):
+            programador.programar(0, 1)
+            programador.programar(0, 2)
+            with self.assertLogs('app.services.difusion_service', 'ERROR'):
+                programador.ejecutar_vencidas()
+
+        self.assertEqual(ejecutadas, [2])
+
+
+@override_settings(DIFUSION_VENTANA_MS=250, **AJUSTES_SIN_REDIS)
+class DifusionServiceTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.reloj = RelojFalso()
+        self.programador = Programador(lambda competencia_id: DifusionService().vaciar(competencia_id), reloj=self.reloj)
+        for parche in (
+            mock.patch.object(difusion_service, '_programador', self.programador),
+            # El mismo reloj para las ranuras compartidas (reloj de pared)
+            mock.patch.object(difusion_service, 'time', mock.Mock(time=self.reloj)),
+            mock.patch.object(self.programador, '_correr'),
+            mock.patch.dict(difusion_service._pendientes, clear=True),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+        enviar = mock.patch.object(difusion_service, 'enviar_a_competencia', return_value=True)
+        self.enviar = enviar.start()
+        self.addCleanup(enviar.stop)
+
+    def _datos_enviados(self):
+        return [llamada.args[1]['data'] for llamada in self.enviar.call_args_list]
+
+    def test_agrupa_la_ventana_en_un_mensaje(self):
+        servicio = DifusionService()
+        servicio.publicar_registros(7, resumen(1), delta(2, 1))
+        servicio.publicar_registros(7, resumen(2), delta(1, 2))
+        servicio.publicar_registros(7, resumen(1, total=900), delta(3, 1))
+
+        self.reloj.avanzar(0.1)
+        self.programador.ejecutar_vencidas()
+        self.enviar.assert_not_called()
+
+        self.reloj.avanzar(0.2)
+        self.programador.ejecutar_vencidas()
+
+        (datos,) = self._datos_enviados()
+        self.assertEqual(datos['equipo_ids'], [1, 2])
+        self.assertEqual(datos['equipos'][0]['tiempo_total'], 900)
+        (tramo,) = datos['deltas']
+        self.assertEqual((tramo['desde'], tramo['secuencia']), (1, 3))
+        self.assertFalse(datos['incompleto'])
+
+    def test_maximo_un_mensaje_por_ventana(self):
+        servicio = DifusionService()
+        for paso in range(8):
+            servicio.publicar_registros(7, resumen(paso), delta(paso + 1, paso))
+            self.reloj.avanzar(0.0625)
+            self.programador.ejecutar_vencidas()
+
+        # 8 actualizaciones en 0,5 s con ventanas de 0,25 s
+        self.assertEqual(len(self._datos_enviados()), 2)
+
+    def test_ventana_vacia_no_envia(self):
+        DifusionService().vaciar(7)
+
+        self.enviar.assert_not_called()
+        self.assertEqual(cache.get('difusion:7:4000'), None)
+
+    def test_ranura_tomada_por_otro_proceso_espera_la_siguiente(self):
+        servicio = DifusionService()
+        servicio.publicar_registros(7, resumen(1), delta(1, 1))
+        # Otro worker envió en la ranura en la que vence esta ventana
+        cache.add('difusion:7:4001', 1)
+
+        self.reloj.avanzar(0.25)
+        self.programador.ejecutar_vencidas()
+        self.enviar.assert_not_called()
+
+        # Lo que llega mientras tanto viaja en el mismo mensaje
+        servicio.publicar_registros(7, resumen(2), delta(2, 2))
+        self.reloj.avanzar(0.25)
+        self.programador.ejecutar_vencidas()
+
+        (datos,) = self._datos_enviados()
+        self.assertEqual(datos['equipo_ids'], [1, 2])
+        self.assertEqual(cache.get('difusion:7:4002'), 1)
+
+    @override_settings(CACHES=CACHE_CAIDO)
+    def test_cache_caido_envia_igual(self):
+        DifusionService().publicar_registros(7, resumen(1), delta(1, 1))
+        self.reloj.avanzar(0.25)
+
+        with self.assertLogs('app.services.difusion_service', 'WARNING'):
+            self.programador.ejecutar_vencidas()
+
+        self.assertEqual(len(self._datos_enviados()), 1)
+
+    def test_sin_delta_marca_incompleto(self):
+        DifusionService().publicar_registros(7, resumen(1), None)
+        self.reloj.avanzar(0.25)
+        self.programador.ejecutar_vencidas()
+
+        self.assertTrue(self._datos_enviados()[0]['incompleto'])
+
+    @override_settings(DIFUSION_VENTANA_MS=0)
+    def test_sin_ventana_envia_al_momento(self):
+        DifusionService().publicar_registros(7, resumen(1), delta(1, 1))
+
+        self.assertEqual(len(self._datos_enviados()), 1)
+        self.assertEqual(self.programador.tomar_vencidas(), [])
@@ -0,0 +1,107 @@
+"""
+Tests de la exportación CSV (app/services/exportacion_service.py).
+"""
+
+import csv
+import io
+import warnings
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from app.models import RegistroTiempo
+from app.services import ExportacionService
+from app.services.exportacion_service import es_peticion_asgi
+
+from .base import AJUSTES_SIN_REDIS, crear_competencia
+
+
+def leer_csv(bloques):
+    texto = b''.join(bloques).decode('utf-8').lstrip('\ufeff')
+    return list(csv.reader(io.StringIO(texto)))
+
+
+class InyeccionFormulasTests(SimpleTestCase):
+
+    def test_textos_que_empiezan_como_formula_se_escapan(self):
+        filas = [
+            ['=HYPERLINK("http://x","clic")', '+1', '-5', '@SUM(A1)', '\tTab', 'Equipo 1', -5, 1200],
+        ]
+
+        (encabezado, fila) = leer_csv(ExportacionService().bloques_csv(['a'] * 8, filas))
+
+        self.assertEqual(
+            fila,
+            ["'=HYPERLINK(\"http://x\",\"clic\")", "'+1", "'-5", "'@SUM(A1)", "'\tTab", 'Equipo 1', '-5', '1200'],
+        )
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class ExportarRegistrosTests(TestCase):
+
+    def test_nombre_de_equipo_malicioso(self):
+        competencia, _, (equipo,) = crear_competencia()
+        equipo.name = '=cmd|"/c calc"!A1'
+        equipo.save()
+        RegistroTiempo.objects.create(team=equipo, time=1500)
+
+        servicio = ExportacionService()
+        filas = leer_csv(servicio.bloques_csv(
+            servicio.ENCABEZADO_REGISTROS, servicio.filas_registros([competencia.id]),
+        ))
+
+        self.assertEqual(filas[1][2], '\'=cmd|"/c calc"!A1')
+        self.assertEqual(filas[1][6], '1500')
+
+
+class StreamingTests(SimpleTestCase):
+
+    def _filas(self, cantidad, leidas):
+        for indice in range(cantidad):
+            leidas.append(indice)
+            yield [f'Equipo {indice}', indice]
+
+    def test_wsgi_entrega_el_primer_bloque_sin_leer_todo(self):
+        leidas = []
+        servicio = ExportacionService()
+
+        with mock.patch.object(ExportacionService, 'FILAS_POR_BLOQUE', 10):
+            respuesta = servicio.respuesta_csv('x.csv', ['equipo', 'n'], self._filas(1000, leidas))
+            self.assertFalse(respuesta.is_async)
+            with warnings.catch_warnings():
+                warnings.filterwarnings('error', message='StreamingHttpResponse must consume')
+                primero = next(iter(respuesta.streaming_content))
+
+        self.assertIn(b'Equipo 0', primero)
+        self.assertLess(len(leidas), 20)
+
+    def test_asgi_usa_iterador_asincrono(self):
+        respuesta = ExportacionService().respuesta_csv('x.csv', ['n'], iter([]), asincrono=True)
+
+        self.assertTrue(respuesta.is_async)
+
+    def test_detecta_el_handler(self):
+        self.assertFalse(es_peticion_asgi(RequestFactory().get('/')))
+        self.assertTrue(es_peticion_asgi(AsyncRequestFactory().get('/')))
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class ExportarDesdeAdminTests(TestCase):
+
+    def test_descarga_sincrona_bajo_wsgi(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        competencia, _, (equipo,) = crear_competencia()
+        RegistroTiempo.objects.create(team=equipo, time=1500)
+
+        with warnings.catch_warnings():
+            warnings.filterwarnings('error', message='StreamingHttpResponse must consume')
+            respuesta = self.client.get(
+                reverse('admin:app_competencia_exportar_registros', args=[competencia.id])
+            )
+            contenido = b''.join(respuesta.streaming_content)
+
+        self.assertFalse(respuesta.is_async)
+        self.assertIn(b'Equipo 1', contenido)
@@ -0,0 +1,103 @@
+"""
+Tests de la cola de ingesta (app/services/ingesta_service.py).
+"""
+
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from app.models import LoteIngesta, RegistroTiempo
+from app.services import IngestaService, RegistroService
+
+from .base import AJUSTES_SIN_REDIS, crear_competencia, lote_registros
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class ProcesarPendientesTests(TestCase):
+
+    def setUp(self):
+        self.competencia, self.juez, self.equipos = crear_competencia(equipos=3)
+
+    def _encolar_sin_validar(self, equipo, payload):
+        return LoteIngesta.objects.create(judge=self.juez, team=equipo, payload=payload)
+
+    def test_lote_malformado_no_bloquea_la_cola(self):
+        bueno1 = self._encolar_sin_validar(self.equipos[0], lote_registros())
+        malo = self._encolar_sin_validar(self.equipos[1], [1, 2])
+        bueno2 = self._encolar_sin_validar(self.equipos[2], lote_registros())
+
+        self.assertEqual(IngestaService().procesar_pendientes(), 3)
+
+        for lote in (bueno1, malo, bueno2):
+            lote.refresh_from_db()
+        self.assertEqual(bueno1.status, 'confirmado')
+        self.assertEqual(malo.status, 'rechazado')
+        self.assertEqual(bueno2.status, 'confirmado')
+        self.assertEqual(malo.result['total_guardados'], 0)
+        self.assertEqual(RegistroTiempo.objects.filter(team=self.equipos[1]).count(), 0)
+        self.assertEqual(RegistroTiempo.objects.filter(team=self.equipos[2]).count(), 15)
+
+    def test_excepcion_en_un_lote_revierte_solo_su_savepoint(self):
+        lotes = [self._encolar_sin_validar(equipo, lote_registros()) for equipo in self.equipos]
+        original = RegistroService._registrar_batch_impl
+
+        def falla_en_el_segundo(servicio, juez, equipo_id, registros):
+            resultado = original(servicio, juez, equipo_id, registros)
+            if equipo_id == self.equipos[1].id:
+                raise RuntimeError('fallo simulado')
+            return resultado
+
+        with mock.patch.object(RegistroService, '_registrar_batch_impl', falla_en_el_segundo):
+            self.assertEqual(IngestaService().procesar_pendientes(), 3)
+
+        estados = [LoteIngesta.objects.get(pk=lote.pk).status for lote in lotes]
+        self.assertEqual(estados, ['confirmado', 'rechazado', 'confirmado'])
+        fallido = LoteIngesta.objects.get(pk=lotes[1].pk)
+        self.assertEqual(fallido.result['motivo'], 'error_procesamiento')
+        self.assertIn('fallo simulado', fallido.result['registros_fallidos'][0]['error'])
+        # Lo que alcanzó a escribir el lote fallido se revirtió con su savepoint
+        self.assertEqual(RegistroTiempo.objects.filter(team=self.equipos[1]).count(), 0)
+        self.equipos[1].refresh_from_db()
+        self.assertEqual(self.equipos[1].record_count, 0)
+        self.assertEqual(RegistroTiempo.objects.filter(team=self.equipos[2]).count(), 15)
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class EncolarLoteTests(TestCase):
+
+    def setUp(self):
+        self.competencia, self.juez, (self.equipo,) = crear_competencia()
+
+    def test_equipo_id_no_numerico(self):
+        resultado = IngestaService().encolar_lote_sync(self.juez, 'abc', lote_registros())
+
+        self.assertFalse(resultado['exito'])
+        self.assertEqual(resultado['motivo'], 'datos_invalidos')
+        self.assertFalse(LoteIngesta.objects.exists())
+
+    def test_registros_invalidos_no_se_encolan(self):
+        invalidos = (
+            [1, 2],
+            [{'tiempo': 'rápido'}],
+            [{'tiempo': 1.5}],
+            [{'tiempo': -1}],
+            [{'tiempo': 1000, 'id_registro': 'no-es-uuid'}],
+            [{'segundos': 3}],
+            lote_registros(16),
+            [],
+            'no es lista',
+        )
+        for registros in invalidos:
+            with self.subTest(registros=registros):
+                resultado = IngestaService().encolar_lote_sync(self.juez, self.equipo.id, registros)
+                self.assertFalse(resultado['exito'])
+                self.assertEqual(resultado['motivo'], 'datos_invalidos')
+        self.assertFalse(LoteIngesta.objects.exists())
+
+    def test_lote_valido_se_encola(self):
+        resultado = IngestaService().encolar_lote_sync(self.juez, str(self.equipo.id), lote_registros())
+
+        self.assertTrue(resultado['exito'])
+        self.assertEqual(resultado['equipo_id'], self.equipo.id)
+        lote = LoteIngesta.objects.get()
+        self.assertEqual(lote.status, 'pendiente')
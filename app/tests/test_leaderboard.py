@@ -0,0 +1,208 @@
+"""
+Tests del leaderboard en memoria (app/services/leaderboard_service.py).
+"""
+
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from app.services import LeaderboardService
+from app.services import leaderboard_service
+from app.services.leaderboard_service import (
+    EntradaLeaderboard,
+    Leaderboard,
+    _claves_compartidas,
+    _clave_entrada,
+    _incrementar_compartido,
+    combinar_deltas,
+)
+
+from .base import AJUSTES_SIN_REDIS, crear_competencia
+
+
+def entrada(equipo_id, total, categoria='estudiantes', ausentes=0):
+    return EntradaLeaderboard(
+        equipo_id=equipo_id,
+        nombre=f'Equipo {equipo_id}',
+        dorsal=equipo_id,
+        categoria=categoria,
+        tiempo_total_ms=total,
+        mejor_tiempo_ms=total,
+        num_registros=15,
+        jugadores_ausentes=ausentes,
+    )
+
+
+class LeaderboardAplicarTests(SimpleTestCase):
+
+    def setUp(self):
+        self.leaderboard = Leaderboard(1)
+
+    def test_insertar_reporta_solo_posiciones_que_cambian(self):
+        self.assertEqual(self.leaderboard.aplicar(entrada(1, 5000), 1), [(1, 1)])
+        self.assertEqual(self.leaderboard.aplicar(entrada(2, 9000), 2), [(2, 2)])
+        self.assertEqual(self.leaderboard.aplicar(entrada(3, 1000), 3), [(3, 1), (1, 2), (2, 3)])
+        self.assertEqual(self.leaderboard.secuencia, 3)
+
+    def test_reemplazar_un_equipo_lo_mueve(self):
+        for secuencia, (equipo_id, total) in enumerate([(1, 1000), (2, 2000), (3, 3000)], 1):
+            self.leaderboard.aplicar(entrada(equipo_id, total), secuencia)
+
+        cambios = self.leaderboard.aplicar(entrada(3, 500), 4)
+
+        self.assertEqual(cambios, [(3, 1), (1, 2), (2, 3)])
+        self.assertEqual(self.leaderboard.posiciones(), [(3, 1), (1, 2), (2, 3)])
+
+    def test_descalificado_sale_de_las_posiciones(self):
+        self.leaderboard.aplicar(entrada(1, 1000), 1)
+        self.leaderboard.aplicar(entrada(2, 2000), 2)
+
+        cambios = self.leaderboard.aplicar(entrada(1, 1000, ausentes=1), 3)
+
+        self.assertEqual(cambios, [(2, 1)])
+        calificados, descalificados = self.leaderboard.listar()
+        self.assertEqual([e.equipo_id for e in calificados], [2])
+        self.assertEqual([e.equipo_id for e in descalificados], [1])
+
+    def test_posiciones_por_categoria(self):
+        self.leaderboard.aplicar(entrada(1, 3000, 'estudiantes'), 1)
+        self.leaderboard.aplicar(entrada(2, 2000, 'docentes'), 2)
+        self.leaderboard.aplicar(entrada(3, 1000, 'estudiantes'), 3)
+
+        calificados, _ = self.leaderboard.listar('estudiantes')
+        self.assertEqual([(e.equipo_id, e.posicion) for e in calificados], [(3, 1), (1, 2)])
+        self.assertEqual(self.leaderboard.entrada(1).posicion, 3)
+
+    def test_entrada_se_comparte_como_tupla(self):
+        original = entrada(7, 4321, ausentes=2)
+
+        self.assertEqual(EntradaLeaderboard.desde_tupla(original.como_tupla()), original)
+
+
+class CombinarDeltasTests(SimpleTestCase):
+
+    def _delta(self, secuencia, equipo_id, posicion, cambios=()):
+        return {
+            'competencia_id': 1,
+            'secuencia': secuencia,
+            'version': f'1.{secuencia}',
+            'equipo': {'id': equipo_id, 'posicion': posicion},
+            'cambios': list(cambios),
+        }
+
+    def test_deltas_contiguos_se_fusionan_con_la_ultima_posicion(self):
+        tramos = combinar_deltas([
+            self._delta(5, 1, 1),
+            self._delta(6, 2, 1, [(1, 2)]),
+            self._delta(7, 1, 1, [(2, 2)]),
+        ])
+
+        self.assertEqual(len(tramos), 1)
+        tramo = tramos[0]
+        self.assertEqual((tramo['desde'], tramo['secuencia'], tramo['version']), (5, 7, '1.7'))
+        self.assertEqual(dict(tramo['cambios']), {1: 1, 2: 2})
+        self.assertEqual({e['id']: e['posicion'] for e in tramo['equipos']}, {1: 1, 2: 2})
+
+    def test_un_salto_abre_un_tramo_nuevo(self):
+        tramos = combinar_deltas([self._delta(5, 1, 1), self._delta(8, 2, 2)])
+
+        self.assertEqual([(t['desde'], t['secuencia']) for t in tramos], [(5, 5), (8, 8)])
+
+
+@override_settings(WEB_WORKERS=2, **AJUSTES_SIN_REDIS)
+class LeaderboardVariosProcesosTests(TestCase):
+    """Otro proceso se simula escribiendo en el cache compartido lo que él escribiría."""
+
+    def setUp(self):
+        cache.clear()
+        LeaderboardService().invalidar_todo()
+        self.competencia, _, self.equipos = crear_competencia(equipos=3)
+        self.servicio = LeaderboardService()
+        self.leaderboard = self.servicio.obtener_leaderboard(self.competencia.id)
+
+    def _registrar_en_otro_proceso(self, equipo_id, total, publicar=True):
+        _, clave_secuencia = _claves_compartidas(self.competencia.id)
+        secuencia = _incrementar_compartido(clave_secuencia)
+        if publicar:
+            cache.set(_clave_entrada(self.competencia.id, secuencia), entrada(equipo_id, total).como_tupla())
+        return secuencia
+
+    def test_aplica_los_equipos_de_otro_proceso_sin_reconstruir(self):
+        self._registrar_en_otro_proceso(self.equipos[1].id, 1000)
+
+        with mock.patch.object(LeaderboardService, '_reconstruir') as reconstruir:
+            delta = self.servicio.registrar_equipo(self.equipos[0], [200] * 15)
+
+        reconstruir.assert_not_called()
+        self.assertEqual(delta['secuencia'], 2)
+        # Delta exacto: solo lo que movió el equipo nuevo
+        self.assertEqual(delta['cambios'], [(self.equipos[0].id, 2)])
+        self.assertEqual(
+            self.servicio.obtener_leaderboard(self.competencia.id).posiciones(),
+            [(self.equipos[1].id, 1), (self.equipos[0].id, 2)],
+        )
+
+    def test_la_lectura_se_pone_al_dia_con_otro_proceso(self):
+        secuencia = self._registrar_en_otro_proceso(self.equipos[2].id, 4000)
+
+        with mock.patch.object(LeaderboardService, '_reconstruir') as reconstruir:
+            leaderboard = self.servicio.obtener_leaderboard(self.competencia.id)
+
+        reconstruir.assert_not_called()
+        self.assertIs(leaderboard, self.leaderboard)
+        self.assertEqual(leaderboard.secuencia, secuencia)
+        self.assertEqual(leaderboard.posiciones(), [(self.equipos[2].id, 1)])
+
+    @mock.patch.object(leaderboard_service, 'ESPERA_HUECO_S', 0)
+    def test_reconstruye_si_falta_una_entrada(self):
+        secuencia = self._registrar_en_otro_proceso(self.equipos[1].id, 1000, publicar=False)
+
+        leaderboard = self.servicio.obtener_leaderboard(self.competencia.id)
+
+        self.assertIsNot(leaderboard, self.leaderboard)
+        self.assertEqual(leaderboard.secuencia, secuencia)
+        self.assertEqual(leaderboard.version, self.servicio.version_actual(self.competencia.id))
+
+    def test_reconstruir_una_competencia_no_bloquea_a_otra(self):
+        otra, _, _ = crear_competencia(nombre='Otra', en_curso=False)
+        self.servicio.invalidar(self.competencia.id)
+        reconstruyendo = threading.Event()
+        liberar = threading.Event()
+
+        # Sin base de datos: los hilos no comparten la transacción del test
+        def reconstruir_lento(servicio, competencia_id, generacion, secuencia):
+            if competencia_id == self.competencia.id:
+                reconstruyendo.set()
+                liberar.wait(5)
+            return Leaderboard(competencia_id, (), generacion, secuencia)
+
+        with mock.patch.object(LeaderboardService, '_reconstruir', reconstruir_lento):
+            hilo = threading.Thread(target=self.servicio.obtener_leaderboard, args=(self.competencia.id,))
+            hilo.start()
+            try:
+                self.assertTrue(reconstruyendo.wait(5))
+                resultado = []
+                otro = threading.Thread(
+                    target=lambda: resultado.append(self.servicio.obtener_snapshot(otra.id))
+                )
+                otro.start()
+                otro.join(2)
+                self.assertFalse(otro.is_alive())
+                self.assertEqual(resultado[0]['competencia_id'], otra.id)
+            finally:
+                liberar.set()
+                hilo.join(5)
+
+    def test_invalidar_todo_avanza_la_version_compartida(self):
+        otra, _, _ = crear_competencia(nombre='Otra', en_curso=False)
+        versiones = {
+            competencia_id: self.servicio.version_actual(competencia_id)
+            for competencia_id in (self.competencia.id, otra.id)
+        }
+
+        self.servicio.invalidar_todo()
+
+        for competencia_id, version in versiones.items():
+            self.assertNotEqual(self.servicio.version_actual(competencia_id), version)
@@ -0,0 +1,32 @@
+"""
+Tests del endpoint /metrics (app/views/metricas_views.py).
+"""
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from .base import AJUSTES_SIN_REDIS
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class MetricasViewTests(SimpleTestCase):
+
+    def setUp(self):
+        self.url = reverse('metrics')
+
+    @override_settings(METRICAS_TOKEN='', DEBUG=False)
+    def test_sin_token_en_produccion_no_se_sirve(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(METRICAS_TOKEN='', DEBUG=True)
+    def test_sin_token_en_debug_se_sirve(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(METRICAS_TOKEN='secreto', DEBUG=False)
+    def test_con_token_exige_bearer(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer otro').status_code, 401)
+
+        respuesta = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain; version=0.0.4'))
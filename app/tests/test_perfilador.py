@@ -0,0 +1,96 @@
+"""
+Tests del perfilador (app/utils/perfilador.py y su middleware): consultas,
+tramos y que no modifique clases de Django ni de DRF.
+"""
+
+import contextvars
+import threading
+
+from django.template.backends.django import Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.serializers import ListSerializer, Serializer
+
+from app.models import Competencia
+from app.utils.perfilador import instalar, perfilar, tramo
+
+from .base import AJUSTES_SIN_REDIS, STORAGES_SIN_MANIFEST, crear_competencia
+
+PERFILADOR_SENSIBLE = {
+    'PERFILADOR_ACTIVO': True,
+    'PERFILADOR_UMBRAL_MS': 10_000,
+    'PERFILADOR_UMBRAL_CONSULTAS': 1,
+}
+
+
+@override_settings(STORAGES=STORAGES_SIN_MANIFEST, **PERFILADOR_SENSIBLE, **AJUSTES_SIN_REDIS)
+class PerfiladorTests(TestCase):
+
+    def setUp(self):
+        self.competencia, _, _ = crear_competencia()
+
+    def test_cuenta_y_agrupa_las_consultas(self):
+        with self.assertLogs('app.utils.perfilador', 'WARNING') as registros:
+            with perfilar('prueba') as perfil:
+                for _ in range(3):
+                    Competencia.objects.filter(pk=self.competencia.pk).exists()
+                Competencia.objects.count()
+
+        self.assertEqual(len(perfil.consultas), 4)
+        (mensaje,) = registros.output
+        self.assertIn('prueba:', mensaje)
+        self.assertIn('4 consultas', mensaje)
+        self.assertIn('3x', mensaje)
+
+    def test_bajo_los_umbrales_no_avisa(self):
+        with override_settings(PERFILADOR_UMBRAL_CONSULTAS=100):
+            with self.assertNoLogs('app.utils.perfilador', 'WARNING'):
+                with perfilar('prueba'):
+                    Competencia.objects.count()
+
+    def test_peticion_html_mide_render_y_consultas(self):
+        with self.assertLogs('app.utils.perfilador', 'WARNING') as registros:
+            self.client.get(reverse('ui:competencia_list'))
+
+        self.assertIn('GET /', registros.output[0])
+        self.assertIn('render=', registros.output[0])
+
+    def test_peticion_drf_mide_la_serializacion(self):
+        url = reverse('ranking_competencia', args=[self.competencia.id])
+        with self.assertLogs('app.utils.perfilador', 'WARNING') as registros:
+            self.client.get(url)
+
+        self.assertIn('serializacion=', registros.output[0])
+
+    def test_no_modifica_clases_de_terceros(self):
+        render, datos, datos_lista = Template.render, Serializer.data, ListSerializer.data
+
+        instalar()
+        with perfilar('prueba'):
+            pass
+
+        self.assertIs(Template.render, render)
+        self.assertIs(Serializer.data, datos)
+        self.assertIs(ListSerializer.data, datos_lista)
+
+    def test_tramo_compartido_entre_hilos(self):
+        dentro = threading.Event()
+        salir = threading.Event()
+
+        with perfilar('prueba') as perfil:
+            def en_otro_hilo():
+                with tramo('render'):
+                    dentro.set()
+                    salir.wait(5)
+
+            # El hilo hereda el contexto (y el perfil), como con sync_to_async
+            hilo = threading.Thread(target=contextvars.copy_context().run, args=(en_otro_hilo,))
+            hilo.start()
+            self.assertTrue(dentro.wait(5))
+            with tramo('render'):
+                pass
+            salir.set()
+            hilo.join()
+
+        self.assertEqual(perfil.tramos_abiertos, set())
+        self.assertIn('render', perfil.tramos)
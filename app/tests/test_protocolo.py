@@ -0,0 +1,73 @@
+"""
+Tests del protocolo WebSocket (app/websocket/protocolo.py): frames inválidos
+en JSON y MessagePack.
+"""
+
+import msgpack
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, override_settings
+
+from app.websocket.esquema import SUBPROTOCOLO_MSGPACK, codificar, decodificar
+from app.websocket.protocolo import ProtocoloConsumerMixin
+
+from .base import AJUSTES_SIN_REDIS
+
+
+class EcoConsumer(ProtocoloConsumerMixin, AsyncJsonWebsocketConsumer):
+
+    async def connect(self):
+        await self.accept()
+
+    async def receive_json(self, content, **kwargs):
+        await self.send_json({'tipo': 'pong', 'mensaje': content.get('mensaje')})
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class FramesInvalidosTests(SimpleTestCase):
+
+    async def _conectar(self, binario):
+        comunicador = WebsocketCommunicator(
+            EcoConsumer.as_asgi(), '/ws/eco/',
+            subprotocols=[SUBPROTOCOLO_MSGPACK] if binario else None,
+        )
+        conectado, _ = await comunicador.connect()
+        self.assertTrue(conectado)
+        return comunicador
+
+    async def _recibir_msgpack(self, comunicador):
+        return decodificar((await comunicador.receive_output())['bytes'])
+
+    async def test_msgpack_invalido_responde_error_y_sigue_abierto(self):
+        comunicador = await self._conectar(binario=True)
+        frames = (
+            b'\xc1',                                   # byte reservado
+            b'\xd9',                                   # truncado
+            msgpack.packb([1, 2]) + b'\x00',           # datos sobrantes
+            b'\x81\x91\x01\x01',                       # clave no hashable
+            msgpack.packb([1, 2]),                     # no es un objeto
+            msgpack.packb('ping'),
+        )
+        for frame in frames:
+            with self.subTest(frame=frame):
+                await comunicador.send_to(bytes_data=frame)
+                respuesta = await self._recibir_msgpack(comunicador)
+                self.assertEqual(respuesta['tipo'], 'error')
+
+        await comunicador.send_to(bytes_data=codificar({'tipo': 'ping', 'mensaje': 'hola'}))
+        self.assertEqual(await self._recibir_msgpack(comunicador), {'tipo': 'pong', 'mensaje': 'hola'})
+        await comunicador.disconnect()
+
+    async def test_json_invalido_responde_error(self):
+        comunicador = await self._conectar(binario=False)
+        for frame in ('{no es json', '[1, 2]', '"ping"'):
+            with self.subTest(frame=frame):
+                await comunicador.send_to(text_data=frame)
+                self.assertEqual((await comunicador.receive_json_from())['tipo'], 'error')
+
+        await comunicador.send_to(bytes_data=b'\x00\x01')
+        self.assertEqual((await comunicador.receive_json_from())['tipo'], 'error')
+
+        await comunicador.send_json_to({'tipo': 'ping', 'mensaje': 'hola'})
+        self.assertEqual(await comunicador.receive_json_from(), {'tipo': 'pong', 'mensaje': 'hola'})
+        await comunicador.disconnect()
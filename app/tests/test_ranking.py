@@ -0,0 +1,109 @@
+"""
+Tests del ranking en una sola consulta (ResultsService.anotar_ranking y
+calcular_ranking).
+"""
+
+from django.test import TestCase, override_settings
+
+from app.models import Equipo, RegistroTiempo
+from app.services import ResultsService
+
+from .base import AJUSTES_SIN_REDIS, crear_competencia
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class RankingTests(TestCase):
+
+    def setUp(self):
+        self.competencia, self.juez, _ = crear_competencia(equipos=0)
+        self.servicio = ResultsService()
+
+    def _equipo(self, numero, tiempos, categoria='estudiantes'):
+        equipo = Equipo.objects.create(
+            competition=self.competencia, judge=self.juez, number=numero,
+            name=f'Equipo {numero}', category=categoria,
+        )
+        # bulk_create, como los lotes de los jueces: sin señales
+        RegistroTiempo.objects.bulk_create(
+            RegistroTiempo(team=equipo, time=tiempo) for tiempo in tiempos
+        )
+        return equipo
+
+    def _posiciones(self, filas):
+        return [(fila.dorsal, fila.posicion_general, fila.posicion_categoria) for fila in filas]
+
+    def test_empates_comparten_posicion(self):
+        self._equipo(1, [1000, 2000])
+        self._equipo(2, [1500, 1500])
+        self._equipo(3, [4000])
+
+        filas = self.servicio.calcular_ranking(self.competencia.id)
+
+        self.assertEqual(self._posiciones(filas), [(1, 1, 1), (2, 1, 1), (3, 3, 3)])
+        self.assertEqual(filas[0].tiempo_total_ms, 3000)
+        self.assertEqual(filas[0].mejor_tiempo_ms, 1000)
+        self.assertEqual(filas[0].num_registros, 2)
+
+    def test_descalificados_al_final_en_su_grupo(self):
+        self._equipo(1, [1000, 0])            # ausente: descalificado aunque sea el más rápido
+        self._equipo(2, [5000, 5000])
+        self._equipo(3, [9000, 0, 0])
+        self._equipo(4, [])                    # sin registros: no aparece
+
+        filas = self.servicio.calcular_ranking(self.competencia.id)
+
+        self.assertEqual([fila.dorsal for fila in filas], [2, 1, 3])
+        self.assertEqual(
+            [(fila.descalificado, fila.posicion_general, fila.posicion_categoria) for fila in filas],
+            [(False, 1, 1), (True, None, 1), (True, None, 2)],
+        )
+        self.assertEqual(filas[2].jugadores_ausentes, 2)
+        self.assertEqual(filas[1].mejor_tiempo_ms, 1000)
+
+    def test_equipos_sin_registros_van_en_su_propio_grupo(self):
+        self._equipo(1, [])
+        self._equipo(2, [3000])
+        self._equipo(3, [0])
+
+        anotados = {
+            equipo.number: (equipo.rk_grupo, equipo.rk_posicion_general, equipo.rk_total, equipo.rk_mejor)
+            for equipo in ResultsService.anotar_ranking(Equipo.objects.filter(competition=self.competencia))
+        }
+
+        self.assertEqual(anotados, {
+            1: (ResultsService.GRUPO_SIN_REGISTROS, 1, 0, 0),
+            2: (ResultsService.GRUPO_CALIFICADO, 1, 3000, 3000),
+            3: (ResultsService.GRUPO_DESCALIFICADO, 1, 0, 0),
+        })
+
+    def test_posicion_por_categoria_y_filtro(self):
+        self._equipo(1, [1000], categoria='interfacultades')
+        self._equipo(2, [2000])
+        self._equipo(3, [3000], categoria='interfacultades')
+        self._equipo(4, [4000])
+
+        filas = self.servicio.calcular_ranking(self.competencia.id)
+        self.assertEqual(self._posiciones(filas), [(1, 1, 1), (2, 2, 1), (3, 3, 2), (4, 4, 2)])
+
+        # El filtro no reinicia la posición general
+        filas = self.servicio.calcular_ranking(self.competencia.id, categoria='estudiantes')
+        self.assertEqual(self._posiciones(filas), [(2, 2, 1), (4, 4, 2)])
+
+    def test_otras_competencias_no_afectan_el_ranking(self):
+        self._equipo(1, [5000])
+        otra, otro_juez, (ajeno,) = crear_competencia(nombre='Otra', en_curso=False)
+        RegistroTiempo.objects.create(team=ajeno, time=100)
+
+        filas = self.servicio.calcular_ranking(self.competencia.id)
+
+        self.assertEqual(self._posiciones(filas), [(1, 1, 1)])
+
+    def test_una_sola_consulta_sin_importar_el_tamano(self):
+        self._equipo(1, [1000])
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.servicio.calcular_ranking(self.competencia.id)), 1)
+
+        for numero in range(2, 30):
+            self._equipo(numero, [1000 * numero, 0] if numero % 5 == 0 else [1000 * numero] * 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.servicio.calcular_ranking(self.competencia.id)), 29)
@@ -0,0 +1,109 @@
+"""
+Tests del registro de lotes (app/services/registro_service.py): ruta rápida
+con UPDATE condicional y ruta completa.
+"""
+
+import uuid
+
+from django.test import TestCase, override_settings
+
+from app.models import Equipo, RegistroTiempo
+from app.services import RegistroService
+
+from .base import AJUSTES_SIN_REDIS, crear_competencia, lote_registros
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class RegistrarBatchTests(TestCase):
+
+    def setUp(self):
+        self.competencia, self.juez, (self.equipo, self.otro) = crear_competencia(equipos=2)
+        self.servicio = RegistroService()
+
+    def _registrar(self, registros, equipo=None):
+        return self.servicio.registrar_batch_sync(self.juez, (equipo or self.equipo).id, registros)
+
+    def _assert_agregados_coinciden(self, equipo):
+        equipo.refresh_from_db()
+        tiempos = list(RegistroTiempo.objects.filter(team=equipo).values_list('time', flat=True))
+        self.assertEqual(equipo.record_count, len(tiempos))
+        self.assertEqual(equipo.total_ms, sum(tiempos))
+
+    def test_ruta_rapida_guarda_el_lote_y_sus_agregados(self):
+        resultado = self._registrar(lote_registros(15, tiempo=1000))
+
+        self.assertEqual(resultado['total_guardados'], 15)
+        self.assertEqual(resultado['total_fallidos'], 0)
+        self.equipo.refresh_from_db()
+        self.assertEqual(self.equipo.record_count, 15)
+        self.assertEqual(self.equipo.total_ms, sum(range(1000, 1015)))
+        self.assertEqual(self.equipo.best_ms, 1000)
+
+    def test_segundo_lote_del_mismo_equipo_se_rechaza(self):
+        self._registrar(lote_registros())
+        resultado = self._registrar(lote_registros(tiempo=5000))
+
+        self.assertEqual(resultado['total_guardados'], 0)
+        self.assertEqual(resultado['motivo'], 'registros_existentes')
+        self._assert_agregados_coinciden(self.equipo)
+
+    def test_id_registro_repetido_en_el_lote(self):
+        repetido = str(uuid.uuid4())
+        resultado = self._registrar([
+            {'tiempo': 3000, 'id_registro': repetido},
+            {'tiempo': 3000, 'id_registro': repetido},
+        ])
+
+        self.assertEqual(resultado['total_guardados'], 1)
+        self.assertEqual(resultado['total_fallidos'], 1)
+        self.assertEqual([r['duplicado'] for r in resultado['registros_guardados']], [False])
+        self.assertEqual(RegistroTiempo.objects.filter(team=self.equipo).count(), 1)
+        self._assert_agregados_coinciden(self.equipo)
+
+    def test_id_registro_existente_en_otro_equipo(self):
+        existente = uuid.uuid4()
+        RegistroTiempo.objects.create(record_id=existente, team=self.otro, time=100)
+
+        resultado = self._registrar([
+            {'tiempo': 2000, 'id_registro': str(existente)},
+            {'tiempo': 2500},
+        ])
+
+        self.assertEqual(resultado['total_guardados'], 1)
+        duplicados = {r['id_registro']: r['duplicado'] for r in resultado['registros_guardados']}
+        self.assertTrue(duplicados[str(existente)])
+        self.assertEqual(RegistroTiempo.objects.get(record_id=existente).team_id, self.otro.id)
+        self._assert_agregados_coinciden(self.equipo)
+        self.assertEqual(Equipo.objects.get(pk=self.equipo.pk).total_ms, 2500)
+
+    def test_tiempos_se_guardan_como_enteros(self):
+        self._registrar([{'tiempo': 1500.0}, {'tiempo': 1600}])
+
+        self.assertEqual(
+            sorted(RegistroTiempo.objects.filter(team=self.equipo).values_list('time', flat=True)),
+            [1500, 1600],
+        )
+
+    def test_registros_invalidos_van_a_fallidos(self):
+        resultado = self._registrar([{'tiempo': 1000}, 7, {'tiempo': 'x'}])
+
+        self.assertEqual(resultado['total_guardados'], 1)
+        self.assertEqual(sorted(f['indice'] for f in resultado['registros_fallidos']), [1, 2])
+        self._assert_agregados_coinciden(self.equipo)
+
+    def test_competencia_detenida(self):
+        self.competencia.is_running = False
+        self.competencia.save()
+
+        resultado = self._registrar(lote_registros())
+
+        self.assertEqual(resultado['motivo'], 'competencia_detenida')
+        self.assertFalse(RegistroTiempo.objects.exists())
+
+    def test_equipo_de_otro_juez(self):
+        _, _, (ajeno,) = crear_competencia(nombre='Otra', en_curso=False)
+
+        resultado = self._registrar(lote_registros(), equipo=ajeno)
+
+        self.assertEqual(resultado['total_guardados'], 0)
+        self.assertFalse(RegistroTiempo.objects.filter(team=ajeno).exists())
@@ -0,0 +1,178 @@
+"""
+Tests de las páginas públicas de resultados: fragmentos con single-flight
+(app/utils/cache_fragmentos.py), ETags y caída del cache.
+"""
+
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from app.services import LeaderboardService
+from app.utils.cache_fragmentos import obtener_o_renderizar
+
+from .base import AJUSTES_SIN_REDIS, CACHE_CAIDO, STORAGES_SIN_MANIFEST, crear_competencia
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class ObtenerORenderizarTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_renderiza_una_sola_vez_con_peticiones_simultaneas(self):
+        empezo = threading.Event()
+        liberar = threading.Event()
+        renders = []
+
+        def renderizar():
+            renders.append(1)
+            empezo.set()
+            liberar.wait(5)
+            return '<p>resultados</p>'
+
+        resultados = []
+        lider = threading.Thread(target=lambda: resultados.append(obtener_o_renderizar('clave', renderizar)))
+        lider.start()
+        self.assertTrue(empezo.wait(5))
+        seguidores = [
+            threading.Thread(target=lambda: resultados.append(obtener_o_renderizar('clave', renderizar)))
+            for _ in range(3)
+        ]
+        for hilo in seguidores:
+            hilo.start()
+        liberar.set()
+        for hilo in [lider, *seguidores]:
+            hilo.join(5)
+
+        self.assertEqual(len(renders), 1)
+        self.assertEqual(resultados, ['<p>resultados</p>'] * 4)
+        self.assertEqual(obtener_o_renderizar('clave', lambda: 'otro'), '<p>resultados</p>')
+
+    def test_espera_al_render_de_otro_proceso(self):
+        # Otro proceso tiene el lock y guarda el fragmento poco después
+        cache.add('clave:lock', 1)
+        guardar = threading.Timer(0.1, lambda: cache.set('clave', '<p>del otro proceso</p>'))
+        guardar.start()
+        renderizar = mock.Mock(return_value='<p>propio</p>')
+
+        self.assertEqual(obtener_o_renderizar('clave', renderizar), '<p>del otro proceso</p>')
+        renderizar.assert_not_called()
+        guardar.join()
+
+    def test_renderiza_si_el_otro_proceso_no_termina(self):
+        cache.add('clave:lock', 1)
+
+        with mock.patch('app.utils.cache_fragmentos.ESPERA_LOCK_S', 0.1):
+            self.assertEqual(obtener_o_renderizar('clave', lambda: '<p>propio</p>'), '<p>propio</p>')
+        self.assertEqual(cache.get('clave'), '<p>propio</p>')
+
+    def test_suelta_el_lock_al_terminar(self):
+        obtener_o_renderizar('clave', lambda: '<p>resultados</p>')
+
+        self.assertIsNone(cache.get('clave:lock'))
+
+    @override_settings(CACHES=CACHE_CAIDO)
+    def test_cache_caido_renderiza_sin_cache(self):
+        self.assertEqual(obtener_o_renderizar('clave', lambda: '<p>sin cache</p>'), '<p>sin cache</p>')
+
+
+@override_settings(**AJUSTES_SIN_REDIS)
+class EtagResultadosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        LeaderboardService().invalidar_todo()
+        self.competencia, _, (self.equipo,) = crear_competencia()
+        self.url = reverse('ui:competencia_results_partial', args=[self.competencia.id])
+
+    def test_etag_responde_304_hasta_que_cambia_la_version(self):
+        respuesta = self.client.get(self.url)
+        etag = respuesta['ETag']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        LeaderboardService().registrar_equipo(self.equipo, [1000] * 15)
+        respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertContains(respuesta, self.equipo.name)
+
+    def test_editar_competencia_cambia_el_etag_solo_tras_el_commit(self):
+        etag = self.client.get(self.url)['ETag']
+        version = LeaderboardService().version_actual(self.competencia.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.competencia.name = 'Nombre nuevo'
+            self.competencia.save()
+            self.assertEqual(LeaderboardService().version_actual(self.competencia.id), version)
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.assertNotEqual(LeaderboardService().version_actual(self.competencia.id), version)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_distinto_por_categoria(self):
+        general = self.client.get(self.url)['ETag']
+        por_categoria = self.client.get(self.url, {'categoria': 'estudiantes'})['ETag']
+
+        self.assertNotEqual(general, por_categoria)
+
+
+@override_settings(STORAGES=STORAGES_SIN_MANIFEST, **AJUSTES_SIN_REDIS)
+class MoldesDetalleTests(TestCase):
+    """El JS del detalle arma las filas con moldes de los mismos parciales del bloque de resultados."""
+
+    def setUp(self):
+        cache.clear()
+        LeaderboardService().invalidar_todo()
+        self.competencia, _, self.equipos = crear_competencia(equipos=3)
+        LeaderboardService().obtener_leaderboard(self.competencia.id)
+        for indice, equipo in enumerate(self.equipos, 1):
+            LeaderboardService().registrar_equipo(equipo, [1000 * indice] * 15)
+
+    def test_detalle_incluye_los_moldes(self):
+        respuesta = self.client.get(reverse('ui:competencia_detail', args=[self.competencia.id]))
+
+        for molde in (
+            'molde-podio', 'molde-podio-1', 'molde-podio-2', 'molde-podio-vacio', 'molde-fila',
+            'molde-fila-descalificado', 'molde-lista', 'molde-mensaje-0', 'molde-mensaje-1', 'molde-mensaje-2',
+        ):
+            self.assertContains(respuesta, f'<template id="{molde}">')
+
+    def test_filas_del_parcial_tienen_los_campos_del_molde(self):
+        respuesta = self.client.get(reverse('ui:competencia_results_partial', args=[self.competencia.id]))
+
+        self.assertContains(respuesta, 'class="team-card-v2 "')
+        for campo in ('posicion', 'nombre', 'dorsal', 'categoria', 'completados', 'registros', 'mejor', 'total'):
+            self.assertContains(respuesta, f'data-campo="{campo}"')
+
+
+@override_settings(STORAGES=STORAGES_SIN_MANIFEST, **AJUSTES_SIN_REDIS)
+class CacheCaidoTests(TestCase):
+
+    def setUp(self):
+        LeaderboardService().invalidar_todo()
+        self.competencia, _, (self.equipo,) = crear_competencia()
+
+    @override_settings(CACHES=CACHE_CAIDO)
+    def test_paginas_publicas_sin_redis(self):
+        for nombre, pk in (
+            ('ui:competencia_detail', self.competencia.id),
+            ('ui:competencia_results_partial', self.competencia.id),
+            ('ui:equipo_detail', self.equipo.id),
+        ):
+            with self.subTest(nombre):
+                respuesta = self.client.get(reverse(nombre, args=[pk]))
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertFalse(respuesta.has_header('ETag'))
+
+    @override_settings(CACHES=CACHE_CAIDO)
+    def test_leaderboard_cargado_se_sigue_sirviendo(self):
+        with override_settings(**AJUSTES_SIN_REDIS):
+            cargado = LeaderboardService().obtener_leaderboard(self.competencia.id)
+
+        with mock.patch.object(LeaderboardService, '_reconstruir') as reconstruir:
+            self.assertIs(LeaderboardService().obtener_leaderboard(self.competencia.id), cargado)
+        reconstruir.assert_not_called()
@@ -13,6 +13,33 @@ from .timestamps import (
     parsear_tiempo_a_ms,
     obtener_timestamp_actual,
 )
+from .cache_fragmentos import (
+    clave_fragmento_resultados,
+    obtener_o_renderizar,
+)
+from .cache_jueces import (
+    obtener_juez,
+    invalidar_juez,
+)
+from .cache_competencias import (
+    obtener_estados_competencias,
+    filtrar_estados_competencias,
+    invalidar_estados_competencias,
+)
+from .metricas import (
+    obtener_histograma,
+    listar_histogramas,
+    medir,
+    percentil,
+    obtener_medidor,
+    listar_medidores,
+    exportar_prometheus,
+    database_sync_to_async_medido,
+)
+from .canales import (
+    alias_capa_publica,
+    enviar_a_competencia,
+)
 
 __all__ = [
     'generar_hash_registro',
@@ -21,4 +48,21 @@ __all__ = [
     'formatear_tiempo_ms',
     'parsear_tiempo_a_ms',
     'obtener_timestamp_actual',
+    'clave_fragmento_resultados',
+    'obtener_o_renderizar',
+    'obtener_juez',
+    'invalidar_juez',
+    'obtener_estados_competencias',
+    'filtrar_estados_competencias',
+    'invalidar_estados_competencias',
+    'obtener_histograma',
+    'listar_histogramas',
+    'medir',
+    'percentil',
+    'obtener_medidor',
+    'listar_medidores',
+    'exportar_prometheus',
+    'database_sync_to_async_medido',
+    'alias_capa_publica',
+    'enviar_a_competencia',
 ]
@@ -0,0 +1,90 @@
+"""
+Módulo: cache_competencias
+Cache del estado de las competencias (en curso, inicio, fin) para el admin y los consumers.
+
+Características:
+- Una sola entrada con todas las competencias: la tabla es pequeña y los
+  filtros se aplican en memoria, así cualquier combinación sale del cache
+- Se invalida después del commit desde la señal de Competencia y desde
+  Competencia.cambiar_estado (que usa UPDATE y no dispara señales)
+- El TTL acota cualquier desfase (p. ej. un UPDATE hecho fuera de la aplicación)
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+CLAVE_ESTADOS = 'competencias:estado'
+
+
+def _iso_y_ms(fecha):
+    if fecha is None:
+        return None, None
+    return fecha.isoformat(), int(fecha.timestamp() * 1000)
+
+
+def obtener_estados_competencias() -> List[Dict[str, Any]]:
+    """
+    Retorna el estado de todas las competencias, desde cache o base de datos.
+
+    Cada elemento incluye started_at/finished_at en ISO 8601 y también en
+    milisegundos epoch (started_at_ms, finished_at_ms) para los cronómetros.
+
+    Returns:
+        Lista de dicts ordenada por id
+    """
+    from app.models import Competencia
+
+    estados = cache.get(CLAVE_ESTADOS)
+    if estados is not None:
+        return estados
+
+    estados = []
+    for competencia in Competencia.objects.order_by('id').values(
+        'id', 'name', 'is_active', 'is_running', 'started_at', 'finished_at'
+    ):
+        started_at, started_at_ms = _iso_y_ms(competencia['started_at'])
+        finished_at, finished_at_ms = _iso_y_ms(competencia['finished_at'])
+        estados.append({
+            'id': competencia['id'],
+            'name': competencia['name'],
+            'is_active': competencia['is_active'],
+            'is_running': competencia['is_running'],
+            'started_at': started_at,
+            'started_at_ms': started_at_ms,
+            'finished_at': finished_at,
+            'finished_at_ms': finished_at_ms,
+        })
+    cache.set(CLAVE_ESTADOS, estados, getattr(settings, 'ESTADO_COMPETENCIAS_CACHE_TIMEOUT', 60))
+    return estados
+
+
+def filtrar_estados_competencias(
+    ids: Optional[Iterable[int]] = None,
+    en_curso: Optional[bool] = None,
+    activas: Optional[bool] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Estados de las competencias que cumplen los filtros (None = sin filtrar).
+
+    Args:
+        ids: IDs de competencia a incluir
+        en_curso: Filtra por is_running
+        activas: Filtra por is_active
+
+    Returns:
+        Lista de dicts (mismo formato que obtener_estados_competencias)
+    """
+    ids = set(ids) if ids is not None else None
+    return [
+        estado for estado in obtener_estados_competencias()
+        if (ids is None or estado['id'] in ids)
+        and (en_curso is None or estado['is_running'] == en_curso)
+        and (activas is None or estado['is_active'] == activas)
+    ]
+
+
+def invalidar_estados_competencias():
+    """Elimina del cache el estado de las competencias."""
+    cache.delete(CLAVE_ESTADOS)
@@ -0,0 +1,156 @@
+"""
+Módulo: cache_fragmentos
+Cache compartido de fragmentos HTML renderizados con single-flight.
+
+Características:
+- Claves por (competencia, categoría, versión del leaderboard)
+- Una sola renderización por clave aunque lleguen muchas peticiones a la vez,
+  también entre procesos (lock con cache.add; el Event local es la vía rápida)
+- Las versiones nuevas invalidan implícitamente: las claves viejas expiran solas
+- Si el cache no responde (Redis caído) se renderiza sin cache
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Errores de un cache que no responde (conexión rechazada, timeout)
+ERRORES_CACHE = (RedisError, OSError)
+
+# Lock entre procesos: vida máxima del lock y espera de los demás procesos
+PLAZO_LOCK_S = 10
+ESPERA_LOCK_S = 2.0
+INTERVALO_SONDEO_S = 0.05
+
+_en_vuelo: Dict[str, threading.Event] = {}
+_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, 'FRAGMENTOS_CACHE_ALIAS', 'default')]
+
+
+def _leer(clave: str) -> Optional[str]:
+    try:
+        return _cache().get(clave)
+    except ERRORES_CACHE as e:
+        logger.warning("[FRAGMENTOS] Cache no disponible leyendo %s: %s", clave, e)
+        return None
+
+
+def _guardar(clave: str, html: str, timeout: int):
+    try:
+        _cache().set(clave, html, timeout)
+    except ERRORES_CACHE as e:
+        logger.warning("[FRAGMENTOS] Cache no disponible guardando %s: %s", clave, e)
+
+
+def clave_fragmento_resultados(competencia_id: int, categoria: str, version) -> str:
+    """
+    Construye la clave del fragmento de resultados de una competencia.
+
+    Args:
+        competencia_id: ID de la competencia
+        categoria: Filtro de categoría ('' para todas)
+        version: Versión actual del leaderboard (compartida entre procesos)
+
+    Returns:
+        String con la clave de cache
+    """
+    return f"resultados:{competencia_id}:{categoria or '-'}:{version}"
+
+
+def obtener_o_renderizar(clave: str, renderizar: Callable[[], str], timeout: int = None) -> str:
+    """
+    Retorna el fragmento cacheado o lo renderiza una sola vez.
+
+    Si otra petición (de este u otro proceso) ya está renderizando la misma
+    clave, espera a que termine y reutiliza su resultado en lugar de renderizar de nuevo. Si el cache no
+    responde, el fragmento se renderiza sin cachear.
+
+    Args:
+        clave: Clave de cache (incluye la versión)
+        renderizar: Función sin argumentos que produce el HTML
+        timeout: Segundos de vida en cache (default: FRAGMENTOS_CACHE_TIMEOUT)
+
+    Returns:
+        HTML renderizado
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'FRAGMENTOS_CACHE_TIMEOUT', 300)
+
+    html = _leer(clave)
+    if html is not None:
+        return html
+
+    with _lock:
+        evento = _en_vuelo.get(clave)
+        lider = evento is None
+        if lider:
+            evento = threading.Event()
+            _en_vuelo[clave] = evento
+
+    if not lider:
+        # Esperar al render en curso; si falla o tarda demasiado, renderizar aquí
+        evento.wait(timeout=5)
+        html = _leer(clave)
+        return html if html is not None else renderizar()
+
+    try:
+        return _renderizar_entre_procesos(clave, renderizar, timeout)
+    finally:
+        with _lock:
+            _en_vuelo.pop(clave, None)
+        evento.set()
+
+
+def _tomar_lock(clave_lock: str) -> bool:
+    try:
+        return _cache().add(clave_lock, 1, PLAZO_LOCK_S)
+    except ERRORES_CACHE as e:
+        logger.warning("[FRAGMENTOS] Cache no disponible tomando %s: %s", clave_lock, e)
+        return True
+
+
+def _soltar_lock(clave_lock: str):
+    try:
+        _cache().delete(clave_lock)
+    except ERRORES_CACHE as e:
+        logger.warning("[FRAGMENTOS] Cache no disponible soltando %s: %s", clave_lock, e)
+
+
+def _renderizar_entre_procesos(clave: str, renderizar: Callable[[], str], timeout: int) -> str:
+    """
+    Renderiza la clave solo si ningún otro proceso la está renderizando.
+
+    Si otro proceso tiene el lock, se sondea el cache hasta ESPERA_LOCK_S; si
+    el fragmento no aparece (el otro proceso falló o es lento) se renderiza aquí.
+    """
+    clave_lock = f"{clave}:lock"
+    if not _tomar_lock(clave_lock):
+        limite = time.monotonic() + ESPERA_LOCK_S
+        while time.monotonic() < limite:
+            time.sleep(INTERVALO_SONDEO_S)
+            html = _leer(clave)
+            if html is not None:
+                return html
+        html = renderizar()
+        _guardar(clave, html, timeout)
+        return html
+
+    try:
+        # Otro proceso pudo terminar entre la primera lectura y el lock
+        html = _leer(clave)
+        if html is None:
+            html = renderizar()
+            _guardar(clave, html, timeout)
+        return html
+    finally:
+        _soltar_lock(clave_lock)
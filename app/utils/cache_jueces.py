@@ -0,0 +1,86 @@
+"""
+Módulo: cache_jueces
+Cache de corta duración para la identidad de los jueces y sus equipos asignados.
+
+Características:
+- Autenticación JWT (REST y WebSocket) sin consultas cuando el cache está caliente
+- Guarda el juez (sin el hash de contraseña) y sus asignaciones (equipo, competencia)
+- Se invalida desde las señales de Juez y Equipo; el TTL acota cualquier desfase
+- Si el cache no responde (Redis caído) se consulta la base de datos
+"""
+
+import logging
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from app.utils.cache_fragmentos import ERRORES_CACHE
+
+logger = logging.getLogger(__name__)
+
+
+def _cache():
+    return caches[getattr(settings, 'JUECES_CACHE_ALIAS', 'default')]
+
+
+def _clave(juez_id) -> str:
+    return f"juez:{juez_id}"
+
+
+def obtener_juez(juez_id: int):
+    """
+    Retorna el juez activo con sus asignaciones, desde cache o base de datos.
+
+    El juez retornado incluye `equipos_asignados`: lista de tuplas
+    (equipo_id, competencia_id) ordenadas por dorsal.
+
+    Args:
+        juez_id: ID del juez (tomado del token JWT)
+
+    Returns:
+        Instancia de Juez, o None si no existe o está inactivo
+    """
+    from app.models import Juez
+
+    cache = _cache()
+    clave = _clave(juez_id)
+    try:
+        juez = cache.get(clave)
+    except ERRORES_CACHE as e:
+        logger.warning("[JUECES] Cache no disponible leyendo %s: %s", clave, e)
+        juez = None
+    if juez is not None:
+        return juez
+
+    try:
+        juez = Juez.objects.defer('password').get(id=juez_id, is_active=True)
+    except Juez.DoesNotExist:
+        return None
+
+    juez.equipos_asignados = list(
+        juez.teams.order_by('number').values_list('id', 'competition_id')
+    )
+    try:
+        cache.set(clave, juez, getattr(settings, 'JUECES_CACHE_TIMEOUT', 60))
+    except ERRORES_CACHE as e:
+        logger.warning("[JUECES] Cache no disponible guardando %s: %s", clave, e)
+    return juez
+
+
+def invalidar_juez(juez_id: Optional[int]):
+    """
+    Elimina del cache la entrada de un juez.
+
+    Si el cache no responde no hay nada que invalidar: la entrada, si vuelve,
+    expira con el TTL.
+
+    Args:
+        juez_id: ID del juez (None se ignora)
+    """
+    if juez_id is None:
+        return
+    try:
+        _cache().delete(_clave(juez_id))
+    except ERRORES_CACHE as e:
+        logger.warning("[JUECES] Cache no disponible invalidando juez %s: %s", juez_id, e)
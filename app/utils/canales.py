@@ -0,0 +1,68 @@
+"""
+Módulo: canales
+Envío a los grupos competencia_{id} a través de todas las capas que los usan.
+
+Características:
+- Los jueces usan la capa 'default' (RedisChannelLayer, con colas por canal)
+- Los espectadores usan la capa 'publico' (Redis pub/sub): cada proceso se
+  suscribe una vez por competencia y reparte el mensaje en memoria a sus
+  consumers, así un envío cuesta O(procesos) en Redis y no O(espectadores)
+- Sin la capa 'publico' configurada todo va por 'default'
+- Cada envío queda en group_send_segundos y los fallos en group_send_fallos_total
+"""
+
+import time
+from typing import Any, Dict, List
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels import DEFAULT_CHANNEL_LAYER
+from django.conf import settings
+
+from .metricas import obtener_histograma, obtener_medidor
+
+ALIAS_PUBLICO = 'publico'
+
+
+def alias_capa_publica() -> str:
+    """Retorna el alias de la capa que usan los consumers públicos."""
+    if ALIAS_PUBLICO in getattr(settings, 'CHANNEL_LAYERS', {}):
+        return ALIAS_PUBLICO
+    return DEFAULT_CHANNEL_LAYER
+
+
+def capas_competencia() -> List:
+    """Retorna las capas distintas en las que hay miembros de competencia_{id}."""
+    capas = []
+    for alias in (DEFAULT_CHANNEL_LAYER, alias_capa_publica()):
+        capa = get_channel_layer(alias)
+        if capa is not None and all(capa is not otra for otra in capas):
+            capas.append(capa)
+    return capas
+
+
+def enviar_a_competencia(competencia_id: int, mensaje: Dict[str, Any]) -> bool:
+    """
+    Envía un evento al grupo competencia_{id} en todas sus capas (jueces y público).
+
+    Args:
+        competencia_id: ID de la competencia
+        mensaje: Evento con 'type' y 'data'
+
+    Returns:
+        False si no hay ninguna capa configurada
+    """
+    capas = capas_competencia()
+    grupo = f'competencia_{competencia_id}'
+    latencia = obtener_histograma('group_send_segundos', 'Duración de group_send a competencia_{id} (por capa)')
+    fallos = obtener_medidor('group_send_fallos_total', 'group_send a competencia_{id} que lanzaron excepción', 'counter')
+    for capa in capas:
+        inicio = time.perf_counter()
+        try:
+            async_to_sync(capa.group_send)(grupo, mensaje)
+        except Exception:
+            fallos.sumar(1, tipo=mensaje.get('type', ''))
+            raise
+        finally:
+            latencia.observar(time.perf_counter() - inicio)
+    return bool(capas)
@@ -0,0 +1,302 @@
+"""
+Módulo: metricas
+Histogramas, contadores y medidores en memoria del proceso.
+
+Características:
+- Buckets acumulativos al estilo Prometheus (le=...)
+- Contadores y medidores con etiquetas (ej: conexiones por competencia)
+- Seguros entre hilos (consumers async y vistas WSGI/ASGI)
+- Registro global por nombre: el primer uso crea la métrica
+- Exportación en formato de texto de Prometheus (vista /metrics)
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Sequence, Tuple
+
+# Segundos: cubre desde respuestas de cache hasta saturación del thread pool
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Consultas SQL por petición
+LIMITES_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# Bytes por mensaje: desde un pong hasta el snapshot de miles de equipos
+LIMITES_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+PREFIJO_PROMETHEUS = 'server5k_'
+
+_histogramas: Dict[str, 'Histograma'] = {}
+_medidores: Dict[str, 'Medidor'] = {}
+_lock = threading.Lock()
+
+
+class Histograma:
+    """
+    Histograma con buckets fijos, suma y conteo de observaciones.
+    """
+
+    def __init__(self, nombre: str, descripcion: str = '', limites: Sequence[float] = LIMITES_LATENCIA):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.limites = tuple(sorted(limites))
+        self._buckets = [0] * len(self.limites)
+        self._suma = 0.0
+        self._conteo = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float):
+        """Registra una observación."""
+        with self._lock:
+            self._suma += valor
+            self._conteo += 1
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    self._buckets[i] += 1
+                    break
+
+    def instantanea(self) -> Dict:
+        """
+        Retorna una copia consistente del histograma.
+
+        Returns:
+            Dict con buckets acumulativos [(limite, conteo)], suma y conteo
+        """
+        with self._lock:
+            acumulado = 0
+            buckets = []
+            for limite, conteo in zip(self.limites, self._buckets):
+                acumulado += conteo
+                buckets.append((limite, acumulado))
+            return {
+                'nombre': self.nombre,
+                'descripcion': self.descripcion,
+                'buckets': buckets,
+                'suma': self._suma,
+                'conteo': self._conteo,
+            }
+
+
+class Medidor:
+    """
+    Valor numérico por combinación de etiquetas.
+
+    tipo 'gauge' sube y baja (conexiones abiertas, tareas en cola);
+    tipo 'counter' solo crece (fallos).
+    """
+
+    def __init__(self, nombre: str, descripcion: str = '', tipo: str = 'gauge'):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.tipo = tipo
+        self._valores: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clave(etiquetas: Dict[str, object]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+    def sumar(self, valor: float = 1, **etiquetas):
+        """Suma (o resta, con valor negativo) al valor de esas etiquetas."""
+        clave = self._clave(etiquetas)
+        with self._lock:
+            nuevo = self._valores.get(clave, 0) + valor
+            if nuevo == 0 and self.tipo == 'gauge' and clave:
+                # Sin series vacías de competencias que ya no tienen conexiones
+                self._valores.pop(clave, None)
+            else:
+                self._valores[clave] = nuevo
+
+    def fijar(self, valor: float, **etiquetas):
+        """Fija el valor para esas etiquetas."""
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = valor
+
+    def instantanea(self) -> Dict:
+        """
+        Retorna una copia de los valores.
+
+        Returns:
+            Dict con nombre, descripción, tipo y valores [(etiquetas, valor)]
+        """
+        with self._lock:
+            valores = [(dict(clave), valor) for clave, valor in self._valores.items()]
+        return {
+            'nombre': self.nombre,
+            'descripcion': self.descripcion,
+            'tipo': self.tipo,
+            'valores': valores,
+        }
+
+
+def obtener_histograma(nombre: str, descripcion: str = '', limites: Sequence[float] = LIMITES_LATENCIA) -> Histograma:
+    """
+    Retorna el histograma registrado con ese nombre, creándolo si no existe.
+
+    Args:
+        nombre: Nombre de la métrica (ej: 'ws_juez_connect_segundos')
+        descripcion: Texto de ayuda (solo se usa al crearlo)
+        limites: Límites superiores de los buckets (solo se usan al crearlo)
+
+    Returns:
+        Instancia de Histograma
+    """
+    histograma = _histogramas.get(nombre)
+    if histograma is None:
+        with _lock:
+            histograma = _histogramas.setdefault(nombre, Histograma(nombre, descripcion, limites))
+    return histograma
+
+
+def listar_histogramas():
+    """Retorna las instantáneas de todos los histogramas registrados."""
+    with _lock:
+        histogramas = list(_histogramas.values())
+    return [h.instantanea() for h in histogramas]
+
+
+def obtener_medidor(nombre: str, descripcion: str = '', tipo: str = 'gauge') -> Medidor:
+    """
+    Retorna el medidor (o contador) registrado con ese nombre, creándolo si no existe.
+
+    Args:
+        nombre: Nombre de la métrica (ej: 'ws_conexiones')
+        descripcion: Texto de ayuda (solo se usa al crearlo)
+        tipo: 'gauge' o 'counter' (solo se usa al crearlo)
+
+    Returns:
+        Instancia de Medidor
+    """
+    medidor = _medidores.get(nombre)
+    if medidor is None:
+        with _lock:
+            medidor = _medidores.setdefault(nombre, Medidor(nombre, descripcion, tipo))
+    return medidor
+
+
+def listar_medidores():
+    """Retorna las instantáneas de todos los medidores y contadores registrados."""
+    with _lock:
+        medidores = list(_medidores.values())
+    return [m.instantanea() for m in medidores]
+
+
+def _formatear_etiquetas(etiquetas: Dict[str, str]) -> str:
+    if not etiquetas:
+        return ''
+    partes = []
+    for clave, valor in sorted(etiquetas.items()):
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{clave}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+def _formatear_numero(valor: float) -> str:
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor)
+
+
+def exportar_prometheus() -> str:
+    """
+    Retorna todas las métricas del proceso en el formato de texto de Prometheus.
+
+    Returns:
+        Texto listo para servir con content-type text/plain; version=0.0.4
+    """
+    lineas = []
+    for histograma in sorted(listar_histogramas(), key=lambda h: h['nombre']):
+        nombre = PREFIJO_PROMETHEUS + histograma['nombre']
+        lineas.append(f'# HELP {nombre} {histograma["descripcion"] or histograma["nombre"]}')
+        lineas.append(f'# TYPE {nombre} histogram')
+        for limite, conteo in histograma['buckets']:
+            lineas.append(f'{nombre}_bucket{{le="{_formatear_numero(float(limite))}"}} {conteo}')
+        lineas.append(f'{nombre}_bucket{{le="+Inf"}} {histograma["conteo"]}')
+        lineas.append(f'{nombre}_sum {_formatear_numero(histograma["suma"])}')
+        lineas.append(f'{nombre}_count {histograma["conteo"]}')
+
+    for medidor in sorted(listar_medidores(), key=lambda m: m['nombre']):
+        nombre = PREFIJO_PROMETHEUS + medidor['nombre']
+        lineas.append(f'# HELP {nombre} {medidor["descripcion"] or medidor["nombre"]}')
+        lineas.append(f'# TYPE {nombre} {medidor["tipo"]}')
+        for etiquetas, valor in sorted(medidor['valores'], key=lambda v: sorted(v[0].items())):
+            lineas.append(f'{nombre}{_formatear_etiquetas(etiquetas)} {_formatear_numero(valor)}')
+
+    return '\n'.join(lineas) + '\n'
+
+
+def percentil(valores: Iterable[float], p: float) -> float:
+    """
+    Percentil p (0-100) por el método del rango más cercano.
+
+    Args:
+        valores: Observaciones (en cualquier orden)
+        p: Percentil a calcular (ej: 95)
+
+    Returns:
+        Valor del percentil, o 0.0 si no hay observaciones
+    """
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    idx = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+
+@contextmanager
+def medir(nombre: str, descripcion: str = '') -> Iterator[None]:
+    """
+    Mide la duración del bloque en segundos y la registra en el histograma.
+
+    Uso:
+        with medir('ws_juez_connect_segundos'):
+            ...
+    """
+    histograma = obtener_histograma(nombre, descripcion)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        histograma.observar(time.perf_counter() - inicio)
+
+
+def database_sync_to_async_medido(funcion):
+    """
+    Igual que channels.db.database_sync_to_async, pero mide la cola del thread pool.
+
+    - thread_pool_en_cola: llamadas esperando hilo en este momento
+    - thread_pool_espera_segundos: tiempo entre la llamada y el inicio en el hilo
+
+    Uso:
+        @database_sync_to_async_medido
+        def obtener_snapshot(self): ...
+    """
+    from channels.db import database_sync_to_async
+
+    en_cola = obtener_medidor('thread_pool_en_cola', 'Llamadas a database_sync_to_async esperando hilo')
+    espera = obtener_histograma('thread_pool_espera_segundos', 'Espera hasta obtener hilo en database_sync_to_async')
+
+    def salir_de_cola(estado, encolado=None):
+        # Se llama al empezar en el hilo y al terminar la corrutina; cuenta una sola vez
+        if estado.pop('en_cola', False):
+            en_cola.sumar(-1)
+            if encolado is not None:
+                espera.observar(time.perf_counter() - encolado)
+
+    @functools.wraps(funcion)
+    async def envoltura(*args, **kwargs):
+        estado = {'en_cola': True}
+        encolado = time.perf_counter()
+
+        def en_hilo():
+            salir_de_cola(estado, encolado)
+            return funcion(*args, **kwargs)
+
+        en_cola.sumar(1)
+        try:
+            return await database_sync_to_async(en_hilo)()
+        finally:
+            salir_de_cola(estado)
+
+    return envoltura
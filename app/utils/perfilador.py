@@ -0,0 +1,216 @@
+"""
+Módulo: perfilador
+Perfil por petición HTTP o mensaje WebSocket: consultas SQL y tiempos por tramo.
+
+Características:
+- Opt-in con PERFILADOR_ACTIVO (sin costo si está desactivado)
+- El perfil vive en un contextvar: sync_to_async lo copia al hilo, así que
+  las consultas hechas con database_sync_to_async cuentan para el mensaje
+- Las consultas se capturan con un execute_wrapper instalado en cada conexión
+- Tramos con nombre vía `tramo()`: el render se mide en las vistas HTML y la
+  serialización en el render de la respuesta DRF (middleware) y en el envío
+  de los consumers; no se modifica ninguna clase de Django ni de DRF
+- Si se supera PERFILADOR_UMBRAL_MS o PERFILADOR_UMBRAL_CONSULTAS se registra
+  un WARNING con las consultas agrupadas por SQL (las repetidas delatan N+1)
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Consultas distintas que se muestran en el log de una ruta lenta
+MAX_CONSULTAS_LOG = 10
+
+_perfil_actual: ContextVar[Optional['Perfil']] = ContextVar('perfil_actual', default=None)
+_instalado = False
+_lock = threading.Lock()
+
+
+def perfilador_activo() -> bool:
+    """Indica si el perfilador está habilitado (PERFILADOR_ACTIVO)."""
+    return getattr(settings, 'PERFILADOR_ACTIVO', False)
+
+
+class Perfil:
+    """
+    Acumula las consultas y los tramos medidos de una petición o mensaje.
+    """
+
+    def __init__(self, descripcion: str):
+        self.descripcion = descripcion
+        self.inicio = time.perf_counter()
+        self.duracion = 0.0
+        self.consultas: List[Tuple[str, float]] = []
+        self.tramos: Dict[str, float] = defaultdict(float)
+        self.tramos_abiertos = set()
+        self._lock = threading.Lock()
+
+    def abrir_tramo(self, nombre: str) -> bool:
+        """
+        Marca el tramo como abierto.
+
+        Returns:
+            False si ya estaba abierto (un tramo anidado del mismo nombre ya
+            está contado, también si lo abrió otro hilo del mismo perfil)
+        """
+        with self._lock:
+            if nombre in self.tramos_abiertos:
+                return False
+            self.tramos_abiertos.add(nombre)
+            return True
+
+    def cerrar_tramo(self, nombre: str, duracion: float):
+        with self._lock:
+            self.tramos_abiertos.discard(nombre)
+            self.tramos[nombre] += duracion
+
+    @property
+    def tiempo_sql(self) -> float:
+        with self._lock:
+            return sum(duracion for _, duracion in self.consultas)
+
+    def registrar_consulta(self, sql: str, duracion: float):
+        with self._lock:
+            self.consultas.append((sql, duracion))
+
+    def registrar_tramo(self, nombre: str, duracion: float):
+        with self._lock:
+            self.tramos[nombre] += duracion
+
+    def consultas_agrupadas(self) -> List[Tuple[str, int, float]]:
+        """
+        Agrupa las consultas por texto SQL.
+
+        Returns:
+            Lista de (sql, veces, tiempo_total) ordenada por tiempo total
+        """
+        grupos: Dict[str, List[float]] = defaultdict(list)
+        with self._lock:
+            for sql, duracion in self.consultas:
+                grupos[sql].append(duracion)
+        return sorted(
+            ((sql, len(duraciones), sum(duraciones)) for sql, duraciones in grupos.items()),
+            key=lambda g: g[2],
+            reverse=True,
+        )
+
+    def resumen(self) -> str:
+        tramos = ' '.join(f'{nombre}={ms * 1000:.1f}ms' for nombre, ms in sorted(self.tramos.items()))
+        return (
+            f'{self.descripcion}: {self.duracion * 1000:.1f}ms total, '
+            f'{len(self.consultas)} consultas ({self.tiempo_sql * 1000:.1f}ms SQL)'
+            + (f', {tramos}' if tramos else '')
+        )
+
+
+def _registrar_ejecucion(execute, sql, params, many, context):
+    """execute_wrapper: mide la consulta si hay un perfil activo en el contexto."""
+    perfil = _perfil_actual.get()
+    if perfil is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        perfil.registrar_consulta(sql, time.perf_counter() - inicio)
+
+
+def _instalar_en_conexion(sender=None, connection=None, **kwargs):
+    if _registrar_ejecucion not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_registrar_ejecucion)
+
+
+def instalar():
+    """
+    Instala el execute_wrapper en las conexiones nuevas y en las ya abiertas
+    de este hilo. Idempotente.
+    """
+    global _instalado
+    with _lock:
+        if _instalado:
+            return
+        connection_created.connect(_instalar_en_conexion, dispatch_uid='perfilador')
+        _instalado = True
+    for conexion in connections.all(initialized_only=True):
+        _instalar_en_conexion(connection=conexion)
+
+
+@contextmanager
+def perfilar(descripcion: str) -> Iterator[Optional[Perfil]]:
+    """
+    Perfila el bloque y registra un WARNING si supera los umbrales.
+
+    Si el perfilador está desactivado (o ya hay un perfil activo) no hace nada
+    y entrega None.
+
+    Uso:
+        with perfilar('GET /api/competencias/'):
+            ...
+    """
+    if not perfilador_activo() or _perfil_actual.get() is not None:
+        yield None
+        return
+
+    instalar()
+    perfil = Perfil(descripcion)
+    token = _perfil_actual.set(perfil)
+    try:
+        yield perfil
+    finally:
+        _perfil_actual.reset(token)
+        perfil.duracion = time.perf_counter() - perfil.inicio
+        _reportar(perfil)
+
+
+@contextmanager
+def tramo(nombre: str) -> Iterator[None]:
+    """
+    Suma la duración del bloque al tramo `nombre` del perfil activo (si lo hay).
+
+    Uso:
+        with tramo('render'):
+            html = render_to_string(...)
+    """
+    perfil = _perfil_actual.get()
+    if perfil is None or not perfil.abrir_tramo(nombre):
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        perfil.cerrar_tramo(nombre, time.perf_counter() - inicio)
+
+
+def sumar_tramo(nombre: str, duracion: float):
+    """Suma una duración ya medida al tramo `nombre` del perfil activo (si lo hay)."""
+    perfil = _perfil_actual.get()
+    if perfil is not None:
+        perfil.registrar_tramo(nombre, duracion)
+
+
+def _reportar(perfil: Perfil):
+    umbral_ms = getattr(settings, 'PERFILADOR_UMBRAL_MS', 200)
+    umbral_consultas = getattr(settings, 'PERFILADOR_UMBRAL_CONSULTAS', 20)
+
+    if perfil.duracion * 1000 < umbral_ms and len(perfil.consultas) < umbral_consultas:
+        logger.debug(perfil.resumen())
+        return
+
+    lineas = [f'Ruta lenta {perfil.resumen()}']
+    grupos = perfil.consultas_agrupadas()
+    for sql, veces, total in grupos[:MAX_CONSULTAS_LOG]:
+        lineas.append(f'  {veces}x {total * 1000:.1f}ms  {sql}')
+    if len(grupos) > MAX_CONSULTAS_LOG:
+        lineas.append(f'  ... {len(grupos) - MAX_CONSULTAS_LOG} consulta(s) distinta(s) más')
+    logger.warning('\n'.join(lineas))
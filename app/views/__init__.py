@@ -4,11 +4,13 @@ Contiene todas las vistas de la API organizadas por funcionalidad.
 """
 
 from .auth_views import LoginView, LogoutView, MeView, RefreshTokenView
-from .competencia_views import CompetenciaViewSet
+from .competencia_views import CompetenciaViewSet, RankingCompetenciaView
 from .equipo_views import EquipoViewSet
 from .html_views import competencia_list_view, competencia_detail_view, competencia_results_partial_view, equipo_detail_view
 from .admin_views import EstadoCompetenciaAdminView
-from .registro_views import RegistrarTiemposView, EstadoEquipoRegistrosView
+from .registro_views import RegistrarTiemposView, EstadoEquipoRegistrosView, EstadoLoteIngestaView
+from .metricas_views import metricas_view
+from .protocolo_views import EsquemaWebSocketView
 
 __all__ = [
     'LoginView',
@@ -16,6 +18,7 @@ __all__ = [
     'MeView',
     'RefreshTokenView',
     'CompetenciaViewSet',
+    'RankingCompetenciaView',
     'EquipoViewSet',
     'competencia_list_view',
     'competencia_detail_view',
@@ -24,4 +27,7 @@ __all__ = [
     'EstadoCompetenciaAdminView',
     'RegistrarTiemposView',
     'EstadoEquipoRegistrosView',
+    'EstadoLoteIngestaView',
+    'metricas_view',
+    'EsquemaWebSocketView',
 ]
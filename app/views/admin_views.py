@@ -1,32 +1,43 @@
 """
 Vistas específicas para el Admin de Django (sin autenticación)
 """
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from app.models import Competencia
+from app.utils.cache_competencias import filtrar_estados_competencias
+
+
+def _filtro_booleano(valor):
+    if valor is None:
+        return None
+    return valor.lower() == 'true'
 
 
 class EstadoCompetenciaAdminView(APIView):
     """
     Vista pública para obtener el estado de las competencias.
-    Usada por el admin de Django para actualizar el cronómetro.
+    Sale del cache de estados (ver app/utils/cache_competencias.py): sin
+    consultas mientras no cambie ninguna competencia.
     No requiere autenticación.
+
+    Filtros (query params):
+        ?id=1,2            Solo esas competencias
+        ?is_running=true   Solo en curso (o false)
+        ?is_active=true    Solo activas (o false)
     """
     permission_classes = [AllowAny]
-    
+
     def get(self, request):
-        """Retorna todas las competencias con su estado"""
-        competencias = Competencia.objects.all()
-        
-        data = []
-        for comp in competencias:
-            data.append({
-                'id': comp.id,
-                'name': comp.name,
-                'is_running': comp.is_running,
-                'started_at': comp.started_at.isoformat() if comp.started_at else None,
-                'finished_at': comp.finished_at.isoformat() if comp.finished_at else None,
-            })
-        
-        return Response(data)
+        """Retorna las competencias que cumplen los filtros con su estado"""
+        ids = request.query_params.get('id')
+        try:
+            ids = [int(valor) for valor in ids.split(',') if valor] if ids else None
+        except ValueError:
+            return Response({'error': 'id debe ser una lista de enteros separada por comas'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(filtrar_estados_competencias(
+            ids=ids,
+            en_curso=_filtro_booleano(request.query_params.get('is_running')),
+            activas=_filtro_booleano(request.query_params.get('is_active')),
+        ))
@@ -3,12 +3,15 @@ Módulo: competencia_views
 ViewSets relacionados con la gestión de competencias.
 """
 
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import viewsets, status
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 from app.serializers import CompetenciaSerializer
 from app.models import Competencia
+from app.services import ResultsService
 
 
 class CompetenciaViewSet(viewsets.ReadOnlyModelViewSet):
@@ -92,3 +95,54 @@ class CompetenciaViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(is_running=is_running_bool)
         
         return queryset
+
+
+class RankingCompetenciaView(APIView):
+    """
+    Vista pública con el ranking de una competencia.
+
+    Usa el mismo motor de ranking que las páginas de resultados y el admin.
+
+    Filtros disponibles:
+    - ?categoria=<código> - Limita el ranking a una categoría
+    """
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        summary="Ranking de competencia",
+        description="Retorna el ranking de equipos con totales, ausencias, mejor tiempo y posiciones",
+        parameters=[
+            OpenApiParameter(
+                name='categoria',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='Filtrar por categoría (estudiantes, interfacultades)',
+                required=False,
+            ),
+        ],
+        responses={
+            200: {'description': 'Ranking de la competencia'},
+            404: {'description': 'Competencia no encontrada'},
+        },
+        tags=['Competencias']
+    )
+    def get(self, request, competencia_id):
+        try:
+            competencia = Competencia.objects.only('id', 'name').get(pk=competencia_id)
+        except Competencia.DoesNotExist:
+            return Response(
+                {"exito": False, "error": f"La competencia con ID {competencia_id} no existe"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        categoria = request.query_params.get('categoria') or None
+        ranking = ResultsService().calcular_ranking(competencia.id, categoria)
+
+        return Response({
+            "exito": True,
+            "competencia_id": competencia.id,
+            "competencia_nombre": competencia.name,
+            "categoria": categoria,
+            "total_equipos": len(ranking),
+            "ranking": [fila.como_dict() for fila in ranking],
+        })
@@ -3,73 +3,114 @@ Módulo: html_views
 Vistas HTML para la interfaz web pública.
 """
 
+from dataclasses import replace
+
+from django.http import HttpResponse
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Prefetch
-from app.models import Competencia, Equipo, RegistroTiempo
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
+from app.models import Competencia, Equipo
 from app.models.equipo import CATEGORIA_CHOICES
+from app.services.leaderboard_service import CATEGORIAS_DISPLAY, EntradaLeaderboard, LeaderboardService
+from app.utils.cache_fragmentos import clave_fragmento_resultados, obtener_o_renderizar
+from app.utils.metricas import medir
+from app.utils.perfilador import tramo
 
 
 def competencia_list_view(request):
     """Listado público de competencias activas."""
     competencias = Competencia.objects.filter(is_active=True).order_by('-datetime')
-    return render(request, 'app/competencia_list.html', {'competencias': competencias})
+    with tramo('render'):
+        return render(request, 'app/competencia_list.html', {'competencias': competencias})
 
 
-def _procesar_equipos(equipos_queryset):
-    """Procesa los equipos y calcula tiempos, posiciones y descalificaciones."""
-    equipos_calificados = []
-    equipos_descalificados = []
-    
-    for equipo in equipos_queryset:
-        tiempos_competencia = [t for t in equipo.prefetched_tiempos]
-
-        # IMPORTANTE UX: si todavía no hay registros enviados para este equipo,
-        # no se muestra en resultados (pantalla vacía hasta el primer envío).
-        if not tiempos_competencia:
-            continue
-        
-        # Detectar jugadores ausentes (tiempo = 0 ms)
-        jugadores_ausentes = sum(1 for t in tiempos_competencia if t.time == 0)
-        equipo.jugadores_ausentes = jugadores_ausentes
-        equipo.descalificado = jugadores_ausentes > 0
-        
-        equipo.tiempo_total_ms = sum(t.time for t in tiempos_competencia)
-        equipo.mejor_tiempo_ms = min(t.time for t in tiempos_competencia if t.time > 0) if any(t.time > 0 for t in tiempos_competencia) else 0
-        
-        # Formatear sin milisegundos
-        total_seconds = equipo.tiempo_total_ms // 1000
-        s = total_seconds % 60
-        total_minutes = total_seconds // 60
-        m = total_minutes % 60
-        h = total_minutes // 60
-        equipo.tiempo_total_formateado = f"{h:02d}:{m:02d}:{s:02d}"
-        
-        # Mejor tiempo sin milisegundos
-        mejor_seconds = equipo.mejor_tiempo_ms // 1000
-        mejor_s = mejor_seconds % 60
-        mejor_m = (mejor_seconds // 60) % 60
-        mejor_h = mejor_seconds // 3600
-        equipo.mejor_tiempo_formateado = f"{mejor_h:02d}:{mejor_m:02d}:{mejor_s:02d}"
-        
-        equipo.num_registros = len(equipo.prefetched_tiempos)
-        equipo.jugadores_completados = equipo.num_registros - jugadores_ausentes
-        
-        if equipo.descalificado:
-            equipos_descalificados.append(equipo)
-        else:
-            equipos_calificados.append(equipo)
-    
-    # Ordenar calificados por tiempo total (menor a mayor)
-    equipos_calificados.sort(key=lambda e: e.tiempo_total_ms if e.tiempo_total_ms > 0 else float('inf'))
-    equipos_descalificados.sort(key=lambda e: e.tiempo_total_ms)
-    
-    # Asignar posiciones
-    for idx, equipo in enumerate(equipos_calificados, 1):
-        equipo.posicion = idx
-    
-    return equipos_calificados, equipos_descalificados
+def _contexto_resultados(competencia, categoria_filtro, leaderboard):
+    """Arma el contexto de resultados leyendo del leaderboard en memoria."""
+    equipos_calificados, equipos_descalificados = leaderboard.listar(categoria_filtro)
+    equipos_list = equipos_calificados + equipos_descalificados
+
+    return {
+        'competencia': competencia,
+        'equipos': equipos_list,
+        'equipos_calificados': len(equipos_calificados),
+        'equipos_descalificados': len(equipos_descalificados),
+        'en_curso': competencia.is_running,
+        'total_equipos': len(equipos_list),
+        'categoria_filtro': categoria_filtro,
+    }
+
+
+def _render_resultados(competencia, categoria_filtro, leaderboard):
+    """
+    Retorna el HTML del bloque de resultados desde el cache compartido.
+    Es igual para todos los espectadores con la misma categoría y versión.
+    """
+    clave = clave_fragmento_resultados(competencia.id, categoria_filtro, leaderboard.version)
+
+    def renderizar():
+        with medir('parcial_render_segundos', 'Render del bloque de resultados (fallo de cache)'), tramo('render'):
+            return render_to_string(
+                'app/partials/competencia_results.html',
+                _contexto_resultados(competencia, categoria_filtro, leaderboard),
+            )
+
+    html = obtener_o_renderizar(clave, renderizar)
+    return mark_safe(html)
+
+
+def _contexto_moldes(categoria_filtro):
+    """
+    Entradas de relleno para renderizar los moldes del JS de la página de detalle
+    con los mismos parciales que el bloque de resultados.
+    """
+    calificado = EntradaLeaderboard(
+        equipo_id=0,
+        nombre='',
+        dorsal=0,
+        categoria=categoria_filtro,
+        tiempo_total_ms=1,
+        mejor_tiempo_ms=1,
+        num_registros=0,
+        jugadores_ausentes=0,
+        posicion=3,
+    )
+    return {
+        'molde_calificado': calificado,
+        'molde_descalificado': replace(calificado, jugadores_ausentes=1, posicion=None),
+        'categoria_display': CATEGORIAS_DISPLAY.get(categoria_filtro, categoria_filtro),
+    }
+
+
+def _etag_resultados(competencia_id, categoria, vista):
+    """
+    ETag fuerte a partir de la versión compartida del leaderboard.
+    Es la misma en todos los procesos, así que sirve detrás de un balanceador.
+    Sin cache (Redis caído) no hay versión: la respuesta sale sin ETag.
+    """
+    version = LeaderboardService().version_actual(competencia_id)
+    if version is None:
+        return None
+    return f"{vista}-{competencia_id}-{categoria or '-'}-{version}"
 
 
+def _etag_competencia(request, pk):
+    return _etag_resultados(pk, request.GET.get('categoria', ''), 'competencia')
+
+
+def _etag_competencia_partial(request, pk):
+    return _etag_resultados(pk, request.GET.get('categoria', ''), 'resultados')
+
+
+def _etag_equipo(request, pk):
+    competencia_id = Equipo.objects.filter(pk=pk).values_list('competition_id', flat=True).first()
+    if competencia_id is None:
+        return None
+    return _etag_resultados(competencia_id, pk, 'equipo')
+
+
+@condition(etag_func=_etag_competencia)
 def competencia_detail_view(request, pk):
     """Detalle de competencia con resultados en tiempo real y filtro por categoría."""
     competencia = get_object_or_404(Competencia, pk=pk, is_active=True)
@@ -77,77 +118,48 @@ def competencia_detail_view(request, pk):
     # Obtener filtro de categoría desde query params
     categoria_filtro = request.GET.get('categoria', '')
     
-    # Obtener equipos con tiempos
-    tiempos_qs = RegistroTiempo.objects.all().order_by('time')
-    equipos_qs = Equipo.objects.filter(
-        competition=competencia
-    ).select_related('judge').prefetch_related(
-        Prefetch('times', queryset=tiempos_qs, to_attr='prefetched_tiempos')
-    )
-    
-    # Aplicar filtro de categoría si existe
-    if categoria_filtro:
-        equipos_qs = equipos_qs.filter(category=categoria_filtro)
-    
-    # Procesar equipos
-    equipos_calificados, equipos_descalificados = _procesar_equipos(equipos_qs)
-    equipos_list = equipos_calificados + equipos_descalificados
-    
-    # Obtener categorías disponibles en esta competencia
-    categorias_disponibles = Equipo.objects.filter(
-        competition=competencia
-    ).values_list('category', flat=True).distinct()
+    leaderboard = LeaderboardService().obtener_leaderboard(competencia.id)
+    equipos_calificados, equipos_descalificados = leaderboard.listar(categoria_filtro)
     
+    # Categorías disponibles en esta competencia (conocidas por el leaderboard)
     categorias = [
         {'value': cat[0], 'label': cat[1], 'selected': cat[0] == categoria_filtro}
         for cat in CATEGORIA_CHOICES
-        if cat[0] in categorias_disponibles
+        if cat[0] in leaderboard.categorias
     ]
     
     context = {
         'competencia': competencia,
-        'equipos': equipos_list,
         'equipos_calificados': len(equipos_calificados),
         'equipos_descalificados': len(equipos_descalificados),
         'en_curso': competencia.is_running,
-        'total_equipos': len(equipos_list),
+        'total_equipos': len(equipos_calificados) + len(equipos_descalificados),
         'categorias': categorias,
         'categoria_filtro': categoria_filtro,
+        'resultados_html': _render_resultados(competencia, categoria_filtro, leaderboard),
+        **_contexto_moldes(categoria_filtro),
     }
 
-    return render(request, 'app/competencia_detail.html', context)
+    with tramo('render'):
+        return render(request, 'app/competencia_detail.html', context)
 
 
+@gzip_page
+@condition(etag_func=_etag_competencia_partial)
 def competencia_results_partial_view(request, pk):
-    """Partial HTML del bloque de resultados para refresco en tiempo real por WebSocket."""
+    """
+    Partial HTML del bloque de resultados para refresco en tiempo real por WebSocket.
+    Se comprime con gzip: cientos de filas casi iguales se reducen a una fracción.
+    """
     competencia = get_object_or_404(Competencia, pk=pk, is_active=True)
 
     categoria_filtro = request.GET.get('categoria', '')
 
-    tiempos_qs = RegistroTiempo.objects.all().order_by('time')
-    equipos_qs = Equipo.objects.filter(
-        competition=competencia
-    ).select_related('judge').prefetch_related(
-        Prefetch('times', queryset=tiempos_qs, to_attr='prefetched_tiempos')
-    )
-
-    if categoria_filtro:
-        equipos_qs = equipos_qs.filter(category=categoria_filtro)
-
-    equipos_calificados, equipos_descalificados = _procesar_equipos(equipos_qs)
-    equipos_list = equipos_calificados + equipos_descalificados
-
-    return render(request, 'app/partials/competencia_results.html', {
-        'competencia': competencia,
-        'equipos': equipos_list,
-        'equipos_calificados': len(equipos_calificados),
-        'equipos_descalificados': len(equipos_descalificados),
-        'en_curso': competencia.is_running,
-        'total_equipos': len(equipos_list),
-        'categoria_filtro': categoria_filtro,
-    })
+    leaderboard = LeaderboardService().obtener_leaderboard(competencia.id)
+    return HttpResponse(_render_resultados(competencia, categoria_filtro, leaderboard))
 
 
+@condition(etag_func=_etag_equipo)
 def equipo_detail_view(request, pk):
     """Detalle de un equipo con todos sus registros de tiempo."""
     equipo = get_object_or_404(
@@ -188,15 +200,16 @@ def equipo_detail_view(request, pk):
     for registro in registros_list:
         registro.tiempo_formateado = formatear_tiempo(registro.time)
     
-    return render(request, 'app/equipo_detail.html', {
-        'equipo': equipo,
-        'competencia': equipo.competition,
-        'registros': registros_list,
-        'total_registros': total_registros,
-        'tiempo_total_ms': tiempo_total_ms,
-        'tiempo_total_formateado': formatear_tiempo(tiempo_total_ms),
-        'mejor_tiempo_formateado': formatear_tiempo(mejor_tiempo_ms),
-        'peor_tiempo_formateado': formatear_tiempo(peor_tiempo_ms),
-        'jugadores_ausentes': jugadores_ausentes,
-        'jugadores_completados': total_registros - jugadores_ausentes,
-    })
\ No newline at end of file
+    with tramo('render'):
+        return render(request, 'app/equipo_detail.html', {
+            'equipo': equipo,
+            'competencia': equipo.competition,
+            'registros': registros_list,
+            'total_registros': total_registros,
+            'tiempo_total_ms': tiempo_total_ms,
+            'tiempo_total_formateado': formatear_tiempo(tiempo_total_ms),
+            'mejor_tiempo_formateado': formatear_tiempo(mejor_tiempo_ms),
+            'peor_tiempo_formateado': formatear_tiempo(peor_tiempo_ms),
+            'jugadores_ausentes': jugadores_ausentes,
+            'jugadores_completados': total_registros - jugadores_ausentes,
+        })
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+Módulo: metricas_views
+Exposición de métricas del proceso en formato Prometheus.
+"""
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from app.utils.metricas import exportar_prometheus
+
+
+def metricas_view(request):
+    """
+    Métricas del proceso que atiende la petición (formato de texto de Prometheus).
+
+    Exige 'Authorization: Bearer <METRICAS_TOKEN>'. Sin token configurado solo
+    responde en DEBUG: en producción no se exponen las métricas sin protección.
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse('Métricas deshabilitadas: define METRICAS_TOKEN', status=403,
+                                content_type='text/plain; charset=utf-8')
+    else:
+        cabecera = request.headers.get('Authorization', '')
+        if not constant_time_compare(cabecera, f'Bearer {token}'):
+            return HttpResponse('No autorizado', status=401, content_type='text/plain')
+
+    return HttpResponse(exportar_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,21 @@
+"""
+Módulo: protocolo_views
+Esquema del formato binario de los WebSockets para los clientes.
+"""
+
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from app.websocket.esquema import exportar_esquema
+
+
+class EsquemaWebSocketView(APIView):
+    """
+    Vista pública con el esquema del subprotocolo MessagePack
+    (claves, tipos y columnas de las filas; ver app/websocket/esquema.py).
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response(exportar_esquema())
@@ -8,13 +8,11 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db import transaction
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 import uuid
 import logging
 
-from app.models import Equipo, RegistroTiempo, Juez
+from app.models import Equipo, RegistroTiempo, Juez, LoteIngesta
+from app.services.ingesta_service import IngestaService, modo_cola
 
 logger = logging.getLogger(__name__)
 
@@ -50,11 +48,30 @@ class RegistrarTiemposView(APIView):
         "total_guardados": 15,
         "registros": [...]
     }
+    
+    Con INGESTA_MODO=cola responde 202 Accepted con un recibo; la confirmación
+    llega después por WebSocket (lote_confirmado / lote_rechazado) y puede
+    consultarse en /api/ingesta/{recibo}/:
+    {
+        "exito": true,
+        "mensaje": "Registros aceptados, pendientes de confirmación",
+        "recibo": "uuid",
+        "estado": "pendiente",
+        "equipo_id": 1
+    }
     """
     
     permission_classes = [IsAuthenticated]
     MAX_REGISTROS = 15
     
+    # Rechazos de lote completo del servicio → (mensaje, código HTTP)
+    RECHAZOS = {
+        'sin_equipos': ("No tienes equipos asignados", status.HTTP_403_FORBIDDEN),
+        'competencia_detenida': ("La competencia no está en curso", status.HTTP_400_BAD_REQUEST),
+        'equipo_inexistente': ("Equipo {equipo_id} no existe", status.HTTP_404_NOT_FOUND),
+        'equipo_ajeno': ("Este equipo no te pertenece", status.HTTP_403_FORBIDDEN),
+    }
+    
     def post(self, request, equipo_id):
         juez = request.user
         
@@ -86,71 +103,49 @@ class RegistrarTiemposView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Modo cola: validación barata, acuse inmediato y confirmación asíncrona
+        if modo_cola():
+            return self._encolar(juez, equipo_id, registros)
+        
         try:
-            with transaction.atomic():
-                # Verificar que el juez tenga equipos asignados
-                equipos_juez = juez.teams.select_related('competition').all()
-                if not equipos_juez.exists():
-                    return Response(
-                        {"exito": False, "error": "No tienes equipos asignados"},
-                        status=status.HTTP_403_FORBIDDEN
-                    )
-                
-                # Verificar que la competencia esté en curso
-                competencia = equipos_juez.first().competition
-                if not competencia or not competencia.is_running:
-                    return Response(
-                        {"exito": False, "error": "La competencia no está en curso"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # Obtener el equipo y verificar pertenencia
-                try:
-                    equipo = Equipo.objects.select_for_update().get(id=equipo_id)
-                except Equipo.DoesNotExist:
-                    return Response(
-                        {"exito": False, "error": f"Equipo {equipo_id} no existe"},
-                        status=status.HTTP_404_NOT_FOUND
-                    )
-                
-                if equipo.judge_id != juez.id:
-                    return Response(
-                        {"exito": False, "error": "Este equipo no te pertenece"},
-                        status=status.HTTP_403_FORBIDDEN
-                    )
-                
-                # Delegar creación en el servicio (usa bulk_create + idempotencia)
-                from app.services.registro_service import RegistroService
-                servicio = RegistroService()
-                # Usar versión SÍNCRONA para evitar problemas de conexión en vistas HTTP
-                resultado = servicio.registrar_batch_sync(juez=juez, equipo_id=equipo.id, registros=registros)
+            # El servicio valida pertenencia, estado de la competencia y registros
+            # previos (en un solo UPDATE condicional en la ruta rápida)
+            from app.services.registro_service import RegistroService
+            servicio = RegistroService()
+            # Usar versión SÍNCRONA para evitar problemas de conexión en vistas HTTP
+            resultado = servicio.registrar_batch_sync(juez=juez, equipo_id=equipo_id, registros=registros)
 
-                logger.info(
-                    "[HTTP] Registros procesados: guardados=%s fallidos=%s equipo=%s(%s) juez=%s(%s)",
-                    resultado['total_guardados'],
-                    resultado['total_fallidos'],
-                    equipo.name,
-                    equipo.id,
-                    juez.username,
-                    juez.id,
-                )
+            logger.info(
+                "[HTTP] Registros procesados: guardados=%s fallidos=%s equipo=%s juez=%s(%s)",
+                resultado['total_guardados'],
+                resultado['total_fallidos'],
+                equipo_id,
+                juez.username,
+                juez.id,
+            )
 
-                if resultado['total_guardados'] == 0 and resultado['total_fallidos'] > 0:
-                    return Response({"exito": False, "error": resultado['registros_fallidos']}, status=status.HTTP_400_BAD_REQUEST)
+            if resultado['total_guardados'] == 0 and resultado['total_fallidos'] > 0:
+                rechazo = self.RECHAZOS.get(resultado.get('motivo'))
+                if rechazo:
+                    mensaje, codigo = rechazo
+                    return Response(
+                        {"exito": False, "error": mensaje.format(equipo_id=equipo_id)},
+                        status=codigo
+                    )
+                return Response({"exito": False, "error": resultado['registros_fallidos']}, status=status.HTTP_400_BAD_REQUEST)
 
-                # Notificar por WebSocket a la UI pública
-                self._notificar_actualizacion(equipo, resultado['registros_guardados'])
-                
-                return Response({
-                    "exito": True,
-                    "mensaje": "Registros guardados exitosamente",
-                    "equipo_id": equipo.id,
-                    "equipo_nombre": equipo.name,
-                    "equipo_dorsal": equipo.number,
-                    "total_guardados": resultado['total_guardados'],
-                    "registros": resultado['registros_guardados'],
-                    "registros_fallidos": resultado['registros_fallidos'],
-                }, status=status.HTTP_201_CREATED)
+            # La notificación por WebSocket la envía el servicio al confirmar la transacción
+            
+            return Response({
+                "exito": True,
+                "mensaje": "Registros guardados exitosamente",
+                "equipo_id": int(equipo_id),
+                "equipo_nombre": resultado['equipo_nombre'],
+                "equipo_dorsal": resultado['equipo_dorsal'],
+                "total_guardados": resultado['total_guardados'],
+                "registros": resultado['registros_guardados'],
+                "registros_fallidos": resultado['registros_fallidos'],
+            }, status=status.HTTP_201_CREATED)
                 
         except Exception as e:
             logger.error(f"[HTTP] Error guardando registros: {str(e)}")
@@ -158,36 +153,52 @@ class RegistrarTiemposView(APIView):
                 {"exito": False, "error": f"Error interno: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+    def _encolar(self, juez, equipo_id, registros):
+        resultado = IngestaService().encolar_lote_sync(juez, equipo_id, registros)
+        
+        if not resultado['exito']:
+            codigo = (
+                status.HTTP_403_FORBIDDEN
+                if resultado['motivo'] == 'equipo_ajeno' else status.HTTP_400_BAD_REQUEST
+            )
+            return Response({"exito": False, "error": resultado['error']}, status=codigo)
+        
+        return Response({
+            "exito": True,
+            "mensaje": "Registros aceptados, pendientes de confirmación",
+            "recibo": resultado['recibo'],
+            "estado": resultado['estado'],
+            "equipo_id": resultado['equipo_id'],
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class EstadoLoteIngestaView(APIView):
+    """
+    GET /api/ingesta/{recibo}/
     
-    def _notificar_actualizacion(self, equipo, registros):
-        """
-        Notifica a los clientes conectados que hay nuevos registros.
-        Esto permite actualizar la UI pública en tiempo real.
-        """
-        try:
-            channel_layer = get_channel_layer()
-            if channel_layer:
-                competencia_group = f'competencia_{equipo.competition_id}'
-                
-                # Calcular tiempo total
-                tiempo_total = sum(r['tiempo'] for r in registros if not r.get('duplicado', False))
-                
-                async_to_sync(channel_layer.group_send)(
-                    competencia_group,
-                    {
-                        'type': 'registros_actualizados',
-                        'data': {
-                            'equipo_id': equipo.id,
-                            'equipo_nombre': equipo.name,
-                            'equipo_dorsal': equipo.number,
-                            'total_registros': len(registros),
-                            'tiempo_total': tiempo_total,
-                        }
-                    }
-                )
-                logger.info(f"[WS] Notificación enviada al grupo {competencia_group}")
-        except Exception as e:
-            logger.warning(f"[WS] No se pudo notificar por WebSocket: {e}")
+    Estado de un lote aceptado en modo cola (pendiente, confirmado o rechazado).
+    Permite al juez recuperar la confirmación si estaba desconectado del WebSocket.
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, recibo):
+        lote = LoteIngesta.objects.filter(receipt_id=recibo, judge_id=request.user.id).first()
+        if lote is None:
+            return Response(
+                {"error": "Recibo no encontrado"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response({
+            "recibo": str(lote.receipt_id),
+            "equipo_id": lote.team_id,
+            "estado": lote.status,
+            "recibido": lote.created_at.isoformat(),
+            "procesado": lote.processed_at.isoformat() if lote.processed_at else None,
+            "resultado": lote.result,
+        })
 
 
 class EstadoEquipoRegistrosView(APIView):
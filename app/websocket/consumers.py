@@ -11,24 +11,51 @@ Responsable de:
 import urllib.parse
 import logging
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
-from channels.db import database_sync_to_async
+from django.urls import reverse
+from app.services.ingesta_service import IngestaService, modo_cola
+from app.utils.cache_competencias import filtrar_estados_competencias
+from app.utils.canales import alias_capa_publica
+from app.utils.metricas import database_sync_to_async_medido, medir, obtener_medidor
+from .perfilador import PerfiladorConsumerMixin
+from .protocolo import ProtocoloConsumerMixin
+from .reloj import RelojConsumerMixin
 from .validators import (
-    get_juez_from_token,
-    verificar_competencia_activa,
-    obtener_estado_competencia,
+    cargar_contexto_conexion,
     validar_datos_registro,
     validar_datos_batch,
 )
 
 logger = logging.getLogger(__name__)
 
+# Conexiones abiertas en este proceso por competencia y tipo (juez/publico)
+conexiones_ws = obtener_medidor('ws_conexiones', 'WebSockets abiertos por competencia y tipo')
 
-class JuezConsumer(AsyncJsonWebsocketConsumer):
+
+def _evento_repetido(consumer, event) -> bool:
+    """
+    Indica si un evento de estado de la bandeja de salida ya se entregó a este consumer.
+
+    El despachador reenvía un evento si cae entre el envío y el commit (o si
+    falló en una sola capa); los evento_id crecen por competencia, así que
+    también se descarta un evento anterior al último entregado.
+    """
+    evento_id = event.get('data', {}).get('evento_id')
+    if evento_id is None:
+        return False
+    if evento_id <= getattr(consumer, 'ultimo_evento_id', 0):
+        return True
+    consumer.ultimo_evento_id = evento_id
+    return False
+
+
+class JuezConsumer(PerfiladorConsumerMixin, ProtocoloConsumerMixin, RelojConsumerMixin, AsyncJsonWebsocketConsumer):
     """
     Consumer WebSocket para jueces.
     
     Maneja la conexión, autenticación y recepción de tiempos de los jueces.
     Usa Redis como transport layer para mensajería entre workers.
+    Mensajes en JSON, o MessagePack con el subprotocolo `server5k.msgpack.v1`
+    (ver app/websocket/esquema.py).
     """
     
     async def connect(self):
@@ -40,7 +67,14 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
         - Que el juez esté activo
         - Que el juez_id de la URL coincida con el token
         - Que la competencia esté activa
+        
+        Todo el contexto (juez, equipos, competencia y su estado) se carga en un
+        solo salto al thread pool; la latencia total queda en ws_juez_connect_segundos.
         """
+        with medir('ws_juez_connect_segundos', 'Duración de JuezConsumer.connect'):
+            await self._conectar()
+
+    async def _conectar(self):
         # Expect token in querystring: ?token=...
         qs = self.scope.get('query_string', b'').decode()
         params = urllib.parse.parse_qs(qs)
@@ -55,11 +89,13 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
             return
 
         try:
-            juez = await get_juez_from_token(token)
-            if not juez:
+            with medir('ws_juez_connect_contexto_segundos', 'Carga del contexto de conexión (incluye espera del thread pool)'):
+                contexto = await cargar_contexto_conexion(token)
+            if not contexto:
                 logger.warning("WebSocket rejected: invalid token or inactive judge")
                 await self.close(code=4002)
                 return
+            juez = contexto['juez']
             logger.info("WebSocket authenticated: juez=%s id=%s", juez.username, juez.id)
         except Exception as e:
             logger.exception("WebSocket token validation error")
@@ -78,9 +114,7 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
             return
 
         # Verificar que la competencia esté activa
-        logger.debug("Checking active competition for juez_id=%s", self.juez_id)
-        competencia_activa = await verificar_competencia_activa(self.juez)
-        if not competencia_activa:
+        if not contexto['competencia_activa']:
             logger.warning("WebSocket rejected: no active competition juez_id=%s", self.juez_id)
             await self.close(code=4004)
             return
@@ -90,8 +124,8 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
         # Unirse al grupo del juez y al grupo de la competencia
         self.group_name = f'juez_{self.juez_id}'
         
-        # Obtener competencia_id del equipo asignado al juez (async)
-        competencia_id = await self.get_competencia_id_del_juez()
+        # Competencia del primer equipo asignado al juez
+        competencia_id = contexto['competencia_id']
         
         if competencia_id:
             self.competencia_group = f'competencia_{competencia_id}'
@@ -102,30 +136,24 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
         
         logger.info("WebSocket accepted: juez_id=%s", self.juez_id)
         await self.accept()
+        if competencia_id:
+            self.competencia_metrica = competencia_id
+            conexiones_ws.sumar(1, competencia=competencia_id, tipo='juez')
         
-        # Enviar estado de la competencia al conectar
-        estado_competencia = await obtener_estado_competencia(self.juez)
+        # Enviar estado de la competencia al conectar (con el cronómetro del servidor)
+        estado_competencia = contexto['estado_competencia']
+        self.fijar_estado_reloj(
+            estado_competencia['id'], estado_competencia['en_curso'], estado_competencia['started_at']
+        )
         logger.debug("Sending initial competition state juez_id=%s state=%s", self.juez_id, estado_competencia)
         await self.send_json({
             'tipo': 'conexion_establecida',
             'mensaje': 'Conectado exitosamente',
-            'competencia': estado_competencia
+            'competencia': estado_competencia,
+            'reloj': self.estado_reloj(),
         })
         logger.info("WebSocket ready: juez=%s id=%s", self.juez.username, self.juez_id)
 
-    @database_sync_to_async
-    def get_competencia_id_del_juez(self):
-        """
-        Obtiene el ID de la competencia del primer equipo del juez.
-        Debe ser async porque accede a la base de datos.
-        """
-        equipo = self.juez.teams.select_related('competition').first()
-        if equipo:
-            logger.debug("Team found: equipo=%s competencia=%s", equipo.name, equipo.competition.name)
-            return equipo.competition_id
-        logger.warning("Judge has no assigned teams juez_id=%s", self.juez_id)
-        return None
-
     async def disconnect(self, close_code):
         """
         Maneja la desconexión del WebSocket.
@@ -136,6 +164,9 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
             await self.channel_layer.group_discard(self.competencia_group, self.channel_name)
         except Exception:
             pass
+        self.detener_reloj()
+        if hasattr(self, 'competencia_metrica'):
+            conexiones_ws.sumar(-1, competencia=self.competencia_metrica, tipo='juez')
         logger.info("WebSocket disconnected: juez_id=%s code=%s", getattr(self, 'juez_id', None), close_code)
 
     async def receive_json(self, content, **kwargs):
@@ -143,20 +174,22 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
         Maneja mensajes JSON del cliente.
         
         Mensajes soportados:
-        1. ping: Mantiene la conexión viva (heartbeat)
+        1. ping: Mantiene la conexión viva (heartbeat); con t0 sincroniza el
+           reloj (ver app/websocket/reloj.py)
+        
+        2. registrar_tiempos: Solo con INGESTA_MODO=cola (acuse con recibo)
         
-        NOTA: Los registros de tiempo ahora se envían por HTTP POST
+        NOTA: En modo directo los registros de tiempo se envían por HTTP POST
         a /api/equipos/{id}/registros/ para mayor confiabilidad.
         El WebSocket solo se usa para notificaciones en tiempo real.
         """
         tipo = content.get('tipo')
         
         if tipo == 'ping':
-            # Responder al heartbeat
-            await self.send_json({
-                'tipo': 'pong',
-                'mensaje': 'Conexión activa'
-            })
+            # Responder al heartbeat (y a la sincronización de reloj si trae t0)
+            await self.responder_ping(content, mensaje='Conexión activa')
+        elif tipo == 'registrar_tiempos' and modo_cola():
+            await self.manejar_registro_tiempos_batch(content)
         elif tipo == 'registrar_tiempo' or tipo == 'registrar_tiempos':
             # Informar al cliente que debe usar HTTP
             await self.send_json({
@@ -288,6 +321,27 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
             equipo_id = content.get('equipo_id')
             registros = content.get('registros', [])
             
+            # Modo cola: acuse inmediato; la confirmación llega como lote_confirmado
+            if modo_cola():
+                resultado = await IngestaService().encolar_lote(
+                    juez=self.juez,
+                    equipo_id=equipo_id,
+                    registros=registros
+                )
+                if resultado['exito']:
+                    await self.send_json({
+                        'tipo': 'lote_aceptado',
+                        'recibo': resultado['recibo'],
+                        'estado': resultado['estado'],
+                        'equipo_id': resultado['equipo_id'],
+                    })
+                else:
+                    await self.send_json({
+                        'tipo': 'error',
+                        'mensaje': resultado['error']
+                    })
+                return
+            
             # Procesar batch usando el servicio
             from app.services.registro_service import RegistroService
             
@@ -340,7 +394,11 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
         # Evento frecuente: mantener en DEBUG para evitar ruido.
         logger.debug("Event competencia_iniciada received juez_id=%s", self.juez_id)
         
+        if _evento_repetido(self, event):
+            return
+        
         data = event.get('data', {})
+        self.fijar_estado_reloj(data.get('competencia_id'), data.get('en_curso'), data.get('started_at'))
         
         mensaje_a_enviar = {
             'tipo': 'competencia_iniciada',
@@ -368,7 +426,11 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
         
         logger.debug("Event competencia_detenida received juez_id=%s", self.juez_id)
         
+        if _evento_repetido(self, event):
+            return
+        
         data = event.get('data', {})
+        self.fijar_estado_reloj(data.get('competencia_id'), data.get('en_curso'), data.get('started_at'))
         
         mensaje_a_enviar = {
             'tipo': 'competencia_detenida',
@@ -400,29 +462,63 @@ class JuezConsumer(AsyncJsonWebsocketConsumer):
         logger.debug("Event registros_actualizados received juez_id=%s", self.juez_id)
         
         data = event.get('data', {})
-        
-        mensaje_a_enviar = {
-            'tipo': 'registros_actualizados',
-            'equipo': {
-                'id': data.get('equipo_id'),
-                'nombre': data.get('equipo_nombre'),
-                'dorsal': data.get('equipo_dorsal'),
-            },
-            'total_registros': data.get('total_registros'),
-            'tiempo_total': data.get('tiempo_total'),
-        }
-        
-        await self.send_json(mensaje_a_enviar)
+
+        # Un evento agrupa los equipos de una ventana de difusión; al juez se le envía uno por equipo
+        for equipo in data.get('equipos', []):
+            mensaje_a_enviar = {
+                'tipo': 'registros_actualizados',
+                'equipo': {
+                    'id': equipo.get('equipo_id'),
+                    'nombre': equipo.get('equipo_nombre'),
+                    'dorsal': equipo.get('equipo_dorsal'),
+                },
+                'total_registros': equipo.get('total_registros'),
+                'tiempo_total': equipo.get('tiempo_total'),
+            }
+
+            await self.send_json(mensaje_a_enviar)
 
         logger.debug("registros_actualizados sent juez_id=%s", self.juez_id)
 
+    async def lote_confirmado(self, event):
+        """
+        Confirma al juez que un lote encolado quedó guardado (modo cola).
+        """
+        await self.send_json({'tipo': 'lote_confirmado', **event.get('data', {})})
 
-class CompetenciaPublicConsumer(AsyncJsonWebsocketConsumer):
+    async def lote_rechazado(self, event):
+        """
+        Informa al juez que un lote encolado no pudo guardarse (modo cola).
+        """
+        await self.send_json({'tipo': 'lote_rechazado', **event.get('data', {})})
+
+
+class CompetenciaPublicConsumer(PerfiladorConsumerMixin, ProtocoloConsumerMixin, RelojConsumerMixin, AsyncJsonWebsocketConsumer):
     """Consumer WebSocket público para ver resultados en vivo.
 
     Se suscribe al grupo `competencia_<id>` y reenvía eventos al navegador.
+
+    Protocolo del leaderboard:
+    - Al conectar se envía `leaderboard_snapshot` con el estado completo.
+    - Los batches confirmados en una misma ventana de difusión llegan fusionados
+      en un `leaderboard_delta` que cubre las secuencias `desde`..`secuencia`.
+    - Si el cliente detecta un salto de secuencia envía `solicitar_snapshot`.
+
+    Formato: JSON, o MessagePack si el cliente ofrece el subprotocolo
+    `server5k.msgpack.v1` (ver app/websocket/esquema.py).
+    Un mensaje mayor que WS_MENSAJE_MAX_BYTES llega como `recargar` con la URL
+    del parcial HTML (ver app/websocket/protocolo.py).
+
+    Cronómetro: `conexion_establecida` trae el reloj del servidor, `ping` con t0
+    sincroniza y con la competencia en curso llegan ticks `reloj`
+    (ver app/websocket/reloj.py).
+
+    Usa la capa 'publico' (Redis pub/sub): el proceso se suscribe una vez por
+    competencia y reparte cada mensaje en memoria a sus espectadores.
     """
 
+    channel_layer_alias = alias_capa_publica()
+
     async def connect(self):
         competencia_id = str(self.scope['url_route']['kwargs'].get('competencia_id'))
         if not competencia_id:
@@ -434,37 +530,96 @@ class CompetenciaPublicConsumer(AsyncJsonWebsocketConsumer):
 
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
+        self.conectado = True
+        conexiones_ws.sumar(1, competencia=self.competencia_id, tipo='publico')
 
+        estado = await self.obtener_estado_competencia()
+        if estado:
+            self.fijar_estado_reloj(estado['id'], estado['is_running'], estado['started_at'])
         await self.send_json({
             'tipo': 'conexion_establecida',
             'competencia_id': int(self.competencia_id),
+            'reloj': self.estado_reloj(),
         })
+        await self.enviar_snapshot()
 
     async def disconnect(self, close_code):
         try:
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
         except Exception:
             pass
+        self.detener_reloj()
+        if getattr(self, 'conectado', False):
+            conexiones_ws.sumar(-1, competencia=self.competencia_id, tipo='publico')
 
     async def receive_json(self, content, **kwargs):
-        if content.get('tipo') == 'ping':
-            await self.send_json({'tipo': 'pong'})
+        tipo = content.get('tipo')
+        if tipo == 'ping':
+            await self.responder_ping(content)
+        elif tipo == 'solicitar_snapshot':
+            await self.enviar_snapshot()
 
-    async def registros_actualizados(self, event):
-        data = event.get('data', {})
+    def url_recarga(self, content):
+        """Parcial HTML de resultados (respaldo si el snapshot supera WS_MENSAJE_MAX_BYTES)."""
+        return reverse('ui:competencia_results_partial', args=[int(self.competencia_id)])
+
+    @database_sync_to_async_medido
+    def obtener_estado_competencia(self):
+        """Estado de la competencia desde el cache de estados (sin consulta si está caliente)."""
+        estados = filtrar_estados_competencias(ids=[int(self.competencia_id)])
+        return estados[0] if estados else None
+
+    @database_sync_to_async_medido
+    def obtener_snapshot(self):
+        from app.services.leaderboard_service import LeaderboardService
+        return LeaderboardService().obtener_snapshot(int(self.competencia_id))
+
+    async def enviar_snapshot(self):
+        """Envía el leaderboard completo (al conectar o tras detectar un salto)."""
+        try:
+            snapshot = await self.obtener_snapshot()
+        except Exception:
+            logger.exception("Error obteniendo snapshot competencia_id=%s", self.competencia_id)
+            return
         await self.send_json({
-            'tipo': 'registros_actualizados',
-            'data': data,
+            'tipo': 'leaderboard_snapshot',
+            'data': snapshot,
         })
 
+    async def registros_actualizados(self, event):
+        data = event.get('data', {})
+        for tramo in data.get('deltas', []):
+            await self.send_json({
+                'tipo': 'leaderboard_delta',
+                'data': tramo,
+            })
+
+        if data.get('incompleto'):
+            # Algún equipo sin delta (p. ej. error al aplicar): el cliente refresca el parcial
+            await self.send_json({
+                'tipo': 'registros_actualizados',
+                'data': {
+                    'competencia_id': data.get('competencia_id'),
+                    'equipo_ids': data.get('equipo_ids', []),
+                },
+            })
+
     async def competencia_iniciada(self, event):
+        if _evento_repetido(self, event):
+            return
+        data = event.get('data', {})
+        self.fijar_estado_reloj(data.get('competencia_id'), data.get('en_curso'), data.get('started_at'))
         await self.send_json({
             'tipo': 'competencia_iniciada',
             'data': event.get('data', {}),
         })
 
     async def competencia_detenida(self, event):
+        if _evento_repetido(self, event):
+            return
+        data = event.get('data', {})
+        self.fijar_estado_reloj(data.get('competencia_id'), data.get('en_curso'), data.get('started_at'))
         await self.send_json({
             'tipo': 'competencia_detenida',
             'data': event.get('data', {}),
-        })
\ No newline at end of file
+        })
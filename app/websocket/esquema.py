@@ -0,0 +1,157 @@
+"""
+Módulo: esquema (WebSocket)
+Esquema compartido del formato binario de los WebSockets (subprotocolo MessagePack).
+
+El cliente lo pide al conectar con el subprotocolo SUBPROTOCOLO_MSGPACK
+(`new WebSocket(url, ['server5k.msgpack.v1'])`); sin él todo sigue en JSON.
+Los mensajes son los mismos que en JSON, codificados así:
+- Claves conocidas (CLAVES) -> su índice entero; las demás quedan como texto
+- Valor de 'tipo' conocido (TIPOS) -> su índice entero
+- Listas de filas (FILAS, p. ej. los equipos del leaderboard) -> lista de
+  arreglos con las columnas en orden fijo, sin repetir las claves por fila
+- El resultado se empaqueta con MessagePack en un frame binario
+
+Los frames de texto se siguen aceptando como JSON en ambos modos.
+
+Compatibilidad: CLAVES, TIPOS y las columnas de FILAS solo crecen al final.
+Quitar o reordenar algo exige subir VERSION (y con ella el subprotocolo).
+GET /api/ws/esquema/ entrega este esquema a los clientes.
+"""
+
+from operator import itemgetter
+from typing import Any, Dict
+
+import msgpack
+
+VERSION = 1
+SUBPROTOCOLO_MSGPACK = f'server5k.msgpack.v{VERSION}'
+
+TIPOS = (
+    'conexion_establecida',
+    'ping',
+    'pong',
+    'error',
+    'reloj',
+    'competencia_iniciada',
+    'competencia_detenida',
+    'leaderboard_snapshot',
+    'leaderboard_delta',
+    'registros_actualizados',
+    'solicitar_snapshot',
+    'registrar_tiempos',
+    'registrar_tiempo',
+    'tiempo_registrado',
+    'tiempos_registrados_batch',
+    'lote_aceptado',
+    'lote_confirmado',
+    'lote_rechazado',
+    'recargar',
+)
+
+CLAVES = (
+    # Comunes
+    'tipo', 'mensaje', 'data', 'error', 'exito', 'motivo', 'usar_http',
+    # Competencia y reloj
+    'competencia', 'competencia_id', 'competencia_nombre', 'id', 'nombre',
+    'en_curso', 'activa', 'started_at', 'finished_at', 'evento_id', 'reloj',
+    'servidor_ms', 'inicio_ms', 'transcurrido_ms', 't0', 't1', 't2',
+    # Leaderboard
+    'secuencia', 'desde', 'version', 'categorias', 'equipos', 'equipo',
+    'cambios', 'deltas', 'incompleto', 'equipo_ids', 'dorsal', 'categoria',
+    'total_ms', 'mejor_ms', 'registros', 'ausentes', 'descalificado', 'posicion',
+    # Registros de tiempo y lotes
+    'equipo_id', 'equipo_nombre', 'equipo_dorsal', 'registro', 'id_registro',
+    'tiempo', 'horas', 'minutos', 'segundos', 'milisegundos', 'timestamp',
+    'indice', 'duplicado', 'total_enviados', 'total_guardados', 'total_fallidos',
+    'registros_guardados', 'registros_fallidos', 'recibo', 'estado',
+    # Aviso recargar (mensaje sobre WS_MENSAJE_MAX_BYTES)
+    'tipo_original', 'bytes', 'max_bytes', 'url',
+)
+
+# Clave -> columnas de cada fila de la lista (valores escalares: no se recorren)
+FILAS = {
+    'equipos': (
+        'id', 'nombre', 'dorsal', 'categoria', 'total_ms', 'mejor_ms',
+        'registros', 'ausentes', 'descalificado', 'posicion',
+    ),
+    'registros_guardados': ('indice', 'id_registro', 'tiempo', 'duplicado'),
+    'registros_fallidos': ('indice', 'error'),
+}
+
+_CODIGO_CLAVE = {clave: codigo for codigo, clave in enumerate(CLAVES)}
+_CODIGO_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS)}
+_COLUMNAS = {clave: frozenset(columnas) for clave, columnas in FILAS.items()}
+_EXTRAER_FILA = {clave: itemgetter(*columnas) for clave, columnas in FILAS.items()}
+
+
+def exportar_esquema() -> Dict[str, Any]:
+    """Esquema en forma serializable (para clientes en otros lenguajes)."""
+    return {
+        'version': VERSION,
+        'subprotocolo': SUBPROTOCOLO_MSGPACK,
+        'tipos': list(TIPOS),
+        'claves': list(CLAVES),
+        'filas': {clave: list(columnas) for clave, columnas in FILAS.items()},
+    }
+
+
+def _compactar(valor, clave=None):
+    if isinstance(valor, dict):
+        return {
+            _CODIGO_CLAVE.get(k, str(k)): (
+                _CODIGO_TIPO.get(v, v) if k == 'tipo' else _compactar(v, k)
+            )
+            for k, v in valor.items()
+        }
+    if isinstance(valor, (list, tuple)):
+        columnas = FILAS.get(clave)
+        if columnas and valor and all(
+            isinstance(fila, dict) and fila.keys() == _COLUMNAS[clave] for fila in valor
+        ):
+            return list(map(_EXTRAER_FILA[clave], valor))
+        return [_compactar(v) for v in valor]
+    return valor
+
+
+def _expandir(valor, clave=None):
+    if isinstance(valor, dict):
+        resultado = {}
+        for k, v in valor.items():
+            nombre = CLAVES[k] if isinstance(k, int) and 0 <= k < len(CLAVES) else k
+            if nombre == 'tipo' and isinstance(v, int) and 0 <= v < len(TIPOS):
+                resultado[nombre] = TIPOS[v]
+            else:
+                resultado[nombre] = _expandir(v, nombre)
+        return resultado
+    if isinstance(valor, list):
+        columnas = FILAS.get(clave)
+        if columnas and valor and all(isinstance(fila, list) for fila in valor):
+            return [dict(zip(columnas, fila)) for fila in valor]
+        return [_expandir(v) for v in valor]
+    return valor
+
+
+def codificar(mensaje: Dict[str, Any]) -> bytes:
+    """
+    Codifica un mensaje (el mismo dict que se enviaría como JSON).
+
+    Args:
+        mensaje: Mensaje con 'tipo'
+
+    Returns:
+        Bytes MessagePack para un frame binario
+    """
+    return msgpack.packb(_compactar(mensaje), use_bin_type=True)
+
+
+def decodificar(datos: bytes) -> Dict[str, Any]:
+    """
+    Decodifica un frame binario al mismo dict que produciría el JSON.
+
+    Args:
+        datos: Bytes MessagePack
+
+    Returns:
+        Mensaje con las claves y el 'tipo' en texto
+    """
+    return _expandir(msgpack.unpackb(datos, raw=False, strict_map_key=False))
@@ -0,0 +1,28 @@
+"""
+Módulo: perfilador (WebSocket)
+Mixin que perfila cada mensaje que procesa un consumer.
+
+Cada evento (websocket.connect, websocket.receive, eventos de grupo como
+registros_actualizados) es un perfil: consultas SQL (también las hechas con
+database_sync_to_async), tiempo SQL y serialización JSON de lo enviado. Sin
+PERFILADOR_ACTIVO no hace nada. Ver app/utils/perfilador.py.
+"""
+
+from app.utils.perfilador import perfilar, tramo
+
+
+class PerfiladorConsumerMixin:
+    """
+    Va antes de la clase base del consumer:
+
+        class JuezConsumer(PerfiladorConsumerMixin, AsyncJsonWebsocketConsumer): ...
+    """
+
+    async def dispatch(self, message):
+        with perfilar(f'{type(self).__name__} {message.get("type")}'):
+            await super().dispatch(message)
+
+    @classmethod
+    async def encode_json(cls, content):
+        with tramo('serializacion'):
+            return await super().encode_json(content)
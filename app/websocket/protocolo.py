@@ -0,0 +1,119 @@
+"""
+Módulo: protocolo (WebSocket)
+Mixin que negocia el formato de los mensajes al conectar: JSON (por defecto)
+o MessagePack con el esquema compartido de app/websocket/esquema.py.
+
+También mide el tamaño de cada mensaje enviado (ws_mensaje_bytes,
+ws_bytes_enviados_total por tipo) y aplica WS_MENSAJE_MAX_BYTES: un mensaje
+mayor no se envía y en su lugar llega {'tipo': 'recargar', 'data': {...}}
+para que el cliente pida los datos por HTTP. La compresión permessage-deflate
+la negocia Daphne (ver server/daphne_ws.py).
+
+Un frame que no se puede decodificar, o que no es un objeto, recibe
+{'tipo': 'error'} y la conexión sigue abierta.
+"""
+
+import logging
+
+import msgpack
+from django.conf import settings
+
+from app.utils.metricas import LIMITES_BYTES, obtener_histograma, obtener_medidor
+from app.utils.perfilador import tramo
+
+from .esquema import SUBPROTOCOLO_MSGPACK, codificar, decodificar
+
+logger = logging.getLogger(__name__)
+
+bytes_mensaje = obtener_histograma(
+    'ws_mensaje_bytes', 'Tamaño de los mensajes WebSocket enviados (antes de comprimir)', LIMITES_BYTES
+)
+bytes_enviados = obtener_medidor(
+    'ws_bytes_enviados_total', 'Bytes enviados por WebSocket por tipo de mensaje y formato', 'counter'
+)
+mensajes_excedidos = obtener_medidor(
+    'ws_mensajes_excedidos_total', 'Mensajes WebSocket reemplazados por recargar (WS_MENSAJE_MAX_BYTES)', 'counter'
+)
+mensajes_invalidos = obtener_medidor(
+    'ws_mensajes_invalidos_total', 'Frames WebSocket recibidos que no se pudieron decodificar', 'counter'
+)
+
+# Lo que lanzan msgpack.unpackb y json.loads con datos arbitrarios
+# (TypeError: un mapa MessagePack con una clave no hashable)
+ERRORES_DECODIFICACION = (msgpack.UnpackException, ValueError, TypeError)
+
+
+class ProtocoloConsumerMixin:
+    """
+    Va antes de la clase base del consumer. Si el cliente ofrece
+    SUBPROTOCOLO_MSGPACK se acepta con él y send_json envía frames binarios;
+    los handlers siguen trabajando con los mismos dicts.
+
+    El consumer puede definir `url_recarga` para indicar en el aviso
+    'recargar' dónde obtener los datos por HTTP.
+    """
+
+    binario = False
+
+    async def accept(self, subprotocol=None, headers=None):
+        if subprotocol is None and SUBPROTOCOLO_MSGPACK in self.scope.get('subprotocols', []):
+            subprotocol = SUBPROTOCOLO_MSGPACK
+        self.binario = subprotocol == SUBPROTOCOLO_MSGPACK
+        await super().accept(subprotocol=subprotocol, headers=headers)
+
+    async def send_json(self, content, close=False):
+        if self.binario:
+            with tramo('serializacion'):
+                datos = codificar(content)
+        else:
+            datos = await self.encode_json(content)
+
+        # El JSON sale con ensure_ascii: caracteres == bytes
+        tamano = len(datos)
+        tipo = content.get('tipo', '')
+        bytes_mensaje.observar(tamano)
+        bytes_enviados.sumar(tamano, tipo=tipo, formato='msgpack' if self.binario else 'json')
+
+        limite = getattr(settings, 'WS_MENSAJE_MAX_BYTES', 0)
+        if limite and tamano > limite and tipo != 'recargar':
+            mensajes_excedidos.sumar(1, tipo=tipo)
+            logger.warning("Mensaje WebSocket de %s bytes (tipo=%s) supera WS_MENSAJE_MAX_BYTES=%s; se envía recargar",
+                           tamano, tipo, limite)
+            await self.send_json({
+                'tipo': 'recargar',
+                'data': {
+                    'tipo_original': tipo,
+                    'bytes': tamano,
+                    'max_bytes': limite,
+                    'url': self.url_recarga(content),
+                },
+            }, close=close)
+            return
+
+        if self.binario:
+            await self.send(bytes_data=datos, close=close)
+        else:
+            await self.send(text_data=datos, close=close)
+
+    def url_recarga(self, content):
+        """URL para obtener por HTTP lo que no cupo en el mensaje (None si no hay)."""
+        return None
+
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        # Los frames vienen del cliente: cualquier contenido debe terminar en
+        # receive_json con un dict o en una respuesta de error
+        try:
+            if bytes_data and self.binario:
+                content = decodificar(bytes_data)
+            elif text_data:
+                content = await self.decode_json(text_data)
+            else:
+                raise ValueError('frame binario sin el subprotocolo MessagePack')
+            if not isinstance(content, dict):
+                raise ValueError('se esperaba un objeto')
+        except ERRORES_DECODIFICACION as e:
+            mensajes_invalidos.sumar(1, formato='msgpack' if bytes_data else 'json')
+            logger.debug("Frame WebSocket inválido: %s", e)
+            await self.send_json({'tipo': 'error', 'mensaje': f'Mensaje inválido: {e}'})
+            return
+        await self.receive_json(content, **kwargs)
@@ -0,0 +1,120 @@
+"""
+Módulo: reloj (WebSocket)
+Cronómetro de carrera con el servidor como referencia.
+
+Protocolo:
+- El cliente envía {'tipo': 'ping', 't0': <su reloj en ms>}; el pong devuelve
+  t0, t1 (recepción en el servidor) y t2 (envío). Con t3 (recepción en el
+  cliente) el cliente estima, como NTP:
+      rtt    = (t3 - t0) - (t2 - t1)
+      offset = ((t1 - t0) + (t2 - t3)) / 2
+  y se queda con la muestra de menor rtt (la menos afectada por la red).
+- Con la competencia en curso se envía cada RELOJ_TICK_MS un mensaje
+  {'tipo': 'reloj', 'data': {servidor_ms, inicio_ms, transcurrido_ms, ...}}.
+- Transcurrido en el cliente = (su reloj + offset) - inicio_ms.
+
+Los tiempos son milisegundos epoch del servidor: inicio_ms sale de started_at
+y todos los procesos Daphne comparten el reloj del sistema (NTP), cosa que no
+pasa con time.monotonic().
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def ahora_ms() -> int:
+    """Hora del servidor en milisegundos epoch."""
+    return time.time_ns() // 1_000_000
+
+
+def iso_a_ms(valor: Optional[str]) -> Optional[int]:
+    """Convierte un timestamp ISO 8601 (como started_at en los eventos) a ms epoch."""
+    fecha = parse_datetime(valor) if valor else None
+    return int(fecha.timestamp() * 1000) if fecha else None
+
+
+class RelojConsumerMixin:
+    """
+    Sincronización de reloj y ticks del cronómetro para un consumer.
+
+    El consumer llama a `fijar_estado_reloj` al conectar y con cada evento de
+    inicio o fin, a `responder_ping` con cada ping y a `detener_reloj` al
+    desconectar.
+    """
+
+    reloj_competencia_id = None
+    reloj_inicio_ms = None
+    reloj_en_curso = False
+    _reloj_tarea = None
+
+    def fijar_estado_reloj(self, competencia_id, en_curso: bool, started_at: Optional[str]):
+        """
+        Actualiza el estado del cronómetro y arranca o detiene los ticks.
+
+        Args:
+            competencia_id: ID de la competencia del consumer
+            en_curso: Si la competencia está en curso
+            started_at: Inicio en ISO 8601 (None si nunca inició)
+        """
+        self.reloj_competencia_id = competencia_id
+        self.reloj_en_curso = bool(en_curso)
+        self.reloj_inicio_ms = iso_a_ms(started_at)
+
+        intervalo = getattr(settings, 'RELOJ_TICK_MS', 5000)
+        if self.reloj_en_curso and self.reloj_inicio_ms and intervalo > 0:
+            if self._reloj_tarea is None:
+                self._reloj_tarea = asyncio.ensure_future(self._enviar_ticks(intervalo / 1000))
+        else:
+            self.detener_reloj()
+
+    def estado_reloj(self) -> Dict[str, Any]:
+        """Datos del cronómetro para 'reloj' y 'conexion_establecida'."""
+        servidor_ms = ahora_ms()
+        en_curso = self.reloj_en_curso and self.reloj_inicio_ms is not None
+        return {
+            'competencia_id': self.reloj_competencia_id,
+            'en_curso': en_curso,
+            'servidor_ms': servidor_ms,
+            'inicio_ms': self.reloj_inicio_ms,
+            'transcurrido_ms': servidor_ms - self.reloj_inicio_ms if en_curso else None,
+        }
+
+    async def responder_ping(self, content, **extra):
+        """
+        Responde un ping con las marcas de tiempo para estimar el offset.
+
+        Args:
+            content: Mensaje del cliente (t0 opcional; sin t0 es un heartbeat)
+            extra: Campos adicionales del pong (compatibilidad con clientes previos)
+        """
+        t1 = ahora_ms()
+        respuesta = {'tipo': 'pong', **extra}
+        if content.get('t0') is not None:
+            respuesta['t0'] = content.get('t0')
+            respuesta['t1'] = t1
+        respuesta['t2'] = ahora_ms()
+        await self.send_json(respuesta)
+
+    def detener_reloj(self):
+        if self._reloj_tarea is not None:
+            self._reloj_tarea.cancel()
+            self._reloj_tarea = None
+
+    async def _enviar_ticks(self, intervalo: float):
+        try:
+            while True:
+                await asyncio.sleep(intervalo)
+                await self.send_json({'tipo': 'reloj', 'data': self.estado_reloj()})
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Socket cerrado entre el tick y el envío: disconnect detiene el reloj
+            logger.debug("Tick de reloj no enviado competencia_id=%s", self.reloj_competencia_id, exc_info=True)
+            self._reloj_tarea = None
@@ -4,16 +4,15 @@ Funciones de validación para conexiones WebSocket y mensajes entrantes.
 """
 
 import logging
-from channels.db import database_sync_to_async
 from rest_framework_simplejwt.tokens import AccessToken
+from app.utils.metricas import database_sync_to_async_medido
 
 logger = logging.getLogger(__name__)
 
 
-@database_sync_to_async
-def get_juez_from_token(token):
+def _juez_desde_token(token):
     """
-    Valida el token JWT y retorna el juez.
+    Valida el token JWT y retorna el juez (versión síncrona).
     
     Args:
         token: Token JWT de acceso
@@ -21,8 +20,9 @@ def get_juez_from_token(token):
     Returns:
         Juez instance si es válido, None en caso contrario
     """
-    from app.models import Juez
+    from app.utils.cache_jueces import obtener_juez
     
+    juez_id = None
     try:
         logger.debug("Validando token JWT")
         # Validar el token
@@ -34,74 +34,99 @@ def get_juez_from_token(token):
             logger.error("Token JWT no contiene juez_id")
             return None
         
-        # Obtener el juez con sus equipos (prefetch_related para optimizar)
-        juez = Juez.objects.prefetch_related('teams', 'teams__competition').get(id=juez_id, is_active=True)
+        # Juez y equipos asignados desde el cache (sin consultas si está caliente)
+        juez = obtener_juez(juez_id)
+        if juez is None:
+            logger.warning("Juez no existe o está inactivo: juez_id=%s", juez_id)
+            return None
         logger.debug("Juez autenticado: %s (id=%s)", juez.username, juez.id)
         return juez
-    except Juez.DoesNotExist:
-        logger.warning("Juez no existe o está inactivo: juez_id=%s", juez_id)
-        return None
     except Exception as e:
         logger.error("Error validando token JWT: %s", e)
         return None
 
 
-@database_sync_to_async
-def verificar_competencia_activa(juez):
+@database_sync_to_async_medido
+def get_juez_from_token(token):
     """
-    Verifica que el juez tenga una competencia activa.
+    Valida el token JWT y retorna el juez.
     
     Args:
-        juez: Instancia del modelo Juez
+        token: Token JWT de acceso
         
     Returns:
-        bool: True si la competencia está activa, False en caso contrario
+        Juez instance si es válido, None en caso contrario
     """
-    tiene_competencia = juez.teams.filter(competition__is_active=True).exists()
-    logger.debug("Competencia activa: juez_id=%s activa=%s", juez.id, tiene_competencia)
-    return tiene_competencia
+    return _juez_desde_token(token)
 
 
-@database_sync_to_async
-def verificar_competencia_en_curso(juez):
+@database_sync_to_async_medido
+def cargar_contexto_conexion(token):
     """
-    Verifica que la competencia del juez esté en curso.
+    Carga todo lo que necesita JuezConsumer.connect en un solo salto al thread pool.
+    
+    El juez y sus asignaciones salen del cache de jueces; el estado de las
+    competencias (que cambia al iniciar/detener) se lee con una sola consulta.
     
     Args:
-        juez: Instancia del modelo Juez
+        token: Token JWT de acceso
         
     Returns:
-        bool: True si la competencia está en curso, False en caso contrario
+        dict con juez, competencia_id (del primer equipo), competencia_activa
+        y estado_competencia; None si el token o el juez no son válidos
     """
-    return juez.teams.filter(competition__is_running=True).exists()
+    from app.models import Competencia
+    
+    juez = _juez_desde_token(token)
+    if juez is None:
+        return None
+    
+    competencias = {}
+    ids = {competencia_id for _, competencia_id in juez.equipos_asignados}
+    if ids:
+        competencias = {
+            c['id']: c
+            for c in Competencia.objects.filter(id__in=ids).values('id', 'name', 'is_running', 'is_active', 'started_at')
+        }
+    
+    # Competencia activa del primer equipo (por dorsal) con competencia activa
+    estado_competencia = None
+    for _, competencia_id in juez.equipos_asignados:
+        competencia = competencias.get(competencia_id)
+        if competencia and competencia['is_active']:
+            estado_competencia = {
+                'id': competencia['id'],
+                'nombre': competencia['name'],
+                'en_curso': competencia['is_running'],
+                'activa': competencia['is_active'],
+                'started_at': competencia['started_at'].isoformat() if competencia['started_at'] else None,
+            }
+            break
+    
+    logger.debug("Contexto de conexión: juez_id=%s estado=%s", juez.id, estado_competencia)
+    return {
+        'juez': juez,
+        'competencia_id': juez.equipos_asignados[0][1] if juez.equipos_asignados else None,
+        'competencia_activa': estado_competencia is not None,
+        'estado_competencia': estado_competencia,
+    }
 
 
-@database_sync_to_async
-def obtener_estado_competencia(juez):
+@database_sync_to_async_medido
+def verificar_competencia_en_curso(juez):
     """
-    Obtiene el estado de la competencia del juez.
+    Verifica que la competencia del juez esté en curso.
     
     Args:
         juez: Instancia del modelo Juez
         
     Returns:
-        dict: Diccionario con información de la competencia o None si no existe
+        bool: True si la competencia está en curso, False en caso contrario
     """
-    equipo = juez.teams.select_related('competition').filter(competition__is_active=True).first()
-    if not equipo or not equipo.competition:
-        return None
-    
-    competencia = equipo.competition
-    
-    return {
-        'id': competencia.id,
-        'nombre': competencia.name,
-        'en_curso': competencia.is_running,
-        'activa': competencia.is_active,
-    }
+    return juez.teams.filter(competition__is_running=True).exists()
 
 
-@database_sync_to_async
+@database_sync_to_async_medido
 def validar_equipo_pertenece_juez(equipo_id, juez_id):
     """
     Valida que un equipo pertenezca al juez especificado.
@@ -21,6 +21,14 @@ django_asgi_app = get_asgi_application()
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from app.websocket.routing import websocket_urlpatterns
+from app.services.ingesta_service import IngestaService
+from app.services.bandeja_salida_service import BandejaSalidaService
+
+# Worker de la cola de ingesta (solo con INGESTA_MODO=cola)
+IngestaService.iniciar_worker()
+
+# Despachador de notificaciones de estado de las competencias (bandeja de salida)
+BandejaSalidaService.iniciar_despachador()
 
 application = ProtocolTypeRouter({
 	"http": django_asgi_app,
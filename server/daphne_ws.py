@@ -0,0 +1,93 @@
+"""
+Arranque de Daphne con compresión permessage-deflate (RFC 7692) en los WebSockets.
+
+Daphne no negocia la compresión y la aplicación ASGI no puede activarla, así
+que este módulo cambia la fábrica de WebSockets de Daphne (autobahn) y delega
+en su línea de comandos; acepta los mismos argumentos que `daphne`:
+
+    python -m server.daphne_ws -b 0.0.0.0 -p 8000 server.asgi:application
+
+- Con WS_DEFLATE acepta la oferta permessage-deflate del navegador con
+  ventana (WS_DEFLATE_VENTANA_BITS) y memoria (WS_DEFLATE_MEM_NIVEL)
+  acotadas: el compresor vive lo mismo que la conexión, y con miles de
+  espectadores la memoria por socket cuenta
+- Solo se comprimen los mensajes desde WS_DEFLATE_UMBRAL_BYTES; los pequeños
+  (pong, reloj, deltas de pocos equipos) salen tal cual, algo que RFC 7692
+  permite mensaje a mensaje
+- Cuenta los bytes antes y después de comprimir (ws_deflate_bytes_total)
+"""
+
+from autobahn.websocket.compress import PerMessageDeflateOffer, PerMessageDeflateOfferAccept
+from daphne import server as daphne_server
+from daphne.cli import CommandLineInterface
+from daphne.ws_protocol import WebSocketFactory, WebSocketProtocol
+from django.conf import settings
+
+from app.utils.metricas import obtener_medidor
+
+bytes_deflate = obtener_medidor(
+    'ws_deflate_bytes_total',
+    'Bytes de los mensajes WebSocket comprimidos, antes (original) y después (comprimido)',
+    'counter',
+)
+
+
+def aceptar_deflate(ofertas):
+    """
+    Elige la oferta permessage-deflate del cliente, si la hay.
+
+    Args:
+        ofertas: Ofertas de compresión del handshake (autobahn)
+
+    Returns:
+        Aceptación con la ventana y memoria configuradas, o None (sin compresión)
+    """
+    for oferta in ofertas:
+        if isinstance(oferta, PerMessageDeflateOffer):
+            return PerMessageDeflateOfferAccept(
+                oferta,
+                window_bits=settings.WS_DEFLATE_VENTANA_BITS,
+                mem_level=settings.WS_DEFLATE_MEM_NIVEL,
+            )
+    return None
+
+
+class WebSocketProtocolDeflate(WebSocketProtocol):
+    """Protocolo de Daphne que comprime solo los mensajes desde el umbral."""
+
+    def sendMessage(self, payload, isBinary=False, fragmentSize=None, sync=False, doNotCompress=False):
+        if self._perMessageCompress is None or doNotCompress:
+            return super().sendMessage(payload, isBinary, fragmentSize, sync, doNotCompress)
+        if len(payload) < self.factory.umbral_deflate:
+            return super().sendMessage(payload, isBinary, fragmentSize, sync, True)
+
+        antes = self.trafficStats.outgoingOctetsWebSocketLevel
+        resultado = super().sendMessage(payload, isBinary, fragmentSize, sync, False)
+        bytes_deflate.sumar(len(payload), etapa='original')
+        bytes_deflate.sumar(self.trafficStats.outgoingOctetsWebSocketLevel - antes, etapa='comprimido')
+        return resultado
+
+
+class WebSocketFactoryDeflate(WebSocketFactory):
+    """Fábrica de Daphne que negocia permessage-deflate según los settings."""
+
+    protocol = WebSocketProtocolDeflate
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.umbral_deflate = settings.WS_DEFLATE_UMBRAL_BYTES
+
+    def setProtocolOptions(self, **opciones):
+        if settings.WS_DEFLATE:
+            opciones.setdefault('perMessageCompressionAccept', aceptar_deflate)
+        super().setProtocolOptions(**opciones)
+
+
+def main():
+    """Reemplaza la fábrica de WebSockets de Daphne y ejecuta su línea de comandos."""
+    daphne_server.WebSocketFactory = WebSocketFactoryDeflate
+    CommandLineInterface.entrypoint()
+
+
+if __name__ == '__main__':
+    main()
@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'app.middleware.MetricasMiddleware',
+    'app.middleware.PerfiladorMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,8 +91,88 @@ CHANNEL_LAYERS = {
             'prefix': 'server5k',
         },
     },
+    # Espectadores (CompetenciaPublicConsumer): pub/sub con reparto en memoria por proceso.
+    # Un group_send es un PUBLISH, sin importar cuántos espectadores haya conectados.
+    'publico': {
+        'BACKEND': 'channels_redis.pubsub.RedisPubSubChannelLayer',
+        'CONFIG': {
+            'hosts': [(REDIS_HOST, REDIS_PORT)],
+            'prefix': 'server5k-publico',
+        },
+    },
 }
 
+# === CACHE (Redis) ===
+# Compartido entre procesos; CACHE_BACKEND=locmem para desarrollo sin Redis.
+if os.getenv('CACHE_BACKEND', 'redis').lower() == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/1',
+            'KEY_PREFIX': 'server5k',
+        },
+    }
+
+# Fragmentos HTML de resultados (ver app/utils/cache_fragmentos.py)
+FRAGMENTOS_CACHE_TIMEOUT = int(os.getenv('FRAGMENTOS_CACHE_TIMEOUT', 300))
+
+# Cola de ingesta de tiempos (ver app/services/ingesta_service.py)
+# 'directa': se guarda en la petición; 'cola': acuse inmediato y confirmación por WebSocket
+INGESTA_MODO = os.getenv('INGESTA_MODO', 'directa').lower()
+INGESTA_VENTANA_MS = int(os.getenv('INGESTA_VENTANA_MS', 50))
+INGESTA_LOTES_POR_COMMIT = int(os.getenv('INGESTA_LOTES_POR_COMMIT', 50))
+
+# Bandeja de salida de cambios de estado (ver app/services/bandeja_salida_service.py)
+# Eventos reclamados por transacción e intentos antes de descartar un evento
+SALIDA_EVENTOS_POR_LOTE = int(os.getenv('SALIDA_EVENTOS_POR_LOTE', 50))
+SALIDA_MAX_INTENTOS = int(os.getenv('SALIDA_MAX_INTENTOS', 30))
+
+# Procesos Daphne que sirven la aplicación (ver app/management/commands/servir.py).
+# Con más de uno (o varios contenedores) el cache debe ser Redis y los deltas
+# del leaderboard llevan las posiciones de todos los equipos.
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', 1))
+
+# Difusión a los grupos competencia_{id} (ver app/services/difusion_service.py)
+# Un mensaje por competencia cada DIFUSION_VENTANA_MS; 0 envía cada actualización al momento
+DIFUSION_VENTANA_MS = int(os.getenv('DIFUSION_VENTANA_MS', 250))
+
+# Métricas Prometheus en /metrics (ver app/utils/metricas.py). Vacío: /metrics
+# solo responde con DEBUG=True; en producción sin token devuelve 403
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
+
+# Perfilador de peticiones y mensajes WebSocket (ver app/utils/perfilador.py)
+# Registra con WARNING lo que supere cualquiera de los umbrales y sus consultas
+PERFILADOR_ACTIVO = os.getenv('PERFILADOR_ACTIVO', 'False').lower() in ('true', '1', 'yes')
+PERFILADOR_UMBRAL_MS = int(os.getenv('PERFILADOR_UMBRAL_MS', 200))
+PERFILADOR_UMBRAL_CONSULTAS = int(os.getenv('PERFILADOR_UMBRAL_CONSULTAS', 20))
+
+# Identidad y equipos de los jueces autenticados (ver app/utils/cache_jueces.py)
+JUECES_CACHE_TIMEOUT = int(os.getenv('JUECES_CACHE_TIMEOUT', 60))
+
+# Estado de las competencias (ver app/utils/cache_competencias.py)
+ESTADO_COMPETENCIAS_CACHE_TIMEOUT = int(os.getenv('ESTADO_COMPETENCIAS_CACHE_TIMEOUT', 60))
+
+# Cronómetro por WebSocket (ver app/websocket/reloj.py): intervalo de los
+# mensajes 'reloj' a los clientes de una competencia en curso; 0 = sin ticks
+RELOJ_TICK_MS = int(os.getenv('RELOJ_TICK_MS', 5000))
+
+# Tamaño de los mensajes WebSocket (ver server/daphne_ws.py y app/websocket/protocolo.py)
+# permessage-deflate para los mensajes desde WS_DEFLATE_UMBRAL_BYTES, con ventana
+# (9-15 bits) y memoria (1-9) del compresor de cada conexión acotadas.
+# Un mensaje mayor que WS_MENSAJE_MAX_BYTES se reemplaza por un aviso 'recargar'
+# para que el cliente pida los datos por HTTP; 0 = sin límite
+WS_DEFLATE = os.getenv('WS_DEFLATE', 'True').lower() in ('true', '1', 'yes')
+WS_DEFLATE_UMBRAL_BYTES = int(os.getenv('WS_DEFLATE_UMBRAL_BYTES', 1024))
+WS_DEFLATE_VENTANA_BITS = int(os.getenv('WS_DEFLATE_VENTANA_BITS', 12))
+WS_DEFLATE_MEM_NIVEL = int(os.getenv('WS_DEFLATE_MEM_NIVEL', 5))
+WS_MENSAJE_MAX_BYTES = int(os.getenv('WS_MENSAJE_MAX_BYTES', 2 * 1024 * 1024))
+
 # === BASE DE DATOS (PostgreSQL) ===
 # Usa SQLite como fallback para desarrollo si no hay configuración de PostgreSQL
 _postgres_db = os.getenv('POSTGRES_DB')
@@ -298,6 +380,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'app.utils.perfilador': {
+            'handlers': ['console', 'file'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
         'app.services': {
             'handlers': ['console', 'file'],
             'level': 'WARNING',